@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Asyncio front-end for JobsDataExplorer
+Runs BigQuery jobs concurrently so a page needing several queries waits only
+as long as the slowest one
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
+
+import pandas as pd
+
+from bq_explorer import JobsDataExplorer
+from explorer_metrics import MetricsRecorder
+from query_cache import referenced_tables
+
+# Public JobsDataExplorer methods mirrored as coroutines. Each runs on the
+# explorer's worker pool, so its blocking waits never stall the event loop.
+MIRRORED_METHODS = [
+    'list_datasets',
+    'list_tables',
+    'get_schema',
+    'estimate_bytes',
+    'get_sample_data',
+    'get_row_count',
+    'snapshot',
+    'refresh_snapshot',
+    'search_index',
+    'refresh_search_index',
+    'get_top_companies',
+    'get_salary_stats_by_role',
+    'get_location_distribution',
+    'get_monthly_trends',
+    'search_jobs',
+    'get_work_model_distribution',
+    'dashboard_bundle',
+]
+
+
+class AsyncJobsDataExplorer:
+    """Coroutine mirror of JobsDataExplorer with concurrent query fan-out"""
+
+    def __init__(self, explorer: Optional[JobsDataExplorer] = None,
+                 max_concurrency: int = 8,
+                 poll_interval: float = 0.1,
+                 max_poll_interval: float = 2.0,
+                 **explorer_kwargs):
+        """
+        Args:
+            explorer: Explorer to wrap (built from explorer_kwargs if omitted)
+            max_concurrency: Worker threads for blocking client calls, and the
+                default limit for gather()
+            poll_interval: First delay between job status checks; doubles up
+                to max_poll_interval
+        """
+        self.explorer = explorer or JobsDataExplorer(**explorer_kwargs)
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='bq-explorer')
+
+    async def __aenter__(self) -> 'AsyncJobsDataExplorer':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker pool"""
+        self._executor.shutdown(wait=False)
+
+    async def _in_thread(self, func, *args, **kwargs):
+        # Run in a copy of this task's context so an active metrics call sees the work
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    # Queries
+
+    async def query(self, sql: str, max_results: Optional[int] = 1000, use_cache: bool = True,
+                    params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Submit a query job and poll it from the event loop.
+
+        Cache lookups, budget checks and result downloads match
+        JobsDataExplorer.query. Waiting for the job itself uses short status
+        polls, so no worker thread is held while BigQuery runs it.
+        """
+        explorer = self.explorer
+        recording = explorer.metrics.call('query') if explorer.metrics else contextlib.nullcontext()
+        with recording as metrics:
+            df = await self._query(sql, max_results, use_cache, params)
+            if metrics is not None:
+                metrics.rows = len(df)
+            return df
+
+    async def _query(self, sql: str, max_results: Optional[int], use_cache: bool,
+                     params: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        explorer = self.explorer
+        cached = await self._in_thread(explorer._cache_lookup, sql, max_results, params) if use_cache else None
+        if cached is not None and cached[0] is not None:
+            MetricsRecorder.record_cache_hit()
+            return cached[0]
+
+        query_job, sampled = await self._in_thread(explorer._submit, sql, params)
+        await self.wait(query_job)
+        df = await self._in_thread(explorer._collect, query_job, max_results)
+
+        # As in JobsDataExplorer.query, a TABLESAMPLE stand-in is never cached
+        if cached is not None and not sampled:
+            await self._in_thread(explorer.cache.put, cached[1], df, referenced_tables(sql))
+        return df
+
+    async def wait(self, query_job) -> None:
+        """Poll a job with exponential backoff until it finishes"""
+        delay = self.poll_interval
+        while not await self._in_thread(query_job.done):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    async def query_iter(self, sql: str, chunk_size: int = 10000, as_arrow: bool = False,
+                         prefetch_pages: int = 1,
+                         params: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        """Async iterator over JobsDataExplorer.query_iter chunks"""
+        chunks = self.explorer.query_iter(sql, chunk_size=chunk_size, as_arrow=as_arrow,
+                                          prefetch_pages=prefetch_pages, params=params)
+        done = object()
+        try:
+            while True:
+                chunk = await self._in_thread(next, chunks, done)
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+    # Fan-out
+
+    async def gather(self, *awaitables: Awaitable, limit: Optional[int] = None,
+                     return_exceptions: bool = False) -> List[Any]:
+        """
+        asyncio.gather with at most `limit` awaitables in flight (defaults
+        to max_concurrency). Results come back in argument order.
+        """
+        semaphore = asyncio.Semaphore(limit or self.max_concurrency)
+
+        async def bounded(awaitable):
+            async with semaphore:
+                return await awaitable
+
+        return await asyncio.gather(*(bounded(a) for a in awaitables),
+                                    return_exceptions=return_exceptions)
+
+
+def _mirror(name: str):
+    method = getattr(JobsDataExplorer, name)
+
+    @functools.wraps(method)
+    async def coroutine(self, *args, **kwargs):
+        return await self._in_thread(method, self.explorer, *args, **kwargs)
+
+    return coroutine
+
+
+for _name in MIRRORED_METHODS:
+    setattr(AsyncJobsDataExplorer, _name, _mirror(_name))
+
+
+async def _main():
+    """Run the dashboard queries concurrently"""
+    async with AsyncJobsDataExplorer() as explorer:
+        results = await explorer.gather(
+            explorer.get_top_companies(limit=10),
+            explorer.get_salary_stats_by_role(),
+            explorer.get_location_distribution(limit=10),
+            explorer.get_work_model_distribution(),
+            explorer.get_monthly_trends(),
+        )
+        for df in results:
+            print(df.to_string(index=False))
+            print()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for google.cloud.bigquery.Client
+Serves a synthetic jobs table to JobsDataExplorer: each query the explorer
+sends is recognised by its shape and answered with pandas over the same
+data, after a configurable per-job latency. Anything else raises BadRequest,
+so a benchmark never silently measures the wrong query.
+"""
+
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from google.api_core.exceptions import BadRequest, NotFound
+
+PROJECT = 'jobs-data-linkedin'
+DATASET = 'analytic_website_analytics'
+TABLE = 'jobs_ai_cleaned_vw'
+
+FAMILIES = ['Machine Learning', 'Data Science', 'Data Engineering', 'Analytics', 'Research',
+            'Software Engineering', 'Product', 'MLOps', None]
+SENIORITY = ['Entry level', 'Associate', 'Mid-Senior level', 'Director', 'Executive']
+TITLES = ['Machine Learning Engineer', 'Data Scientist', 'Data Engineer', 'Research Scientist',
+          'Analytics Engineer', 'AI Product Manager', 'MLOps Engineer', 'Applied Scientist',
+          'Data Analyst', 'Computer Vision Engineer', 'NLP Engineer', 'Software Engineer, AI']
+WORDS = ['python', 'pytorch', 'tensorflow', 'sql', 'spark', 'llm', 'kubernetes', 'airflow',
+         'statistics', 'experimentation', 'recommendation', 'forecasting', 'vision', 'nlp']
+STATES = ['CA', 'NY', 'WA', 'TX', 'MA', 'IL', 'CO', 'GA']
+
+
+def synthetic_jobs(n: int, seed: int = 0) -> pd.DataFrame:
+    """n job postings with the jobs_ai_cleaned_vw columns the explorer reads"""
+    rng = np.random.default_rng(seed)
+    # Zipf-ish company sizes so "top companies" has a real head and tail
+    companies = np.minimum(rng.zipf(1.3, n), 5000)
+    cities = rng.integers(0, 200, n)
+    pay_min = rng.normal(120_000, 35_000, n).round(-3)
+    has_pay = rng.random(n) < 0.6
+    model = rng.integers(0, 4, n)
+    posted = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n), unit='D')
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), (n, 3))]
+
+    df = pd.DataFrame({
+        'unique_job_id': [f"job-{i}" for i in range(n)],
+        'data_company': [f"Company {c}" for c in companies],
+        'data_job_title': np.array(TITLES)[rng.integers(0, len(TITLES), n)],
+        'job_family': pd.Series(np.array(FAMILIES, dtype=object)[rng.integers(0, len(FAMILIES), n)]),
+        'data_seniority_level': np.array(SENIORITY)[rng.integers(0, len(SENIORITY), n)],
+        'data_location_city': [f"City {c}" for c in cities],
+        'data_location_state': np.array(STATES)[cities % len(STATES)],
+        'data_location_country': 'United States',
+        'data_pay_range_min': np.where(has_pay, pay_min, np.nan),
+        'data_pay_range_max': np.where(has_pay, pay_min * 1.3, np.nan),
+        'data_posted': posted.date,
+        'is_remote': model == 0,
+        'is_hybrid': model == 1,
+        'is_onsite': model == 2,
+        'data_job_description': [' '.join(w) for w in words],
+    })
+    df.loc[rng.random(n) < 0.02, 'data_company'] = None
+    df.loc[rng.random(n) < 0.05, 'data_location_city'] = None
+    return df
+
+
+def _work_model(jobs: pd.DataFrame) -> pd.Series:
+    return pd.Series(np.select([jobs['is_remote'], jobs['is_hybrid'], jobs['is_onsite']],
+                               ['Remote', 'Hybrid', 'Onsite'], 'Unknown'), index=jobs.index)
+
+
+def _month(jobs: pd.DataFrame) -> pd.Series:
+    return pd.to_datetime(jobs['data_posted']).dt.to_period('M').dt.to_timestamp().dt.date
+
+
+class FakeRowIterator:
+    """The parts of RowIterator the explorer reads"""
+
+    def __init__(self, frame: pd.DataFrame, max_results: Optional[int], page_size: Optional[int]):
+        self.total_rows = len(frame)
+        self._frame = frame if max_results is None else frame.head(max_results)
+        self._page_size = page_size or 10_000
+
+    def to_dataframe(self, **kwargs) -> pd.DataFrame:
+        return self._frame.reset_index(drop=True)
+
+    def to_dataframe_iterable(self, **kwargs) -> Iterator[pd.DataFrame]:
+        for start in range(0, len(self._frame), self._page_size):
+            yield self._frame.iloc[start:start + self._page_size].reset_index(drop=True)
+
+    def to_arrow_iterable(self, **kwargs) -> Iterator[pa.RecordBatch]:
+        for page in self.to_dataframe_iterable():
+            yield from pa.Table.from_pandas(page, preserve_index=False).to_batches()
+
+
+class FakeQueryJob:
+    """A query job that answers after the client's latency"""
+
+    def __init__(self, client: 'FakeBigQueryClient', sql: str, params: Dict[str, Any], dry_run: bool):
+        self.job_id = f"fake_{uuid.uuid4().hex}"
+        self.client = client
+        self.sql = sql
+        self.params = params
+        self.created = datetime.now(timezone.utc)
+        self.started: Optional[datetime] = None
+        self.ended: Optional[datetime] = None
+        self.cache_hit = False
+        self.slot_millis = 0
+        self._ready_at = time.monotonic() + client.latency
+        scanned = 0 if 'INFORMATION_SCHEMA' in sql else client.table_bytes
+        self.total_bytes_processed = scanned
+        self.total_bytes_billed = 0 if dry_run else scanned
+
+    def done(self, **kwargs) -> bool:
+        return time.monotonic() >= self._ready_at
+
+    def result(self, max_results: Optional[int] = None, page_size: Optional[int] = None,
+               **kwargs) -> FakeRowIterator:
+        self.started = datetime.now(timezone.utc)
+        remaining = self._ready_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        frame = self.client.answer(self.sql, self.params)
+        self.ended = datetime.now(timezone.utc)
+        self.slot_millis = int((self.ended - self.started).total_seconds() * 1000)
+        return FakeRowIterator(frame, max_results, page_size)
+
+
+class FakeBigQueryClient:
+    """
+    Serves `project.analytic_website_analytics.jobs_ai_cleaned_vw` from a
+    synthetic DataFrame, plus the catalog calls list_datasets/list_tables make.
+
+    Args:
+        jobs: The table contents (see synthetic_jobs)
+        latency_ms: Added to every query job and metadata call
+    """
+
+    def __init__(self, jobs: pd.DataFrame, project: str = PROJECT, latency_ms: float = 0.0):
+        self.project = project
+        self.jobs = jobs
+        self.latency = latency_ms / 1000
+        self.table_bytes = int(jobs.memory_usage(deep=False).sum())
+        self.created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.modified = datetime.now(timezone.utc) - timedelta(hours=1)
+        self.datasets = {DATASET: [(TABLE, 'VIEW')], 'raw_jobs': [('jobs_raw', 'TABLE')]}
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency and name != 'query':
+            time.sleep(self.latency)
+
+    # Catalog
+
+    def list_datasets(self, **kwargs) -> List[SimpleNamespace]:
+        self._count('list_datasets')
+        return [SimpleNamespace(dataset_id=d) for d in self.datasets]
+
+    def list_tables(self, dataset: str, **kwargs) -> List[SimpleNamespace]:
+        self._count('list_tables')
+        return [SimpleNamespace(table_id=t, table_type=kind) for t, kind in self.datasets[dataset]]
+
+    def get_dataset(self, dataset: str, **kwargs) -> SimpleNamespace:
+        self._count('get_dataset')
+        dataset = dataset.split('.')[-1]
+        if dataset not in self.datasets:
+            raise NotFound(f"Dataset {dataset} not found")
+        return SimpleNamespace(dataset_id=dataset, location='US', created=self.created, modified=self.modified)
+
+    def get_table(self, table: str, **kwargs) -> SimpleNamespace:
+        self._count('get_table')
+        dataset, table_id = table.split('.')[-2:]
+        if (table_id, 'VIEW') not in self.datasets.get(dataset, []) and \
+                (table_id, 'TABLE') not in self.datasets.get(dataset, []):
+            raise NotFound(f"Table {table} not found")
+        schema = [SimpleNamespace(name=c, field_type=str(t), mode='NULLABLE', description=None)
+                  for c, t in self.jobs.dtypes.items()]
+        table_type = 'VIEW' if (table_id, 'VIEW') in self.datasets[dataset] else 'TABLE'
+        # The jobs view reads the raw table, so cache keys resolve through it
+        view_query = f"SELECT * FROM `{self.project}.raw_jobs.jobs_raw`" if table_type == 'VIEW' else None
+        return SimpleNamespace(project=self.project, dataset_id=dataset, table_id=table_id,
+                               table_type=table_type, view_query=view_query,
+                               num_rows=len(self.jobs), num_bytes=self.table_bytes,
+                               created=self.created, modified=self.modified, schema=schema)
+
+    # Queries
+
+    def query(self, sql: str, job_config=None, **kwargs) -> FakeQueryJob:
+        self._count('query')
+        params = {p.name: p.value for p in getattr(job_config, 'query_parameters', None) or []}
+        job = FakeQueryJob(self, sql, params, dry_run=bool(getattr(job_config, 'dry_run', False)))
+        # Fail at submission like BigQuery does for unparseable SQL
+        self._handler(sql)
+        return job
+
+    def _handler(self, sql: str):
+        for pattern, handler in (
+            (r'INFORMATION_SCHEMA\.SCHEMATA', self._schemata),
+            (r'INFORMATION_SCHEMA\.TABLES', self._tables),
+            (r'GROUPING SETS', self._bundle),
+            (r'LIKE CONCAT', self._search),
+            (r'GROUP BY data_company', self._top_companies),
+            (r'GROUP BY job_family', self._salary_stats),
+            (r'GROUP BY data_location_city', self._locations),
+            (r'GROUP BY month', self._monthly_trends),
+            (r'GROUP BY work_model', self._work_models),
+            (r'COUNT\(\*\) as count', self._row_count),
+            (r'SELECT \*\s+FROM\s+\S+\s+LIMIT', self._sample),
+            # Column projections streamed by snapshots, search indexes and syncs
+            (r'(?s)^\s*SELECT\s+[\w\s,*]+?\s+FROM\s+`[^`]+`\s*(WHERE\s+data_posted\b.*)?$',
+             lambda params: self._projection(sql, params)),
+        ):
+            if re.search(pattern, sql):
+                return handler
+        raise BadRequest(f"Fake BigQuery does not understand: {' '.join(sql.split())[:200]}")
+
+    def answer(self, sql: str, params: Dict[str, Any]) -> pd.DataFrame:
+        return self._handler(sql)(params)
+
+    def _schemata(self, params) -> pd.DataFrame:
+        return pd.DataFrame({
+            'schema_name': list(self.datasets),
+            'location': 'US',
+            'creation_time': pd.Timestamp(self.created),
+            'last_modified_time': pd.Timestamp(self.modified),
+        })
+
+    def _tables(self, params) -> pd.DataFrame:
+        names = [t for tables in self.datasets.values() for t, _ in tables]
+        return pd.DataFrame({
+            'table_name': names,
+            'total_rows': len(self.jobs),
+            'total_logical_bytes': self.table_bytes,
+            'creation_time': pd.Timestamp(self.created),
+            'modified': pd.Timestamp(self.modified),
+        })
+
+    def _sample(self, params) -> pd.DataFrame:
+        return self.jobs.head(int(params.get('limit', 10)))
+
+    def _projection(self, sql: str, params) -> pd.DataFrame:
+        """SELECT columns, optionally past a data_posted (and unique_job_id) watermark"""
+        select = re.match(r'(?s)\s*SELECT\s+(.+?)\s+FROM', sql).group(1)
+        columns = [c.strip() for c in select.split(',')]
+        jobs = self.jobs
+        if 'since' in params:
+            posted = pd.to_datetime(jobs['data_posted'], utc=True)
+            since = pd.Timestamp(params['since'])
+            since = since.tz_localize('UTC') if since.tzinfo is None else since
+            if re.search(r'data_posted\s*>=\s*@since', sql):
+                jobs = jobs[posted >= since]
+            else:
+                jobs = jobs[(posted > since)
+                            | ((posted == since) & (jobs['unique_job_id'] > params['since_id']))]
+        return jobs if columns == ['*'] else jobs[columns]
+
+    def _row_count(self, params) -> pd.DataFrame:
+        return pd.DataFrame({'count': [len(self.jobs)]})
+
+    def _company_stats(self, jobs: pd.DataFrame) -> pd.DataFrame:
+        return jobs.groupby('data_company', dropna=False).agg(
+            job_count=('unique_job_id', 'size'),
+            unique_titles=('data_job_title', 'nunique'),
+            avg_min_salary=('data_pay_range_min', 'mean'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        ).reset_index()
+
+    def _top_companies(self, params) -> pd.DataFrame:
+        stats = self._company_stats(self.jobs[self.jobs['data_company'].notna()])
+        return stats.sort_values('job_count', ascending=False).head(int(params['limit']))
+
+    def _salary_stats(self, params) -> pd.DataFrame:
+        jobs = self.jobs.dropna(subset=['data_pay_range_min', 'data_pay_range_max', 'job_family'])
+        return jobs.groupby('job_family').agg(
+            job_count=('unique_job_id', 'size'),
+            avg_min_salary=('data_pay_range_min', 'mean'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            min_salary=('data_pay_range_min', 'min'),
+            max_salary=('data_pay_range_max', 'max'),
+        ).reset_index().sort_values('avg_max_salary', ascending=False)
+
+    def _location_stats(self, jobs: pd.DataFrame) -> pd.DataFrame:
+        return jobs.groupby(['data_location_city', 'data_location_state', 'data_location_country'],
+                            dropna=False).agg(
+            job_count=('unique_job_id', 'size'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        ).reset_index()
+
+    def _locations(self, params) -> pd.DataFrame:
+        stats = self._location_stats(self.jobs[self.jobs['data_location_city'].notna()])
+        return stats.sort_values('job_count', ascending=False).head(int(params['limit']))
+
+    def _monthly_trends(self, params) -> pd.DataFrame:
+        jobs = self.jobs.assign(month=_month(self.jobs))
+        return jobs.groupby('month').agg(
+            job_count=('unique_job_id', 'size'),
+            unique_companies=('data_company', 'nunique'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        ).reset_index().sort_values('month')
+
+    def _work_models(self, params) -> pd.DataFrame:
+        counts = _work_model(self.jobs).value_counts().rename_axis('work_model').reset_index(name='job_count')
+        counts['percentage'] = (counts['job_count'] * 100.0 / counts['job_count'].sum()).round(2)
+        return counts
+
+    def _search(self, params) -> pd.DataFrame:
+        keyword = str(params['keyword']).lower()
+        hits = (self.jobs['data_job_title'].str.lower().str.contains(keyword, regex=False)
+                | self.jobs['data_job_description'].str.lower().str.contains(keyword, regex=False))
+        columns = ['unique_job_id', 'data_company', 'data_job_title', 'data_seniority_level', 'job_family',
+                   'data_location_city', 'data_location_state', 'data_pay_range_min', 'data_pay_range_max',
+                   'is_remote', 'data_posted']
+        return self.jobs.loc[hits, columns].sort_values('data_posted', ascending=False).head(int(params['limit']))
+
+    def _bundle(self, params) -> pd.DataFrame:
+        """The dashboard_bundle GROUPING SETS result, top-limit rule included"""
+        limit = int(params['limit'])
+        jobs = self.jobs.assign(month=_month(self.jobs), work_model=_work_model(self.jobs))
+        has_salary = jobs['data_pay_range_min'].notna() & jobs['data_pay_range_max'].notna()
+        jobs = jobs.assign(
+            has_salary=has_salary,
+            salaried_min=jobs['data_pay_range_min'].where(has_salary),
+            salaried_max=jobs['data_pay_range_max'].where(has_salary),
+        )
+
+        def grouped(name: str, keys: List[str]) -> pd.DataFrame:
+            stats = jobs.groupby(keys, dropna=False).agg(
+                job_count=('unique_job_id', 'size'),
+                unique_titles=('data_job_title', 'nunique'),
+                unique_companies=('data_company', 'nunique'),
+                avg_min_salary=('data_pay_range_min', 'mean'),
+                avg_max_salary=('data_pay_range_max', 'mean'),
+                remote_jobs=('is_remote', 'sum'),
+                salaried_count=('has_salary', 'sum'),
+                salaried_avg_min=('salaried_min', 'mean'),
+                salaried_avg_max=('salaried_max', 'mean'),
+                min_salary=('salaried_min', 'min'),
+                max_salary=('salaried_max', 'max'),
+            ).reset_index()
+            if name in ('company', 'location'):
+                stats = stats.sort_values([keys[0], 'job_count'], ascending=[True, False],
+                                          key=lambda s: s.isna() if s.name == keys[0] else s).head(limit)
+            return stats.assign(grouping_set=name)
+
+        return pd.concat([
+            grouped('company', ['data_company']),
+            grouped('job_family', ['job_family']),
+            grouped('location', ['data_location_city', 'data_location_state', 'data_location_country']),
+            grouped('month', ['month']),
+            grouped('work_model', ['work_model']),
+        ], ignore_index=True)
+
+
+@contextmanager
+def fake_bigquery(client: FakeBigQueryClient) -> Iterator[FakeBigQueryClient]:
+    """Make JobsDataExplorer (and anything else calling bigquery.Client) get `client`"""
+    with mock.patch('google.cloud.bigquery.Client', return_value=client):
+        yield client
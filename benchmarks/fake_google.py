@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stand-in for the Drive v3 and Cloud Storage JSON APIs
+Serves a synthetic Drive of `n` files (CSV exports, Docs, Sheets, PDFs and
+images, some duplicated and some trashed) and an in-memory bucket store, so
+the maintenance scripts can run unchanged against it through
+GOOGLE_API_EMULATOR_HOST and STORAGE_EMULATOR_HOST. Only what the scripts
+call is implemented. File metadata is derived from the file index instead
+of stored per file, and uploaded object bodies are hashed rather than kept,
+so a million-file Drive fits in a few tens of MB.
+"""
+
+import base64
+import email
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import google_crc32c
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drive_transfer import combine_crc32c  # noqa: E402
+
+CSV_MIME = 'text/csv'
+DOC_MIME = 'application/vnd.google-apps.document'
+SHEET_MIME = 'application/vnd.google-apps.spreadsheet'
+
+# File index modulo 10 → kind; 6 in 10 files are CSV exports
+KINDS = [CSV_MIME] * 6 + [DOC_MIME, SHEET_MIME, 'application/pdf', 'image/png']
+EXTENSIONS = {CSV_MIME: '.csv', 'application/pdf': '.pdf', 'image/png': '.png'}
+ALL_FIELDS = ('id', 'name', 'mimeType', 'size', 'md5Checksum', 'createdTime', 'modifiedTime', 'trashed')
+QUOTA_LIMIT = 15 * 1024 ** 3
+AGE_SPAN = timedelta(days=730)
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def _json(status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    return status, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(body).encode()
+
+
+def _object(obj: Dict[str, Any]) -> Response:
+    """An object resource, with the X-Goog-Hash header clients validate uploads against"""
+    hashes = [f"{name}={obj[key]}" for name, key in (('crc32c', 'crc32c'), ('md5', 'md5Hash')) if key in obj]
+    return _json(200, obj, {'X-Goog-Hash': ','.join(hashes)} if hashes else None)
+
+
+def _error(status: int, message: str, reason: str = 'notFound') -> Response:
+    return _json(status, {'error': {'code': status, 'message': message,
+                                    'errors': [{'reason': reason, 'message': message}]}})
+
+
+class FakeDrive:
+    """A Drive of n synthetic files whose metadata is a function of the file index"""
+
+    def __init__(self, n: int, csv_size: int = 2048, now: Optional[datetime] = None):
+        self.n = n
+        self.csv_size = csv_size
+        self.now = now or datetime.now(timezone.utc)
+        self.step = AGE_SPAN / max(n, 1)
+        self.deleted = bytearray(n)
+        self.changes: List[int] = []  # deleted file indices; page tokens are offsets
+        self.lock = threading.Lock()
+        self.sizes = array('q', [-1]) * n
+        self.md5s = bytearray(16 * n)
+        for i in range(n):
+            if KINDS[i % 10] not in (DOC_MIME, SHEET_MIME):
+                content = self.content(i)
+                self.sizes[i] = len(content)
+                self.md5s[16 * i:16 * i + 16] = hashlib.md5(content).digest()
+        self.usage = sum(size for size in self.sizes if size > 0)
+
+    # Synthetic content
+
+    @staticmethod
+    def content_seed(i: int) -> int:
+        # One in five files repeats the same-kind file ten places earlier
+        return i - 10 if (i // 10) % 5 == 4 else i
+
+    def content(self, i: int) -> bytes:
+        seed = self.content_seed(i)
+        mime = KINDS[i % 10]
+        if mime == CSV_MIME:
+            lines = ["unique_job_id,data_company,data_job_title,data_location_city,data_pay_range_max"]
+            k = 0
+            while sum(len(line) + 1 for line in lines) < self.csv_size:
+                lines.append(f"{seed}-{k},Company {(seed * 31 + k) % 997},Title {(seed + k) % 89},"
+                             f"City {(seed * 7 + k) % 53},{50000 + (seed * 13 + k) % 150000}")
+                k += 1
+            return ('\n'.join(lines) + '\n').encode()
+        size = 16 * 1024 if mime == 'application/pdf' else 4 * 1024
+        block = hashlib.sha256(str(seed).encode()).digest()
+        return (block * (size // len(block) + 1))[:size]
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        mime = KINDS[i % 10]
+        created = self.now - self.step * i
+        stamp = created.strftime('%Y-%m-%dT%H:%M:%S.') + f"{created.microsecond // 1000:03d}Z"
+        name = (f"export_{i:07d}{EXTENSIONS[mime]}" if mime in EXTENSIONS
+                else f"{'Report' if mime == DOC_MIME else 'Sheet'} {i}")
+        f = {'id': f"f{i}", 'name': name, 'mimeType': mime, 'createdTime': stamp,
+             'modifiedTime': stamp, 'trashed': i % 50 == 49}
+        if self.sizes[i] >= 0:
+            f['size'] = str(self.sizes[i])
+            f['md5Checksum'] = self.md5s[16 * i:16 * i + 16].hex()
+        return f
+
+    def index(self, file_id: str) -> Optional[int]:
+        if not file_id.startswith('f') or not file_id[1:].isdigit():
+            return None
+        i = int(file_id[1:])
+        return i if i < self.n and not self.deleted[i] else None
+
+    def delete(self, i: int) -> None:
+        with self.lock:
+            if not self.deleted[i]:
+                self.deleted[i] = 1
+                self.changes.append(i)
+                self.usage -= max(self.sizes[i], 0)
+
+    # Listing
+
+    def list(self, q: Optional[str], page_size: int, page_token: Optional[str],
+             order_by: Optional[str]) -> Tuple[List[int], Optional[str]]:
+        """File indices for one page and the next page token"""
+        match = _parse_query(q)
+        # createdTime falls as the index grows
+        ascending_created = order_by is not None and order_by.split(',')[0].strip() == 'createdTime'
+        position = int(page_token or 0)
+        page: List[int] = []
+        while position < self.n and len(page) < page_size:
+            i = self.n - 1 - position if ascending_created else position
+            position += 1
+            if not self.deleted[i] and match(self.metadata(i)):
+                page.append(i)
+        return page, (str(position) if position < self.n else None)
+
+    def remaining(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        return sum(1 for i in range(self.n) if not self.deleted[i] and predicate(self.metadata(i)))
+
+
+_ATOM = re.compile(r"^\s*(\w+)\s*(=|!=|<=|>=|<|>|contains)\s*(?:'([^']*)'|(\w+))\s*$")
+
+
+def _parse_query(q: Optional[str]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Drive's q syntax, limited to what the scripts send: field comparisons
+    and `name contains`, joined by `and` (binding tighter) and `or`.
+    """
+    if not q:
+        return lambda f: True
+    q = q.strip()
+    if q.startswith('(') and q.endswith(')'):
+        q = q[1:-1]
+
+    def atom(text: str) -> Callable[[Dict[str, Any]], bool]:
+        m = _ATOM.match(text)
+        if m is None:
+            raise ValueError(f"Unsupported query term: {text!r}")
+        field, op, quoted, bare = m.groups()
+        value: Any = quoted if quoted is not None else {'true': True, 'false': False}.get(bare, bare)
+        if op == 'contains':
+            return lambda f: value in f.get(field, '')
+        compare = {'=': lambda a, b: a == b, '!=': lambda a, b: a != b, '<': lambda a, b: a < b,
+                   '>': lambda a, b: a > b, '<=': lambda a, b: a <= b, '>=': lambda a, b: a >= b}[op]
+        return lambda f: f.get(field) is not None and compare(f.get(field), value)
+
+    clauses = [[atom(term) for term in re.split(r'\s+and\s+', part)]
+               for part in re.split(r'\s+or\s+', q)]
+    return lambda f: any(all(term(f) for term in terms) for terms in clauses)
+
+
+def _file_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    m = re.search(r'files\(([^)]*)\)', fields or '')
+    return tuple(name.strip() for name in m.group(1).split(',')) if m else ALL_FIELDS
+
+
+class FakeStorage:
+    """Buckets of objects whose bodies are hashed on upload but not kept"""
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def finish(self, bucket: str, name: str, resource: Dict[str, Any], size: int,
+               md5: Optional[bytes], crc32c: Optional[bytes]) -> Dict[str, Any]:
+        with self.lock:
+            self.generation += 1
+            obj = {
+                'kind': 'storage#object',
+                'bucket': bucket,
+                'name': name,
+                'id': f"{bucket}/{name}/{self.generation}",
+                'generation': str(self.generation),
+                'metageneration': '1',
+                'size': str(size),
+                'contentType': resource.get('contentType', 'application/octet-stream'),
+                'updated': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+                'etag': uuid.uuid4().hex,
+            }
+            if md5 is not None:
+                obj['md5Hash'] = base64.b64encode(md5).decode()
+            if crc32c is not None:
+                obj['crc32c'] = base64.b64encode(crc32c).decode()
+            for key in ('contentEncoding', 'metadata', 'cacheControl'):
+                if resource.get(key) is not None:
+                    obj[key] = resource[key]
+            self.buckets.setdefault(bucket, {})[name] = obj
+            return obj
+
+
+class Emulator:
+    """Routes Drive and Cloud Storage requests to FakeDrive/FakeStorage"""
+
+    def __init__(self, drive: FakeDrive, latency_ms: float = 0.0):
+        self.drive = drive
+        self.storage = FakeStorage()
+        self.latency = latency_ms / 1000
+        self.timings: Dict[str, List[float]] = {}
+        self.timings_lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self.timings_lock:
+            self.timings.setdefault(endpoint, []).append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(times: List[float]) -> Dict[str, Any]:
+            ordered = sorted(times)
+            return {
+                'count': len(ordered),
+                'p50_ms': ordered[len(ordered) // 2] * 1000 if ordered else None,
+                'p95_ms': ordered[int(len(ordered) * 0.95)] * 1000 if ordered else None,
+            }
+
+        with self.timings_lock:
+            requests = {endpoint: summary(times) for endpoint, times in sorted(self.timings.items())}
+            requests['all'] = summary([t for times in self.timings.values() for t in times])
+        objects = [obj for bucket in self.storage.buckets.values() for obj in bucket.values()]
+        return {
+            'requests': requests,
+            'drive_files': self.drive.n - len(self.drive.changes),
+            'drive_csv_files': sum(1 for i in range(self.drive.n)
+                                   if KINDS[i % 10] == CSV_MIME and not self.drive.deleted[i]),
+            'gcs_objects': len(objects),
+            'gcs_bytes': sum(int(obj['size']) for obj in objects),
+        }
+
+    def handle(self, method: str, target: str, headers, body: bytes) -> Tuple[str, Response]:
+        """(endpoint label, response) for one request"""
+        url = urlsplit(target)
+        path = url.path
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if path.startswith('/drive/v3/'):
+            return self._drive(method, path[len('/drive/v3/'):], query, headers)
+        if path == '/batch/drive/v3':
+            return 'drive.batch', self._batch(headers, body)
+        if path.startswith('/upload/storage/v1/b/'):
+            return self._upload(method, path, query, headers, body)
+        if path.startswith('/storage/v1/b'):
+            return self._storage(method, path[len('/storage/v1/b'):], query, body)
+        if path == '/_stats':
+            return '_stats', _json(200, self.stats())
+        return 'unknown', _error(404, f"No fake for {method} {path}")
+
+    # Drive
+
+    def _drive(self, method: str, path: str, query: Dict[str, str], headers) -> Tuple[str, Response]:
+        drive = self.drive
+        if path == 'files' and method == 'GET':
+            try:
+                page, token = drive.list(query.get('q'), int(query.get('pageSize', 100)),
+                                         query.get('pageToken'), query.get('orderBy'))
+            except ValueError as e:
+                return 'drive.files.list', _error(400, str(e), 'invalid')
+            fields = _file_fields(query.get('fields'))
+            files = [{k: v for k, v in drive.metadata(i).items() if k in fields} for i in page]
+            body: Dict[str, Any] = {'files': files}
+            if token:
+                body['nextPageToken'] = token
+            return 'drive.files.list', _json(200, body)
+
+        if path == 'about':
+            return 'drive.about', _json(200, {
+                'user': {'emailAddress': 'emulator@localhost'},
+                'storageQuota': {'limit': str(QUOTA_LIMIT), 'usage': str(drive.usage),
+                                 'usageInDrive': str(drive.usage), 'usageInDriveTrash': '0'},
+            })
+
+        if path == 'changes/startPageToken':
+            return 'drive.changes.startPageToken', _json(200, {'startPageToken': str(len(drive.changes))})
+
+        if path == 'changes':
+            start = int(query.get('pageToken', 0))
+            end = min(len(drive.changes), start + int(query.get('pageSize', 100)))
+            body = {'changes': [{'fileId': f"f{i}", 'removed': True} for i in drive.changes[start:end]]}
+            if end < len(drive.changes):
+                body['nextPageToken'] = str(end)
+            else:
+                body['newStartPageToken'] = str(end)
+            return 'drive.changes.list', _json(200, body)
+
+        if path.startswith('files/'):
+            i = drive.index(unquote(path[len('files/'):]))
+            if method == 'DELETE':
+                if i is None:
+                    return 'drive.files.delete', _error(404, 'File not found')
+                drive.delete(i)
+                return 'drive.files.delete', (204, {}, b'')
+            if method == 'GET' and query.get('alt') == 'media':
+                if i is None:
+                    return 'drive.files.download', _error(404, 'File not found')
+                if drive.sizes[i] < 0:
+                    return 'drive.files.download', _error(403, 'Only files with binary content can be downloaded',
+                                                          'fileNotDownloadable')
+                return 'drive.files.download', self._ranged(drive.content(i), headers.get('range'))
+            if method == 'GET':
+                if i is None:
+                    return 'drive.files.get', _error(404, 'File not found')
+                return 'drive.files.get', _json(200, drive.metadata(i))
+        return 'drive.unknown', _error(404, f"No fake for {method} drive/v3/{path}")
+
+    @staticmethod
+    def _ranged(content: bytes, range_header: Optional[str]) -> Response:
+        total = len(content)
+        m = re.match(r'bytes=(\d+)-(\d*)', range_header or '')
+        if m is None:
+            return 200, {'Content-Type': 'application/octet-stream'}, content
+        first = int(m.group(1))
+        last = min(int(m.group(2)) if m.group(2) else total - 1, total - 1)
+        if first >= total:
+            return 416, {'Content-Range': f"bytes */{total}"}, b''
+        return 206, {'Content-Type': 'application/octet-stream',
+                     'Content-Range': f"bytes {first}-{last}/{total}"}, content[first:last + 1]
+
+    def _batch(self, headers, body: bytes) -> Response:
+        envelope = email.message_from_bytes(
+            f"Content-Type: {headers.get('content-type')}\r\n\r\n".encode() + body
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        out = []
+        for part in envelope.get_payload():
+            content_id = ' '.join(str(part['Content-ID']).split())
+            request_text = part.get_payload()
+            request_line = request_text.split('\n', 1)[0].strip()
+            method, target, _ = request_line.split(' ', 2)
+            _, (status, response_headers, response_body) = self.handle(method, target, {}, b'')
+            lines = [f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}"]
+            lines += [f"{k}: {v}" for k, v in response_headers.items()]
+            lines.append(f"Content-Length: {len(response_body)}")
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                + '\r\n'.join(lines) + '\r\n\r\n' + response_body.decode()
+            )
+        payload = '\r\n'.join(out) + f"\r\n--{boundary}--\r\n"
+        return 200, {'Content-Type': f"multipart/mixed; boundary={boundary}"}, payload.encode()
+
+    # Cloud Storage
+
+    def _storage(self, method: str, path: str, query: Dict[str, str], body: bytes) -> Tuple[str, Response]:
+        storage = self.storage
+        if path == '' and method == 'POST':
+            name = json.loads(body)['name']
+            with storage.lock:
+                storage.buckets.setdefault(name, {})
+            return 'gcs.buckets.insert', _json(200, {'kind': 'storage#bucket', 'name': name, 'id': name})
+
+        m = re.match(r'^/([^/]+)(?:/o/([^/]+)(/compose)?)?$', path)
+        if m is None:
+            return 'gcs.unknown', _error(404, f"No fake for {method} {path}")
+        bucket_name, object_name, compose = m.group(1), m.group(2), m.group(3)
+        bucket = storage.buckets.get(bucket_name)
+        if bucket is None:
+            return 'gcs.buckets.get', _error(404, f"Bucket {bucket_name} not found")
+        if object_name is None:
+            return 'gcs.buckets.get', _json(200, {'kind': 'storage#bucket', 'name': bucket_name,
+                                                  'id': bucket_name})
+
+        name = unquote(object_name)
+        if compose:
+            request = json.loads(body)
+            sources = [bucket.get(source['name']) for source in request['sourceObjects']]
+            if any(source is None for source in sources):
+                return 'gcs.objects.compose', _error(404, 'Source object not found')
+            size = sum(int(source['size']) for source in sources)
+            crc32c = 0
+            for source in sources:
+                part_crc = int.from_bytes(base64.b64decode(source['crc32c']), 'big')
+                crc32c = combine_crc32c(crc32c, part_crc, int(source['size']))
+            # Composite objects carry a crc32c but no md5, like the real service
+            obj = storage.finish(bucket_name, name, request.get('destination', {}), size,
+                                 None, crc32c.to_bytes(4, 'big'))
+            obj['componentCount'] = len(sources)
+            return 'gcs.objects.compose', _json(200, obj)
+
+        obj = bucket.get(name)
+        if obj is None:
+            return f"gcs.objects.{method.lower()}", _error(404, f"Object {name} not found")
+        if method == 'GET':
+            return 'gcs.objects.get', _object(obj)
+        if method == 'PATCH':
+            with storage.lock:
+                obj.update(json.loads(body or b'{}'))
+                obj['metageneration'] = str(int(obj['metageneration']) + 1)
+            return 'gcs.objects.patch', _json(200, obj)
+        if method == 'DELETE':
+            with storage.lock:
+                bucket.pop(name, None)
+            return 'gcs.objects.delete', (204, {}, b'')
+        return 'gcs.unknown', _error(405, f"{method} not supported")
+
+    def _upload(self, method: str, path: str, query: Dict[str, str], headers,
+                body: bytes) -> Tuple[str, Response]:
+        storage = self.storage
+        bucket_name = path[len('/upload/storage/v1/b/'):].split('/', 1)[0]
+        if bucket_name not in storage.buckets:
+            return 'gcs.upload', _error(404, f"Bucket {bucket_name} not found")
+        upload_type = query.get('uploadType')
+
+        if upload_type == 'multipart':
+            message = email.message_from_bytes(
+                f"Content-Type: {headers.get('content-type')}\r\n\r\n".encode() + body
+            )
+            resource_part, media_part = message.get_payload()
+            resource = json.loads(resource_part.get_payload())
+            data = media_part.get_payload(decode=True)
+            obj = storage.finish(bucket_name, resource.get('name') or query['name'], resource, len(data),
+                                 hashlib.md5(data).digest(), google_crc32c.Checksum(data).digest())
+            return 'gcs.upload.multipart', _object(obj)
+
+        if upload_type == 'resumable' and method == 'POST':
+            resource = json.loads(body or b'{}')
+            upload_id = uuid.uuid4().hex
+            with storage.lock:
+                storage.uploads[upload_id] = {
+                    'bucket': bucket_name, 'name': resource.get('name') or query.get('name'),
+                    'resource': resource, 'size': 0,
+                    'md5': hashlib.md5(), 'crc32c': google_crc32c.Checksum(),
+                }
+            host = headers.get('host', 'localhost')
+            location = f"http://{host}{path}?uploadType=resumable&upload_id={upload_id}"
+            return 'gcs.upload.start', (200, {'Location': location, 'Content-Length': '0'}, b'')
+
+        if upload_type == 'resumable' and method == 'PUT':
+            upload = storage.uploads.get(query.get('upload_id', ''))
+            if upload is None:
+                return 'gcs.upload.chunk', _error(404, 'Upload session not found')
+            m = re.match(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', headers.get('content-range', ''))
+            if m is None:
+                return 'gcs.upload.chunk', _error(400, 'Bad Content-Range', 'invalid')
+            if m.group(1) is not None and int(m.group(1)) != upload['size']:
+                return 'gcs.upload.chunk', _error(400, 'Chunk does not continue the upload', 'invalid')
+            upload['md5'].update(body)
+            upload['crc32c'].update(body)
+            upload['size'] += len(body)
+            if m.group(3) == '*':
+                return 'gcs.upload.chunk', (308, {'Range': f"bytes=0-{upload['size'] - 1}"}, b'')
+            with storage.lock:
+                storage.uploads.pop(query['upload_id'], None)
+            obj = storage.finish(upload['bucket'], upload['name'], upload['resource'], upload['size'],
+                                 upload['md5'].digest(), upload['crc32c'].digest())
+            return 'gcs.upload.finish', _object(obj)
+
+        return 'gcs.upload', _error(400, f"Unsupported upload {method} {upload_type}", 'invalid')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, every
+    # keep-alive response would wait out the client's delayed ACK
+    disable_nagle_algorithm = True
+    emulator: Emulator
+
+    def _dispatch(self) -> None:
+        start = time.perf_counter()
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.emulator.latency:
+            time.sleep(self.emulator.latency)
+        try:
+            endpoint, (status, headers, payload) = self.emulator.handle(
+                self.command, self.path, self.headers, body
+            )
+        except Exception as e:
+            endpoint, (status, headers, payload) = 'error', _error(500, f"{type(e).__name__}: {e}",
+                                                                   'backendError')
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload and self.command != 'HEAD':
+            self.wfile.write(payload)
+        if endpoint != '_stats':
+            self.emulator.record(endpoint, time.perf_counter() - start)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def serve(n: int, latency_ms: float = 0.0, port: int = 0,
+          ready: Optional[Callable[[int], None]] = None) -> None:
+    """Build the fake Drive, then serve Drive and Cloud Storage on 127.0.0.1 until killed"""
+    handler = type('Handler', (_Handler,), {'emulator': Emulator(FakeDrive(n), latency_ms)})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready(server.server_address[1])
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+
+    files = 1000
+    port = 8080
+    for arg in sys.argv:
+        if arg.startswith('--files='):
+            files = int(arg.split('=')[1])
+        elif arg.startswith('--port='):
+            port = int(arg.split('=')[1])
+    print(f"Serving a fake Drive of {files:,} files and Cloud Storage on http://127.0.0.1:{port}/")
+    print(f"  export GOOGLE_API_EMULATOR_HOST=http://127.0.0.1:{port}/")
+    print(f"  export STORAGE_EMULATOR_HOST=http://127.0.0.1:{port}")
+    serve(files, port=port)
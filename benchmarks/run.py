@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the explorer and the Drive maintenance scripts
+Runs JobsDataExplorer against an in-process fake BigQuery client and
+migrate_csvs_to_gcs / cleanup_old_csvs / check_drive_storage against a
+local Drive + Cloud Storage stand-in, at 1k/100k/1M-object scales. Each
+case runs in its own process so peak memory is its own; results are
+written as JSON and can be compared against a saved baseline.
+
+Usage:
+    python benchmarks/run.py --scales=1k,100k
+    python benchmarks/run.py --cases=migrate --compare=.cache/benchmarks/baseline.json
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [REPO_DIR, BENCH_DIR]
+
+CASES = ('explorer', 'migrate', 'cleanup', 'storage')
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_DIR, '.cache', 'benchmarks')
+
+# Compared against a baseline: (metric, True when higher is better)
+TRACKED_METRICS = (
+    ('wall_s', False),
+    ('cpu_s', False),
+    ('objects_per_s', True),
+    ('p95_ms', False),
+    ('peak_rss_mb', False),
+)
+REGRESSION_THRESHOLD = 0.10
+
+
+def _rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class FakeGoogleServer:
+    """The Drive + Cloud Storage stand-in, in a child process"""
+
+    def __init__(self, n: int, latency_ms: float):
+        from fake_google import serve
+
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=serve, args=(n, latency_ms, 0, ready.put), daemon=True)
+        self.process.start()
+        # Building the fake Drive takes a while at 1M files
+        self.url = f"http://127.0.0.1:{ready.get(timeout=900)}"
+
+    def stats(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(f"{self.url}/_stats") as response:
+            return json.load(response)
+
+    def close(self) -> None:
+        self.process.terminate()
+        self.process.join()
+
+
+# Cases: each sets up, then returns a run() callable whose result describes
+# the work done (objects, bytes, per-request latencies, problems found)
+
+def _explorer_case(n: int, options: Dict[str, Any]) -> Callable[[], Dict[str, Any]]:
+    import asyncio
+
+    from fake_bigquery import DATASET, TABLE, FakeBigQueryClient, fake_bigquery, synthetic_jobs
+
+    from explorer_metrics import MetricsRecorder
+    from incremental_sync import IncrementalSync
+    from run_profile import RunProfile
+
+    client = FakeBigQueryClient(synthetic_jobs(n), latency_ms=options['bq_latency_ms'])
+    profile = RunProfile('explorer', summary_path=None)
+    with fake_bigquery(client):
+        from async_explorer import AsyncJobsDataExplorer
+        from bq_explorer import JobsDataExplorer
+        explorer = JobsDataExplorer(metrics=MetricsRecorder(sinks=[profile]))
+        # Snapshot and search-index builds stream column projections
+        local = JobsDataExplorer(backend='snapshot', metrics=MetricsRecorder(sinks=[profile]))
+    sync = IncrementalSync(explorer)
+
+    def async_query() -> int:
+        async def count() -> int:
+            async with AsyncJobsDataExplorer(explorer) as async_explorer:
+                sql = f"SELECT COUNT(*) as count FROM {explorer.table_ref(DATASET, TABLE)}"
+                df = await async_explorer.query(sql, use_cache=False)
+            return int(df['count'].iloc[0])
+        return asyncio.run(count())
+
+    def run() -> Dict[str, Any]:
+        latencies = []
+
+        def timed(call, *args, **kwargs):
+            profile.phase(call.__name__)
+            start = time.perf_counter()
+            result = call(*args, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), profile:
+            timed(explorer.list_datasets)
+            timed(explorer.list_tables, DATASET)
+            bundle = timed(explorer.dashboard_bundle, limit=10)
+            top = timed(explorer.get_top_companies, limit=10)
+            timed(explorer.search_jobs, 'pytorch')
+            local_top = timed(local.get_top_companies, limit=10)
+            timed(local.search_jobs, 'pytorch')
+            timed(local.refresh_search_index)
+            first_sync = timed(sync.sync, DATASET, TABLE, columns=['data_company'])
+            second_sync = timed(sync.sync, DATASET, TABLE, columns=['data_company'])
+            async_count = timed(async_query)
+
+        problems = []
+        # Ties may come back in either order, so compare the counts
+        if list(bundle['top_companies']['job_count']) != list(top['job_count']):
+            problems.append("dashboard_bundle top companies differ from get_top_companies")
+        if list(local_top['job_count']) != list(top['job_count']):
+            problems.append("snapshot top companies differ from get_top_companies")
+        if first_sync['inserted'] != n or second_sync['fetched']:
+            problems.append(f"incremental sync pulled {first_sync['inserted']:,} then "
+                            f"{second_sync['fetched']:,} rows (expected {n:,} then 0)")
+        if async_count != n:
+            problems.append(f"async query counted {async_count:,} rows, expected {n:,}")
+        return {
+            'objects': n,
+            'bytes': client.table_bytes,
+            'latencies_ms': [t * 1000 for t in latencies],
+            'api_calls': sum(client.calls.values()),
+            'phases': profile.summary['phases'],
+            'problems': problems,
+        }
+
+    return run
+
+
+def _drive_case(case: str, n: int, options: Dict[str, Any]) -> Callable[[], Dict[str, Any]]:
+    server = FakeGoogleServer(n, options['latency_ms'])
+    os.environ['GOOGLE_API_EMULATOR_HOST'] = server.url + '/'
+    os.environ['STORAGE_EMULATOR_HOST'] = server.url
+
+    from rate_limit import ApiGovernor, set_governor
+    from run_profile import RunProfile
+    # Nothing to pace against locally; keep retries quick
+    set_governor(ApiGovernor(rate=1e9, max_concurrency=options['concurrency'], base_delay=0.05, max_delay=1.0))
+
+    use_mirror = options['mirror']
+    if case == 'migrate':
+        from migrate_csvs_to_gcs import migrate_csvs_to_gcs
+        script = lambda: migrate_csvs_to_gcs(dry_run=False, concurrency=options['concurrency'],
+                                             use_mirror=use_mirror)
+    elif case == 'cleanup':
+        from cleanup_old_csvs import cleanup_csvs
+        script = lambda: cleanup_csvs(days_old=30, dry_run=False, use_mirror=use_mirror)
+    else:
+        from check_drive_storage import check_storage
+        script = lambda: check_storage(use_mirror=use_mirror)
+
+    def run() -> Dict[str, Any]:
+        before = server.stats()
+        with open('script.log', 'w') as log, contextlib.redirect_stdout(log), \
+                RunProfile(case, summary_path=None) as profile:
+            script()
+        after = server.stats()
+        server.close()
+        with open('script.log') as log:
+            problems = [line.strip() for line in log if '❌' in line]
+
+        if case == 'migrate':
+            objects = before['drive_csv_files'] - after['drive_csv_files']
+            if after['drive_csv_files']:
+                problems.append(f"{after['drive_csv_files']:,} CSVs left in Drive")
+        elif case == 'cleanup':
+            objects = before['drive_files'] - after['drive_files']
+            if not objects:
+                problems.append("No files deleted")
+        else:
+            objects = before['drive_files']
+        if 'error' in after['requests']:
+            problems.append(f"{after['requests']['error']['count']} requests failed in the fake server")
+
+        latency = after['requests'].get('all', {})
+        return {
+            'objects': objects,
+            'bytes': after['gcs_bytes'] if case == 'migrate' else 0,
+            'p50_ms': latency.get('p50_ms'),
+            'p95_ms': latency.get('p95_ms'),
+            'api_calls': latency.get('count', 0),
+            'requests': after['requests'],
+            'phases': profile.summary['phases'],
+            'problems': problems[:20],
+        }
+
+    return run
+
+
+def run_worker(case: str, n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Set up and run one case in this process"""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{case}-")
+    os.chdir(workdir)
+
+    setup_start = time.perf_counter()
+    run = _explorer_case(n, options) if case == 'explorer' else _drive_case(case, n, options)
+    setup_s = time.perf_counter() - setup_start
+    setup_rss = _rss_mb()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    outcome = run()
+    wall_s = time.perf_counter() - wall_start
+    cpu_s = time.process_time() - cpu_start
+
+    latencies = outcome.pop('latencies_ms', None)
+    if latencies is not None:
+        outcome['p50_ms'] = _percentile(latencies, 0.5)
+        outcome['p95_ms'] = _percentile(latencies, 0.95)
+    return {
+        'case': case,
+        'scale': n,
+        'setup_s': round(setup_s, 3),
+        'wall_s': round(wall_s, 3),
+        'cpu_s': round(cpu_s, 3),
+        'objects_per_s': round(outcome['objects'] / wall_s, 1) if wall_s else None,
+        'mb_per_s': round(outcome['bytes'] / (1024 * 1024) / wall_s, 2) if wall_s else None,
+        'setup_rss_mb': round(setup_rss, 1),
+        'peak_rss_mb': round(_rss_mb(), 1),
+        'workdir': workdir,
+        **outcome,
+        'valid': not outcome['problems'],
+    }
+
+
+def run_case(case: str, n: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in a fresh interpreter and return its result"""
+    command = [sys.executable, os.path.abspath(__file__), '--worker', f"--case={case}", f"--scale={n}",
+               f"--latency-ms={options['latency_ms']}", f"--bq-latency-ms={options['bq_latency_ms']}",
+               f"--concurrency={options['concurrency']}"]
+    if options['mirror']:
+        command.append('--mirror')
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'case': case, 'scale': n, 'valid': False,
+                'problems': [completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                             else f"exit {completed.returncode}"]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _median_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The repeat with the median wall time, plus the spread of all of them"""
+    valid = [r for r in results if 'wall_s' in r]
+    if not valid:
+        return results[0]
+    ordered = sorted(valid, key=lambda r: r['wall_s'])
+    result = dict(ordered[len(ordered) // 2])
+    if len(valid) > 1:
+        result['wall_s_runs'] = [r['wall_s'] for r in valid]
+        result['wall_s_stdev'] = round(statistics.stdev(result['wall_s_runs']), 3)
+    return result
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str,
+            threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Regressions of more than `threshold` against a baseline results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['scale']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result['case'], result['scale']))
+        if before is None:
+            continue
+        for metric, higher_is_better in TRACKED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{result['case']} @ {result['scale']:,}: {metric} "
+                                   f"{old:,.2f} → {new:,.2f} ({change:+.0%})")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    cases = list(CASES)
+    scales = ['1k']
+    output = None
+    baseline = None
+    repeat = 1
+    threshold = REGRESSION_THRESHOLD
+    options = {'latency_ms': 0.0, 'bq_latency_ms': 0.0, 'concurrency': 8, 'mirror': '--mirror' in sys.argv}
+    case, scale = None, None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--cases='):
+            cases = arg.split('=')[1].split(',')
+        elif arg.startswith('--scales='):
+            scales = arg.split('=')[1].split(',')
+        elif arg.startswith('--output='):
+            output = arg.split('=')[1]
+        elif arg.startswith('--compare='):
+            baseline = arg.split('=')[1]
+        elif arg.startswith('--repeat='):
+            repeat = max(1, int(arg.split('=')[1]))
+        elif arg.startswith('--threshold='):
+            threshold = float(arg.split('=')[1])
+        elif arg.startswith('--latency-ms='):
+            options['latency_ms'] = float(arg.split('=')[1])
+        elif arg.startswith('--bq-latency-ms='):
+            options['bq_latency_ms'] = float(arg.split('=')[1])
+        elif arg.startswith('--concurrency='):
+            options['concurrency'] = int(arg.split('=')[1])
+        elif arg.startswith('--case='):
+            case = arg.split('=')[1]
+        elif arg.startswith('--scale='):
+            scale = int(arg.split('=')[1])
+
+    if '--worker' in sys.argv:
+        print(json.dumps(run_worker(case, scale, options), default=str))
+        return
+
+    unknown = [c for c in cases if c not in CASES] + [s for s in scales if s not in SCALES]
+    if unknown:
+        sys.exit(f"Unknown cases/scales: {', '.join(unknown)} (cases: {', '.join(CASES)}; "
+                 f"scales: {', '.join(SCALES)})")
+
+    print("=" * 80)
+    print("⏱️  OFFLINE BENCHMARKS")
+    print("=" * 80)
+    print(f"\n     Cases: {', '.join(cases)}  |  Scales: {', '.join(scales)}  |  Repeats: {repeat}")
+    print(f"     Fake latency: {options['latency_ms']:g} ms per Drive/GCS request, "
+          f"{options['bq_latency_ms']:g} ms per BigQuery call")
+
+    results = []
+    for label in scales:
+        for name in cases:
+            print(f"\n     ▶ {name} @ {label}...", flush=True)
+            result = _median_result([run_case(name, SCALES[label], options) for _ in range(repeat)])
+            results.append(result)
+            if 'wall_s' not in result:
+                print(f"        ❌ {result['problems'][0]}")
+                continue
+            p95 = f"{result['p95_ms']:.1f} ms" if result.get('p95_ms') is not None else 'n/a'
+            print(f"        {result['wall_s']:.2f}s wall, {result['cpu_s']:.2f}s CPU | "
+                  f"{result['objects_per_s']:,.0f} objects/s, {result['mb_per_s']:.2f} MB/s | "
+                  f"p95 {p95} | peak {result['peak_rss_mb']:.0f} MB")
+            for problem in result['problems'][:3]:
+                print(f"        ❌ {problem}")
+
+    output = output or os.path.join(DEFAULT_OUTPUT_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'options': options,
+            'results': results,
+        }, f, indent=2, default=str)
+    print(f"\n     💾 Results: {output}")
+
+    failed = [r for r in results if not r.get('valid')]
+    regressions = compare(results, baseline, threshold) if baseline else []
+    if baseline:
+        print(f"\n     📊 Against {baseline}: {len(regressions)} regressions over {threshold:.0%}")
+        for regression in regressions:
+            print(f"        ⚠️  {regression}")
+
+    print("\n" + "=" * 80)
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Startup-time guard for the mobius entry point
+Times `mobius.py --help` and `mobius.py <command> --help` in fresh
+interpreters against a bare `python -c pass`, and fails when a help path
+goes over its budget or imports any of the heavy client libraries. Each
+command script's own import time is recorded too, so its cold start can
+be tracked across runs.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --budget-ms=30 --repeat=9 --output=.cache/benchmarks/startup.json
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Set
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from mobius import COMMANDS  # noqa: E402
+
+# Milliseconds a help path may add to bare interpreter startup
+DEFAULT_BUDGET_MS = 50.0
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'google.cloud.bigquery', 'google.cloud.storage',
+                 'googleapiclient.discovery', 'grpc')
+
+
+def _imported(args: List[str]) -> Set[str]:
+    """Modules a fresh interpreter imports for `args`, from -X importtime"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True)
+    modules = set()
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith('import time:') and not line.rstrip().endswith('imported package'):
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return modules
+
+
+def _timed(args: List[str], repeat: int) -> Dict[str, object]:
+    """Median wall time over `repeat` fresh interpreters (without -X importtime overhead)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_DIR, capture_output=True, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(times), 1), 'runs_ms': [round(t, 1) for t in times]}
+
+
+def _heavy(modules: Set[str]) -> List[str]:
+    """The HEAVY_MODULES (or their submodules) among `modules`"""
+    return [h for h in HEAVY_MODULES if any(m == h or m.startswith(h + '.') for m in modules)]
+
+
+def main():
+    budget_ms = DEFAULT_BUDGET_MS
+    repeat = 5
+    output = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--budget-ms='):
+            budget_ms = float(arg.split('=')[1])
+        elif arg.startswith('--repeat='):
+            repeat = max(1, int(arg.split('=')[1]))
+        elif arg.startswith('--output='):
+            output = arg.split('=')[1]
+
+    print("=" * 80)
+    print("🚀 MOBIUS STARTUP TIME")
+    print("=" * 80)
+
+    baseline = _timed(['-c', 'pass'], repeat)['median_ms']
+    print(f"\n     Bare interpreter: {baseline:.1f} ms (median of {repeat})")
+    print(f"     Budget: +{budget_ms:.0f} ms and no {', '.join(HEAVY_MODULES)} on help paths")
+
+    problems = []
+    help_paths = {'mobius --help': ['mobius.py', '--help']}
+    help_paths.update({f"mobius {name} --help": ['mobius.py', name, '--help'] for name in COMMANDS})
+
+    print("\n[1/2] ⏱️  Help paths...")
+    results = {}
+    for label, args in help_paths.items():
+        timing = _timed(args, repeat)
+        heavy = _heavy(_imported(args))
+        overhead = timing['median_ms'] - baseline
+        ok = overhead <= budget_ms and not heavy
+        results[label] = {**timing, 'overhead_ms': round(overhead, 1), 'heavy_imports': heavy, 'ok': ok}
+        print(f"     {'✅' if ok else '❌'} {label:<28}{timing['median_ms']:>8.1f} ms ({overhead:+.1f})")
+        if heavy:
+            problems.append(f"{label} imports {', '.join(heavy)}")
+        elif overhead > budget_ms:
+            problems.append(f"{label} adds {overhead:.1f} ms, over the {budget_ms:.0f} ms budget")
+
+    print("\n[2/2] 📦 Command imports (tracked, not budgeted)...")
+    imports = {}
+    for name, (module, _, _) in COMMANDS.items():
+        timing = _timed(['-c', f"import {module}"], repeat)
+        heavy = _heavy(_imported(['-c', f"import {module}"]))
+        imports[name] = {'module': module, **timing, 'heavy_imports': heavy}
+        print(f"     {name:<10}{timing['median_ms']:>8.1f} ms  ({', '.join(heavy) or 'no heavy imports'})")
+
+    if output:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'baseline_ms': baseline,
+                'budget_ms': budget_ms,
+                'help_paths': results,
+                'command_imports': imports,
+            }, f, indent=2)
+        print(f"\n     💾 Results: {output}")
+
+    print("\n" + "=" * 80)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
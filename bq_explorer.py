@@ -5,53 +5,264 @@ Provides utilities to explore and analyze job market data
 """
 
 from google.cloud import bigquery
-from typing import List, Dict, Any, Optional
+from google.api_core.exceptions import GoogleAPIError
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import pandas as pd
-from datetime import datetime
+import re
+import threading
+import time
+import warnings
+from datetime import date, datetime
+
+from explorer_metrics import MetricsRecorder, instrumented
+from iter_utils import prefetch
+from query_cache import TABLE_REF_PATTERN, QueryCache, referenced_tables, view_source_tables
+from run_profile import RunProfile, phase, profile_run
+from search_index import DEFAULT_INDEX_DIR, SearchIndex
+from snapshot_engine import DEFAULT_SNAPSHOT_DIR, SnapshotEngine
+
+
+def _local_datetime(value) -> datetime:
+    """Convert epoch milliseconds or an aware timestamp to a naive local datetime"""
+    if isinstance(value, datetime):
+        return datetime.fromtimestamp(value.timestamp())
+    return datetime.fromtimestamp(int(value) / 1000)
+
+
+def _query_parameters(params: Dict[str, Any]) -> List[bigquery.ScalarQueryParameter]:
+    """Map a {name: value} dict to typed BigQuery scalar parameters"""
+    parameters = []
+    for name, value in params.items():
+        # bool is checked before int because it subclasses int
+        if isinstance(value, bool):
+            param_type = "BOOL"
+        elif isinstance(value, int):
+            param_type = "INT64"
+        elif isinstance(value, float):
+            param_type = "FLOAT64"
+        elif isinstance(value, datetime):
+            param_type = "TIMESTAMP"
+        elif isinstance(value, date):
+            param_type = "DATE"
+        else:
+            param_type = "STRING"
+        parameters.append(bigquery.ScalarQueryParameter(name, param_type, value))
+    return parameters
+
+
+def _format_bytes(num_bytes: int) -> str:
+    """Human-readable byte count"""
+    return f"{num_bytes / (1024 ** 3):.2f} GB" if num_bytes >= 1024 ** 3 else f"{num_bytes / (1024 ** 2):.1f} MB"
+
+
+# Dataset/table names (and project ids, which may contain hyphens)
+IDENTIFIER_PATTERN = re.compile(r"^[\w-]+$")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a query's dry-run estimate breaks a configured byte budget"""
+
 
 class JobsDataExplorer:
     """Explorer class for jobs-data-linkedin BigQuery datasets"""
     
-    def __init__(self, project_id: str = "jobs-data-linkedin"):
-        """Initialize the explorer with BigQuery client"""
+    BACKENDS = ("bigquery", "snapshot")
+    # Cached results over a view whose sources can't all be looked up expire this often
+    UNRESOLVED_VIEW_TTL_SECONDS = 300
+    OVER_BUDGET_POLICIES = ("reject", "sample")
+    TABLE_INFO_COLUMNS = ['table_id', 'type', 'num_rows', 'size_mb', 'created', 'modified']
+    
+    def __init__(self, project_id: str = "jobs-data-linkedin",
+                 cache: Optional[QueryCache] = None,
+                 catalog_region: str = "us",
+                 metadata_workers: int = 8,
+                 backend: str = "bigquery",
+                 snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+                 index_dir: str = DEFAULT_INDEX_DIR,
+                 max_bytes_per_query: Optional[int] = None,
+                 max_bytes_per_session: Optional[int] = None,
+                 over_budget: str = "reject",
+                 sample_percent: float = 10,
+                 metrics: Optional[MetricsRecorder] = None):
+        """
+        Initialize the explorer with BigQuery client and optional result cache.
+        
+        backend="snapshot" answers the specialized aggregate methods from a
+        local columnar snapshot of the table, and search_jobs from a local
+        inverted index (both built on first use), instead of scanning the
+        table in BigQuery.
+        
+        When a byte budget is set, every query is dry-run first. A query whose
+        estimate exceeds max_bytes_per_query, or would push the session past
+        max_bytes_per_session, is rejected (over_budget="reject") or rewritten
+        to read a TABLESAMPLE of sample_percent of each table
+        (over_budget="sample") if that variant fits.
+        
+        A MetricsRecorder passed as metrics times every public method call
+        and attaches its jobs' BigQuery statistics.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}, got {backend!r}")
+        if over_budget not in self.OVER_BUDGET_POLICIES:
+            raise ValueError(f"over_budget must be one of {self.OVER_BUDGET_POLICIES}, got {over_budget!r}")
         self.project_id = project_id
         self.client = bigquery.Client(project=project_id)
+        self.cache = cache
+        self.catalog_region = catalog_region
+        self.metadata_workers = metadata_workers
+        self.backend = backend
+        self.snapshot_dir = snapshot_dir
+        self._snapshots: Dict[str, SnapshotEngine] = {}
+        self.index_dir = index_dir
+        self._search_indexes: Dict[str, SearchIndex] = {}
+        # One lock per local snapshot/index, held while it is built or loaded
+        self._local_locks: Dict[str, threading.Lock] = {}
+        self._local_locks_guard = threading.Lock()
+        self.max_bytes_per_query = max_bytes_per_query
+        self.max_bytes_per_session = max_bytes_per_session
+        self.over_budget = over_budget
+        self.sample_percent = sample_percent
+        self.session_bytes_processed = 0
+        self.last_estimate: Optional[int] = None
+        self._usage_lock = threading.Lock()
+        self.metrics = metrics
         
-    def list_datasets(self) -> pd.DataFrame:
+    @instrumented
+    def list_datasets(self, bulk: bool = True) -> pd.DataFrame:
         """List all datasets in the project with metadata"""
         datasets = list(self.client.list_datasets())
+        dataset_ids = [dataset.dataset_id for dataset in datasets]
         
-        dataset_info = []
-        for dataset in datasets:
-            dataset_ref = self.client.get_dataset(dataset.dataset_id)
-            dataset_info.append({
-                'dataset_id': dataset.dataset_id,
-                'location': dataset_ref.location,
-                'created': datetime.fromtimestamp(int(dataset_ref.created) / 1000),
-                'modified': datetime.fromtimestamp(int(dataset_ref.modified) / 1000),
-            })
+        # One INFORMATION_SCHEMA query covers every dataset in the default region;
+        # anything it misses (other regions, no permission) is fetched concurrently
+        info = {}
+        if bulk and dataset_ids:
+            try:
+                info = self._bulk_dataset_info()
+            except GoogleAPIError:
+                info = {}
+        missing = [d for d in dataset_ids if d not in info]
+        info.update(self._fetch_concurrently(self._fetch_dataset_info, missing))
         
+        dataset_info = [info[d] for d in dataset_ids]
         df = pd.DataFrame(dataset_info)
         return df.sort_values('created', ascending=False)
     
-    def list_tables(self, dataset_id: str) -> pd.DataFrame:
+    @instrumented
+    def list_tables(self, dataset_id: str, bulk: bool = True) -> pd.DataFrame:
         """List all tables/views in a dataset"""
         tables = list(self.client.list_tables(dataset_id))
+        table_types = {table.table_id: table.table_type for table in tables}
+        
+        info = {}
+        if bulk and tables:
+            try:
+                info = self._bulk_table_info(dataset_id)
+            except GoogleAPIError:
+                info = {}
+        missing = [t for t in table_types if t not in info]
+        info.update(self._fetch_concurrently(
+            lambda table_id: self._fetch_table_info(dataset_id, table_id), missing
+        ))
         
         table_info = []
-        for table in tables:
-            table_ref = self.client.get_table(f"{self.project_id}.{dataset_id}.{table.table_id}")
-            table_info.append({
-                'table_id': table.table_id,
-                'type': table.table_type,
-                'num_rows': table_ref.num_rows if hasattr(table_ref, 'num_rows') else None,
-                'size_mb': round(table_ref.num_bytes / (1024 * 1024), 2) if hasattr(table_ref, 'num_bytes') and table_ref.num_bytes else None,
-                'created': table_ref.created,
-                'modified': table_ref.modified,
-            })
+        for table_id, table_type in table_types.items():
+            row = dict(info[table_id])
+            row['type'] = table_type
+            table_info.append(row)
         
-        return pd.DataFrame(table_info)
+        return pd.DataFrame(table_info, columns=self.TABLE_INFO_COLUMNS)
+    
+    # Catalog metadata helpers
     
+    def _fetch_concurrently(self, fetch, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Run one metadata fetch per id on a bounded thread pool"""
+        if not ids:
+            return {}
+        workers = min(self.metadata_workers, len(ids))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(ids, pool.map(fetch, ids)))
+    
+    def _fetch_dataset_info(self, dataset_id: str) -> Dict[str, Any]:
+        """Fetch one dataset's metadata with a get_dataset round trip"""
+        dataset_ref = self.client.get_dataset(dataset_id)
+        return {
+            'dataset_id': dataset_id,
+            'location': dataset_ref.location,
+            'created': _local_datetime(dataset_ref.created),
+            'modified': _local_datetime(dataset_ref.modified),
+        }
+    
+    def _fetch_table_info(self, dataset_id: str, table_id: str) -> Dict[str, Any]:
+        """Fetch one table's metadata with a get_table round trip"""
+        table_ref = self.client.get_table(f"{self.project_id}.{dataset_id}.{table_id}")
+        return {
+            'table_id': table_id,
+            'num_rows': table_ref.num_rows,
+            'size_mb': round(table_ref.num_bytes / (1024 * 1024), 2) if table_ref.num_bytes else None,
+            'created': table_ref.created,
+            'modified': table_ref.modified,
+        }
+    
+    def _bulk_dataset_info(self) -> Dict[str, Dict[str, Any]]:
+        """Fetch metadata for every dataset in the catalog region in one query"""
+        sql = f"""
+        SELECT
+            schema_name,
+            location,
+            creation_time,
+            last_modified_time
+        FROM `{self.project_id}.region-{self.catalog_region}`.INFORMATION_SCHEMA.SCHEMATA
+        """
+        df = self.query(sql, max_results=None, use_cache=False)
+        
+        return {
+            row.schema_name: {
+                'dataset_id': row.schema_name,
+                'location': row.location,
+                'created': _local_datetime(row.creation_time),
+                'modified': _local_datetime(row.last_modified_time),
+            }
+            for row in df.itertuples(index=False)
+        }
+    
+    def _bulk_table_info(self, dataset_id: str) -> Dict[str, Dict[str, Any]]:
+        """Fetch metadata for every table/view in a dataset in one query"""
+        self.table_ref(dataset_id, 'TABLES')
+        location = self.client.get_dataset(dataset_id).location
+        # __TABLES__ holds the same last-modified time tables.get reports as
+        # `modified` (for views too); TABLE_STORAGE only tracks storage writes
+        sql = f"""
+        SELECT
+            t.table_name,
+            s.total_rows,
+            s.total_logical_bytes,
+            t.creation_time,
+            TIMESTAMP_MILLIS(m.last_modified_time) AS modified
+        FROM `{self.project_id}.{dataset_id}`.INFORMATION_SCHEMA.TABLES AS t
+        JOIN `{self.project_id}.{dataset_id}`.__TABLES__ AS m
+          ON m.table_id = t.table_name
+        LEFT JOIN `{self.project_id}.region-{location.lower()}`.INFORMATION_SCHEMA.TABLE_STORAGE AS s
+          ON s.project_id = t.table_catalog
+         AND s.table_schema = t.table_schema
+         AND s.table_name = t.table_name
+        """
+        df = self.query(sql, max_results=None, use_cache=False)
+        
+        return {
+            row.table_name: {
+                'table_id': row.table_name,
+                'num_rows': None if pd.isna(row.total_rows) else int(row.total_rows),
+                'size_mb': round(row.total_logical_bytes / (1024 * 1024), 2)
+                           if not pd.isna(row.total_logical_bytes) and row.total_logical_bytes else None,
+                'created': row.creation_time.to_pydatetime(),
+                'modified': row.modified.to_pydatetime(),
+            }
+            for row in df.itertuples(index=False)
+        }
+    
+    @instrumented
     def get_schema(self, dataset_id: str, table_id: str) -> List[Dict[str, str]]:
         """Get schema for a specific table"""
         table_ref = self.client.get_table(f"{self.project_id}.{dataset_id}.{table_id}")
@@ -67,36 +278,288 @@ class JobsDataExplorer:
         
         return schema
     
-    def query(self, sql: str, max_results: int = 1000) -> pd.DataFrame:
-        """Execute a SQL query and return results as DataFrame"""
-        query_job = self.client.query(sql)
+    def table_ref(self, dataset_id: str, table_id: str) -> str:
+        """
+        Quoted `project.dataset.table` reference for interpolation into SQL.
+        
+        BigQuery cannot bind identifiers as query parameters, so they are
+        validated instead.
+        """
+        for part in (self.project_id, dataset_id, table_id):
+            if not IDENTIFIER_PATTERN.match(part):
+                raise ValueError(f"Invalid BigQuery identifier: {part!r}")
+        return f"`{self.project_id}.{dataset_id}.{table_id}`"
+    
+    @instrumented
+    def query(self, sql: str, max_results: Optional[int] = 1000, use_cache: bool = True,
+              params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Execute a SQL query (with optional @named parameters) and return results as DataFrame"""
+        cached = self._cache_lookup(sql, max_results, params) if use_cache else None
+        if cached is not None and cached[0] is not None:
+            MetricsRecorder.record_cache_hit()
+            return cached[0]
+        
+        df, sampled = self._run_query(sql, max_results, params)
+        # A TABLESAMPLE stand-in must never be served later as the full result
+        if cached is not None and not sampled:
+            self.cache.put(cached[1], df, referenced_tables(sql))
+        return df
+    
+    def query_iter(self, sql: str, chunk_size: int = 10000, as_arrow: bool = False,
+                   prefetch_pages: int = 1,
+                   params: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        Execute a SQL query and stream the full result in bounded chunks.
+        
+        Yields DataFrames (or pyarrow RecordBatches with as_arrow=True) of at
+        most chunk_size rows. The next page is fetched in the background while
+        the caller processes the current one, so memory stays at roughly
+        (prefetch_pages + 1) pages regardless of result size.
+        """
+        sql = self._preflight(sql, params)
+        query_job = self.client.query(sql, job_config=self._job_config(params))
+        results = query_job.result(page_size=chunk_size)
+        self._record_usage(query_job)
+        MetricsRecorder.record_job(query_job)
+        pages = results.to_arrow_iterable() if as_arrow else results.to_dataframe_iterable()
+        
+        for page in prefetch(pages, depth=prefetch_pages):
+            # The Storage Read API may hand back larger streams than page_size
+            for start in range(0, len(page), chunk_size):
+                if as_arrow:
+                    yield page.slice(start, chunk_size)
+                else:
+                    yield page.iloc[start:start + chunk_size]
+    
+    @instrumented
+    def estimate_bytes(self, sql: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Dry-run a query and return the bytes it would process"""
+        query_job = self.client.query(sql, job_config=self._job_config(params, dry_run=True))
+        return query_job.total_bytes_processed or 0
+    
+    def _run_query(self, sql: str, max_results: Optional[int],
+                   params: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, bool]:
+        """Run a query job in BigQuery and wait for its results; also returns whether it was sampled"""
+        query_job, sampled = self._submit(sql, params)
+        return self._collect(query_job, max_results), sampled
+    
+    def _submit(self, sql: str,
+                params: Optional[Dict[str, Any]] = None) -> Tuple[bigquery.QueryJob, bool]:
+        """
+        Check budgets and start a query job without waiting for it.
+        
+        Returns the job and whether the budget check rewrote the query to a
+        TABLESAMPLE, in which case its results must not be cached as sql's.
+        """
+        run_sql = self._preflight(sql, params)
+        return self.client.query(run_sql, job_config=self._job_config(params)), run_sql != sql
+    
+    def _collect(self, query_job: bigquery.QueryJob, max_results: Optional[int]) -> pd.DataFrame:
+        """Wait for a submitted job and download its results"""
         results = query_job.result(max_results=max_results)
+        self._record_usage(query_job)
+        MetricsRecorder.record_job(query_job)
+        if max_results is not None and results.total_rows and results.total_rows > max_results:
+            warnings.warn(
+                f"Query returned {results.total_rows:,} rows; only the first {max_results:,} "
+                "were fetched. Use query_iter() to stream the full result.",
+                stacklevel=4,
+            )
         return results.to_dataframe()
     
+    def _cache_lookup(self, sql: str, max_results: Optional[int],
+                      params: Optional[Dict[str, Any]]):
+        """
+        Return (cached DataFrame or None, cache key), or None without a cache.
+        
+        The key includes the tables' modified timestamps so changed tables
+        never serve stale rows.
+        """
+        if self.cache is None:
+            return None
+        versions = self.cache.table_versions(referenced_tables(sql), self._table_modified)
+        key = self.cache.make_key(sql, versions, max_results=max_results, params=params)
+        return self.cache.get(key), key
+    
+    # Cost controls
+    
+    def _job_config(self, params: Optional[Dict[str, Any]],
+                    dry_run: bool = False) -> bigquery.QueryJobConfig:
+        """Build a job config binding @named parameters"""
+        return bigquery.QueryJobConfig(
+            query_parameters=_query_parameters(params or {}),
+            dry_run=dry_run,
+            use_query_cache=not dry_run,
+        )
+    
+    def _preflight(self, sql: str, params: Optional[Dict[str, Any]]) -> str:
+        """
+        Dry-run the query against the byte budgets and return the SQL to run,
+        which is the sampled variant when over_budget="sample" had to kick in.
+        """
+        if self.max_bytes_per_query is None and self.max_bytes_per_session is None:
+            return sql
+        
+        estimate = self.estimate_bytes(sql, params)
+        self.last_estimate = estimate
+        reason = self._over_budget_reason(estimate)
+        if reason is None:
+            return sql
+        
+        if self.over_budget == "sample":
+            sampled = TABLE_REF_PATTERN.sub(
+                lambda m: f"{m.group(0)} TABLESAMPLE SYSTEM ({self.sample_percent} PERCENT)", sql
+            )
+            try:
+                sampled_estimate = self.estimate_bytes(sampled, params)
+            except GoogleAPIError as e:
+                # Views and INFORMATION_SCHEMA tables cannot be sampled
+                raise QueryBudgetExceeded(f"{reason}; sampled variant not possible: {e}") from e
+            if self._over_budget_reason(sampled_estimate) is None:
+                warnings.warn(
+                    f"{reason}; running on a {self.sample_percent}% TABLESAMPLE "
+                    f"(~{_format_bytes(sampled_estimate)}) instead",
+                    stacklevel=4,
+                )
+                self.last_estimate = sampled_estimate
+                return sampled
+            reason = f"{reason}; {self.sample_percent}% sample still needs {_format_bytes(sampled_estimate)}"
+        
+        raise QueryBudgetExceeded(reason)
+    
+    def _over_budget_reason(self, estimate: int) -> Optional[str]:
+        """Describe which budget an estimate breaks, or None if it fits"""
+        if self.max_bytes_per_query is not None and estimate > self.max_bytes_per_query:
+            return (f"Query would process {_format_bytes(estimate)}, over the per-query "
+                    f"budget of {_format_bytes(self.max_bytes_per_query)}")
+        if (self.max_bytes_per_session is not None
+                and self.session_bytes_processed + estimate > self.max_bytes_per_session):
+            return (f"Query would process {_format_bytes(estimate)} with "
+                    f"{_format_bytes(self.session_bytes_processed)} already used, over the "
+                    f"session budget of {_format_bytes(self.max_bytes_per_session)}")
+        return None
+    
+    def _record_usage(self, query_job) -> None:
+        """Add a finished job's processed bytes to the session total"""
+        with self._usage_lock:
+            self.session_bytes_processed += query_job.total_bytes_processed or 0
+    
+    def _table_modified(self, table: str) -> str:
+        """
+        Return a table's version for cache keys: its last-modified timestamp.
+        
+        A view's own `modified` only changes with its definition, so a view
+        is versioned by the newest modified time among itself and the tables
+        it reads, through nested views. If a source can't be looked up, the
+        version also rolls over every UNRESOLVED_VIEW_TTL_SECONDS so cached
+        results still expire.
+        """
+        unresolved: List[str] = []
+        version = self._latest_modified(table, set(), unresolved).isoformat()
+        if unresolved:
+            version += f"@{int(time.time() // self.UNRESOLVED_VIEW_TTL_SECONDS)}"
+        return version
+    
+    def _latest_modified(self, table: str, seen: set, unresolved: List[str]) -> datetime:
+        """Newest modified time of a table, or of a view and everything it reads"""
+        table_ref = self.client.get_table(table)
+        if table_ref.table_type != 'VIEW' or not table_ref.view_query:
+            return table_ref.modified
+        seen.add(table)
+        latest = table_ref.modified
+        for source in view_source_tables(table_ref.view_query, table_ref.project):
+            if source in seen:
+                continue
+            try:
+                latest = max(latest, self._latest_modified(source, seen, unresolved))
+            except GoogleAPIError:
+                unresolved.append(source)
+        return latest
+    
+    @instrumented
     def get_sample_data(self, dataset_id: str, table_id: str, limit: int = 10) -> pd.DataFrame:
         """Get sample data from a table"""
         sql = f"""
         SELECT *
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
-        LIMIT {limit}
+        FROM {self.table_ref(dataset_id, table_id)}
+        LIMIT @limit
         """
-        return self.query(sql)
+        return self.query(sql, params={'limit': limit})
     
+    @instrumented
     def get_row_count(self, dataset_id: str, table_id: str) -> int:
         """Get total row count for a table"""
         sql = f"""
         SELECT COUNT(*) as count
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         """
         result = self.query(sql)
         return result['count'].iloc[0]
     
+    # Local snapshots
+    
+    def _local_lock(self, kind: str, dataset_id: str, table_id: str) -> threading.Lock:
+        """The lock guarding one table's snapshot or search index"""
+        key = f"{kind}:{dataset_id}.{table_id}"
+        with self._local_locks_guard:
+            return self._local_locks.setdefault(key, threading.Lock())
+    
+    def snapshot(self, dataset_id: str, table_id: str) -> SnapshotEngine:
+        """Return the snapshot engine for a table, building the snapshot if missing"""
+        key = f"{dataset_id}.{table_id}"
+        # Concurrent callers (e.g. the async explorer's workers) wait for one build
+        with self._local_lock('snapshot', dataset_id, table_id):
+            engine = self._snapshots.get(key)
+            if engine is None:
+                engine = SnapshotEngine.for_table(self.project_id, dataset_id, table_id, self.snapshot_dir)
+                self._snapshots[key] = engine
+            if not engine.exists:
+                engine.build(self, dataset_id, table_id)
+            engine.table()
+        return engine
+    
+    @instrumented
+    def refresh_snapshot(self, dataset_id: str = "analytic_website_analytics",
+                         table_id: str = "jobs_ai_cleaned_vw") -> int:
+        """Rebuild a table's local snapshot from BigQuery and return its row count"""
+        with self._local_lock('snapshot', dataset_id, table_id):
+            engine = SnapshotEngine.for_table(self.project_id, dataset_id, table_id, self.snapshot_dir)
+            rows = engine.build(self, dataset_id, table_id)
+            self._snapshots[f"{dataset_id}.{table_id}"] = engine
+        return rows
+    
+    def search_index(self, dataset_id: str, table_id: str) -> SearchIndex:
+        """Return the keyword index for a table, building it if missing"""
+        key = f"{dataset_id}.{table_id}"
+        with self._local_lock('search_index', dataset_id, table_id):
+            index = self._search_indexes.get(key)
+            if index is None:
+                index = SearchIndex.for_table(self.project_id, dataset_id, table_id, self.index_dir)
+                self._search_indexes[key] = index
+            if not index.exists:
+                index.build(self, dataset_id, table_id)
+            index.segments()
+        return index
+    
+    @instrumented
+    def refresh_search_index(self, dataset_id: str = "analytic_website_analytics",
+                             table_id: str = "jobs_ai_cleaned_vw") -> int:
+        """Add postings for jobs posted since the index was last updated; returns rows added"""
+        index = self.search_index(dataset_id, table_id)
+        with self._local_lock('search_index', dataset_id, table_id):
+            added = index.update(self, dataset_id, table_id)
+            index.segments()
+        return added
+    
     # Specialized queries for jobs data
     
+    @instrumented
     def get_top_companies(self, dataset_id: str = "analytic_website_analytics", 
                          table_id: str = "jobs_ai_cleaned_vw", 
                          limit: int = 20) -> pd.DataFrame:
         """Get top companies by job count"""
+        if self.backend == "snapshot":
+            return self.snapshot(dataset_id, table_id).top_companies(limit)
         sql = f"""
         SELECT 
             data_company,
@@ -105,17 +568,20 @@ class JobsDataExplorer:
             AVG(data_pay_range_min) as avg_min_salary,
             AVG(data_pay_range_max) as avg_max_salary,
             SUM(CASE WHEN is_remote THEN 1 ELSE 0 END) as remote_jobs
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         WHERE data_company IS NOT NULL
         GROUP BY data_company
         ORDER BY job_count DESC
-        LIMIT {limit}
+        LIMIT @limit
         """
-        return self.query(sql)
+        return self.query(sql, params={'limit': limit})
     
+    @instrumented
     def get_salary_stats_by_role(self, dataset_id: str = "analytic_website_analytics",
                                  table_id: str = "jobs_ai_cleaned_vw") -> pd.DataFrame:
         """Get salary statistics by job family"""
+        if self.backend == "snapshot":
+            return self.snapshot(dataset_id, table_id).salary_stats_by_role()
         sql = f"""
         SELECT 
             job_family,
@@ -124,7 +590,7 @@ class JobsDataExplorer:
             AVG(data_pay_range_max) as avg_max_salary,
             MIN(data_pay_range_min) as min_salary,
             MAX(data_pay_range_max) as max_salary
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         WHERE data_pay_range_min IS NOT NULL 
           AND data_pay_range_max IS NOT NULL
           AND job_family IS NOT NULL
@@ -133,10 +599,13 @@ class JobsDataExplorer:
         """
         return self.query(sql)
     
+    @instrumented
     def get_location_distribution(self, dataset_id: str = "analytic_website_analytics",
                                   table_id: str = "jobs_ai_cleaned_vw",
                                   limit: int = 20) -> pd.DataFrame:
         """Get job distribution by location"""
+        if self.backend == "snapshot":
+            return self.snapshot(dataset_id, table_id).location_distribution(limit)
         sql = f"""
         SELECT 
             data_location_city,
@@ -145,17 +614,20 @@ class JobsDataExplorer:
             COUNT(*) as job_count,
             AVG(data_pay_range_max) as avg_max_salary,
             SUM(CASE WHEN is_remote THEN 1 ELSE 0 END) as remote_jobs
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         WHERE data_location_city IS NOT NULL
         GROUP BY data_location_city, data_location_state, data_location_country
         ORDER BY job_count DESC
-        LIMIT {limit}
+        LIMIT @limit
         """
-        return self.query(sql)
+        return self.query(sql, params={'limit': limit})
     
+    @instrumented
     def get_monthly_trends(self, dataset_id: str = "analytic_website_analytics",
                           table_id: str = "jobs_ai_cleaned_vw") -> pd.DataFrame:
         """Get monthly job posting trends"""
+        if self.backend == "snapshot":
+            return self.snapshot(dataset_id, table_id).monthly_trends()
         sql = f"""
         SELECT 
             DATE_TRUNC(data_posted, MONTH) as month,
@@ -163,18 +635,21 @@ class JobsDataExplorer:
             COUNT(DISTINCT data_company) as unique_companies,
             AVG(data_pay_range_max) as avg_max_salary,
             SUM(CASE WHEN is_remote THEN 1 ELSE 0 END) as remote_jobs
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         WHERE data_posted IS NOT NULL
         GROUP BY month
         ORDER BY month
         """
         return self.query(sql)
     
+    @instrumented
     def search_jobs(self, keyword: str, 
                    dataset_id: str = "analytic_website_analytics",
                    table_id: str = "jobs_ai_cleaned_vw",
                    limit: int = 50) -> pd.DataFrame:
         """Search for jobs by keyword in title or description"""
+        if self.backend == "snapshot":
+            return self.search_index(dataset_id, table_id).search(keyword, limit)
         sql = f"""
         SELECT 
             unique_job_id,
@@ -188,17 +663,20 @@ class JobsDataExplorer:
             data_pay_range_max,
             is_remote,
             data_posted
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
-        WHERE LOWER(data_job_title) LIKE LOWER('%{keyword}%')
-           OR LOWER(data_job_description) LIKE LOWER('%{keyword}%')
+        FROM {self.table_ref(dataset_id, table_id)}
+        WHERE LOWER(data_job_title) LIKE CONCAT('%', LOWER(@keyword), '%')
+           OR LOWER(data_job_description) LIKE CONCAT('%', LOWER(@keyword), '%')
         ORDER BY data_posted DESC
-        LIMIT {limit}
+        LIMIT @limit
         """
-        return self.query(sql)
+        return self.query(sql, params={'keyword': keyword, 'limit': limit})
     
+    @instrumented
     def get_work_model_distribution(self, dataset_id: str = "analytic_website_analytics",
                                    table_id: str = "jobs_ai_cleaned_vw") -> pd.DataFrame:
         """Get distribution of work models (remote/hybrid/onsite)"""
+        if self.backend == "snapshot":
+            return self.snapshot(dataset_id, table_id).work_model_distribution()
         sql = f"""
         SELECT 
             CASE 
@@ -209,16 +687,161 @@ class JobsDataExplorer:
             END as work_model,
             COUNT(*) as job_count,
             ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 2) as percentage
-        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        FROM {self.table_ref(dataset_id, table_id)}
         GROUP BY work_model
         ORDER BY job_count DESC
         """
         return self.query(sql)
+    
+    @instrumented
+    def dashboard_bundle(self, dataset_id: str = "analytic_website_analytics",
+                         table_id: str = "jobs_ai_cleaned_vw",
+                         limit: int = 10) -> Dict[str, pd.DataFrame]:
+        """
+        Compute the five dashboard aggregates in a single table scan.
+        
+        One GROUPING SETS query produces company, job family, location, month
+        and work-model groups; the combined result is split back into the
+        DataFrames the per-method calls return, keyed by method name without
+        the get_ prefix. limit applies to top companies and locations.
+        """
+        if self.backend == "snapshot":
+            engine = self.snapshot(dataset_id, table_id)
+            return {
+                'top_companies': engine.top_companies(limit),
+                'salary_stats_by_role': engine.salary_stats_by_role(),
+                'location_distribution': engine.location_distribution(limit),
+                'work_model_distribution': engine.work_model_distribution(),
+                'monthly_trends': engine.monthly_trends(),
+            }
+        
+        # Per-method WHERE filters become conditional aggregates, and GROUPING()
+        # tells a set's own NULL key apart from "not grouped by this column"
+        sql = f"""
+        WITH base AS (
+            SELECT
+                data_company,
+                data_job_title,
+                job_family,
+                data_pay_range_min,
+                data_pay_range_max,
+                data_location_city,
+                data_location_state,
+                data_location_country,
+                DATE_TRUNC(data_posted, MONTH) AS month,
+                CASE 
+                    WHEN is_remote THEN 'Remote'
+                    WHEN is_hybrid THEN 'Hybrid'
+                    WHEN is_onsite THEN 'Onsite'
+                    ELSE 'Unknown'
+                END AS work_model,
+                is_remote,
+                data_pay_range_min IS NOT NULL AND data_pay_range_max IS NOT NULL AS has_salary
+            FROM {self.table_ref(dataset_id, table_id)}
+        ),
+        grouped AS (
+            SELECT
+                CASE
+                    WHEN GROUPING(data_company) = 0 THEN 'company'
+                    WHEN GROUPING(job_family) = 0 THEN 'job_family'
+                    WHEN GROUPING(data_location_city) = 0 THEN 'location'
+                    WHEN GROUPING(month) = 0 THEN 'month'
+                    ELSE 'work_model'
+                END AS grouping_set,
+                data_company,
+                job_family,
+                data_location_city,
+                data_location_state,
+                data_location_country,
+                month,
+                work_model,
+                COUNT(*) AS job_count,
+                COUNT(DISTINCT data_job_title) AS unique_titles,
+                COUNT(DISTINCT data_company) AS unique_companies,
+                AVG(data_pay_range_min) AS avg_min_salary,
+                AVG(data_pay_range_max) AS avg_max_salary,
+                COUNTIF(is_remote) AS remote_jobs,
+                COUNTIF(has_salary) AS salaried_count,
+                AVG(IF(has_salary, data_pay_range_min, NULL)) AS salaried_avg_min,
+                AVG(IF(has_salary, data_pay_range_max, NULL)) AS salaried_avg_max,
+                MIN(IF(has_salary, data_pay_range_min, NULL)) AS min_salary,
+                MAX(IF(has_salary, data_pay_range_max, NULL)) AS max_salary
+            FROM base
+            GROUP BY GROUPING SETS (
+                (data_company),
+                (job_family),
+                (data_location_city, data_location_state, data_location_country),
+                (month),
+                (work_model)
+            )
+        )
+        SELECT *
+        FROM grouped
+        WHERE TRUE
+        QUALIFY grouping_set NOT IN ('company', 'location')
+             OR ROW_NUMBER() OVER (
+                    PARTITION BY grouping_set
+                    ORDER BY COALESCE(data_company, data_location_city) IS NULL, job_count DESC
+                ) <= @limit
+        """
+        combined = self.query(sql, max_results=None, params={'limit': limit})
+        return self._split_bundle(combined, limit)
+    
+    def _split_bundle(self, combined: pd.DataFrame, limit: int) -> Dict[str, pd.DataFrame]:
+        """Split a dashboard_bundle result into the per-method DataFrames"""
+        def grouping(name: str, key: str) -> pd.DataFrame:
+            rows = combined[combined['grouping_set'] == name]
+            return rows[rows[key].notna()]
+        
+        companies = grouping('company', 'data_company')
+        top_companies = companies.sort_values('job_count', ascending=False).head(limit)[
+            ['data_company', 'job_count', 'unique_titles', 'avg_min_salary', 'avg_max_salary', 'remote_jobs']
+        ]
+        
+        families = grouping('job_family', 'job_family')
+        families = families[families['salaried_count'] > 0]
+        salary_stats = families.rename(columns={
+            'job_count': 'all_jobs',
+            'salaried_count': 'job_count',
+            'avg_min_salary': 'all_avg_min',
+            'avg_max_salary': 'all_avg_max',
+            'salaried_avg_min': 'avg_min_salary',
+            'salaried_avg_max': 'avg_max_salary',
+        }).sort_values('avg_max_salary', ascending=False)[
+            ['job_family', 'job_count', 'avg_min_salary', 'avg_max_salary', 'min_salary', 'max_salary']
+        ]
+        
+        locations = grouping('location', 'data_location_city')
+        locations = locations.sort_values('job_count', ascending=False).head(limit)[
+            ['data_location_city', 'data_location_state', 'data_location_country',
+             'job_count', 'avg_max_salary', 'remote_jobs']
+        ]
+        
+        work_models = combined[combined['grouping_set'] == 'work_model'][['work_model', 'job_count']]
+        work_models = work_models.sort_values('job_count', ascending=False)
+        work_models['percentage'] = (work_models['job_count'] * 100.0 / work_models['job_count'].sum()).round(2)
+        
+        months = grouping('month', 'month').sort_values('month')[
+            ['month', 'job_count', 'unique_companies', 'avg_max_salary', 'remote_jobs']
+        ]
+        
+        return {
+            name: df.reset_index(drop=True)
+            for name, df in [
+                ('top_companies', top_companies),
+                ('salary_stats_by_role', salary_stats),
+                ('location_distribution', locations),
+                ('work_model_distribution', work_models),
+                ('monthly_trends', months),
+            ]
+        }
 
 
-def main():
+def main(profile: Optional[RunProfile] = None):
     """Example usage of the JobsDataExplorer"""
-    explorer = JobsDataExplorer()
+    # The profile counts each phase's BigQuery jobs as a metrics sink
+    metrics = MetricsRecorder(sinks=[profile]) if profile is not None else None
+    explorer = JobsDataExplorer(cache=QueryCache(), metrics=metrics)
     
     print("=" * 80)
     print("BigQuery Jobs Data Explorer")
@@ -227,6 +850,7 @@ def main():
     # List all datasets
     print("\n📁 Available Datasets:")
     print("-" * 80)
+    phase('datasets')
     datasets = explorer.list_datasets()
     print(datasets.to_string(index=False))
     
@@ -234,30 +858,34 @@ def main():
     print("\n\n📊 Exploring: analytic_website_analytics")
     print("-" * 80)
     
+    # All five dashboard aggregates come from one table scan
+    phase('dashboard')
+    bundle = explorer.dashboard_bundle(limit=10)
+    
+    phase('report')
+    
     # Get top companies
     print("\n🏢 Top 10 Companies by Job Count:")
-    top_companies = explorer.get_top_companies(limit=10)
-    print(top_companies.to_string(index=False))
+    print(bundle['top_companies'].to_string(index=False))
     
     # Get salary stats by role
     print("\n\n💰 Salary Statistics by Job Family:")
-    salary_stats = explorer.get_salary_stats_by_role()
-    print(salary_stats.to_string(index=False))
+    print(bundle['salary_stats_by_role'].to_string(index=False))
     
     # Get location distribution
     print("\n\n📍 Top 10 Locations by Job Count:")
-    locations = explorer.get_location_distribution(limit=10)
-    print(locations.to_string(index=False))
+    print(bundle['location_distribution'].to_string(index=False))
     
     # Get work model distribution
     print("\n\n🏠 Work Model Distribution:")
-    work_models = explorer.get_work_model_distribution()
-    print(work_models.to_string(index=False))
+    print(bundle['work_model_distribution'].to_string(index=False))
     
     # Get monthly trends
     print("\n\n📈 Monthly Job Posting Trends:")
-    trends = explorer.get_monthly_trends()
-    print(trends.to_string(index=False))
+    print(bundle['monthly_trends'].to_string(index=False))
+    
+    stats = explorer.cache.stats()
+    print(f"\n🗄️  Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
     
     print("\n" + "=" * 80)
     print("Exploration Complete!")
@@ -265,5 +893,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    with profile_run('bq_explorer') as profile:
+        main(profile)
 
@@ -3,16 +3,95 @@
 Check Google Drive storage usage for service account
 """
 
+import heapq
 import json
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from datetime import datetime, timezone
 from googleapiclient.errors import HttpError
 
+from drive_inventory import DriveInventory, describe_sync
+from drive_utils import iter_drive_files
+from google_clients import get_factory
+from rate_limit import get_governor
+from run_profile import phase, profile_run
+
 KEY_FILE = 'sa-key-full.json'
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
-def check_storage():
-    """Check Drive storage usage"""
+DOC_MIME = 'application/vnd.google-apps.document'
+SHEET_MIME = 'application/vnd.google-apps.spreadsheet'
+
+# Upper bounds (exclusive) and labels for the histograms
+AGE_BUCKETS = [(7, '< 1 week'), (30, '1-4 weeks'), (90, '1-3 months'),
+               (365, '3-12 months'), (float('inf'), '> 1 year')]
+SIZE_BUCKETS = [(1024**2, '< 1 MB'), (10 * 1024**2, '1-10 MB'), (100 * 1024**2, '10-100 MB'),
+                (1024**3, '100 MB-1 GB'), (float('inf'), '> 1 GB')]
+
+
+class StorageAggregator:
+    """Single-pass file statistics whose memory doesn't grow with file count"""
+    
+    def __init__(self, top_k=10, now=None):
+        self.top_k = top_k
+        self.now = now or datetime.now(timezone.utc)
+        self.total = 0
+        self.by_mime = {}      # mimeType -> [files, bytes], excluding trash
+        self.by_age = {label: [0, 0] for _, label in AGE_BUCKETS}
+        self.by_size = {label: [0, 0] for _, label in SIZE_BUCKETS}
+        self.no_size = 0       # Google-native files don't count toward quota
+        self.trashed = [0, 0]
+        self._largest = []     # min-heap of (size, id, name) for non-Docs/Sheets
+    
+    def add(self, f):
+        self.total += 1
+        size = int(f.get('size') or 0)
+        if f.get('trashed'):
+            self.trashed[0] += 1
+            self.trashed[1] += size
+            return
+        
+        mime = f.get('mimeType', 'unknown')
+        counts = self.by_mime.setdefault(mime, [0, 0])
+        counts[0] += 1
+        counts[1] += size
+        
+        if f.get('createdTime'):
+            created = datetime.fromisoformat(f['createdTime'].replace('Z', '+00:00'))
+            age_days = (self.now - created).days
+            label = next(label for bound, label in AGE_BUCKETS if age_days < bound)
+            self.by_age[label][0] += 1
+            self.by_age[label][1] += size
+        
+        if f.get('size') is None:
+            self.no_size += 1
+        else:
+            label = next(label for bound, label in SIZE_BUCKETS if size < bound)
+            self.by_size[label][0] += 1
+            self.by_size[label][1] += size
+        
+        if mime not in (DOC_MIME, SHEET_MIME):
+            entry = (size, f.get('id', ''), f.get('name', 'Unknown'))
+            if len(self._largest) < self.top_k:
+                heapq.heappush(self._largest, entry)
+            elif entry > self._largest[0]:
+                heapq.heapreplace(self._largest, entry)
+    
+    def count(self, mime):
+        return self.by_mime.get(mime, [0, 0])[0]
+    
+    @property
+    def other(self):
+        return sum(c for m, (c, _) in self.by_mime.items() if m not in (DOC_MIME, SHEET_MIME))
+    
+    def largest(self):
+        """Top-K largest non-Docs/Sheets files as (size, id, name), biggest first"""
+        return sorted(self._largest, reverse=True)
+
+def check_storage(use_mirror=True):
+    """Check Drive storage usage
+    
+    With use_mirror, files are read from the local Drive inventory (synced
+    from the changes feed) instead of listing the whole Drive.
+    """
     
     print("=" * 80)
     print("💾 GOOGLE DRIVE STORAGE DIAGNOSTIC")
@@ -21,10 +100,10 @@ def check_storage():
     try:
         # Authenticate
         print("\n[1/3] 🔐 Authenticating...")
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_FILE, scopes=SCOPES
-        )
-        drive_service = build('drive', 'v3', credentials=credentials)
+        phase('auth')
+        clients = get_factory(KEY_FILE, SCOPES)
+        credentials = clients.credentials
+        drive_service = clients.drive()
         print(f"     ✅ Authenticated as: {credentials.service_account_email}")
         
     except Exception as e:
@@ -34,7 +113,8 @@ def check_storage():
     try:
         # Get storage quota
         print("\n[2/3] 📊 Checking storage quota...")
-        about = drive_service.about().get(fields='storageQuota,user').execute()
+        phase('quota')
+        about = get_governor().execute(drive_service.about().get(fields='storageQuota,user'))
         
         quota = about.get('storageQuota', {})
         limit = int(quota.get('limit', 0))
@@ -72,38 +152,57 @@ def check_storage():
     try:
         # List files
         print("\n[3/3] 📁 Analyzing files...")
+        phase('analyze')
         
-        # Get all files
-        results = drive_service.files().list(
-            pageSize=1000,
-            fields="files(id,name,mimeType,size,createdTime,modifiedTime,trashed)",
-            orderBy="quotaBytesUsed desc"
-        ).execute()
-        
-        files = results.get('files', [])
+        # Aggregate in one pass; no file list is kept in memory
+        stats = StorageAggregator()
+        if use_mirror:
+            with DriveInventory() as inventory:
+                print(f"     🗂️  {describe_sync(inventory.sync(drive_service))}")
+                for f in inventory.files():
+                    stats.add(f)
+        else:
+            for f in iter_drive_files(
+                drive_service,
+                fields="id,name,mimeType,size,createdTime,trashed"
+            ):
+                stats.add(f)
         
-        # Categorize files
-        docs = [f for f in files if f.get('mimeType') == 'application/vnd.google-apps.document' and not f.get('trashed')]
-        sheets = [f for f in files if f.get('mimeType') == 'application/vnd.google-apps.spreadsheet' and not f.get('trashed')]
-        other = [f for f in files if f.get('mimeType') not in ['application/vnd.google-apps.document', 'application/vnd.google-apps.spreadsheet'] and not f.get('trashed')]
-        trashed = [f for f in files if f.get('trashed')]
+        docs = stats.count(DOC_MIME)
+        sheets = stats.count(SHEET_MIME)
+        trashed = stats.trashed[0]
         
         print(f"\n     📊 File Breakdown:")
-        print(f"        Google Docs:     {len(docs):,} files")
-        print(f"        Google Sheets:   {len(sheets):,} files")
-        print(f"        Other files:     {len(other):,} files")
-        print(f"        In Trash:        {len(trashed):,} files")
-        print(f"        TOTAL:           {len(files):,} files")
+        print(f"        Google Docs:     {docs:,} files")
+        print(f"        Google Sheets:   {sheets:,} files")
+        print(f"        Other files:     {stats.other:,} files")
+        print(f"        In Trash:        {trashed:,} files ({stats.trashed[1] / (1024**3):.2f} GB)")
+        print(f"        TOTAL:           {stats.total:,} files")
+        
+        # Bytes by type (outside trash)
+        by_bytes = sorted(stats.by_mime.items(), key=lambda item: (item[1][1], item[1][0]), reverse=True)
+        print(f"\n     🗃️  By type (top 10 by size):")
+        for mime, (count, size) in by_bytes[:10]:
+            print(f"        {size / (1024**3):8.2f} GB  {count:>9,} files  {mime}")
+        if len(by_bytes) > 10:
+            print(f"        ... and {len(by_bytes) - 10} more types")
+        
+        print(f"\n     📅 By age (outside trash):")
+        for label, (count, size) in stats.by_age.items():
+            print(f"        {label:<14} {count:>9,} files  {size / (1024**3):8.2f} GB")
+        
+        print(f"\n     📏 By size (outside trash):")
+        for label, (count, size) in stats.by_size.items():
+            print(f"        {label:<14} {count:>9,} files  {size / (1024**3):8.2f} GB")
+        if stats.no_size:
+            print(f"        {'no size':<14} {stats.no_size:>9,} files  (Google Docs/Sheets/Slides)")
         
         # Show largest files
-        if other:
+        if stats.other:
             print(f"\n     📦 Largest files (non-Docs/Sheets):")
-            sorted_files = sorted(other, key=lambda x: int(x.get('size', 0)), reverse=True)[:10]
-            for f in sorted_files:
-                size = int(f.get('size', 0))
+            for size, _, name in stats.largest():
                 size_mb = size / (1024**2)
-                name = f.get('name', 'Unknown')[:50]
-                print(f"        • {size_mb:.2f} MB - {name}")
+                print(f"        • {size_mb:.2f} MB - {name[:50]}")
         
         # Recommendations
         print("\n" + "=" * 80)
@@ -113,9 +212,9 @@ def check_storage():
         if percent_used > 95:
             print("\n🔴 URGENT: You need to free up space immediately!")
             print("\nOptions:")
-            print(f"1. Empty trash ({len(trashed):,} files) - Could free up {trash_gb:.2f} GB")
-            print(f"2. Delete old documents ({len(docs):,} docs)")
-            print(f"3. Delete old spreadsheets ({len(sheets):,} sheets)")
+            print(f"1. Empty trash ({trashed:,} files) - Could free up {trash_gb:.2f} GB")
+            print(f"2. Delete old documents ({docs:,} docs)")
+            print(f"3. Delete old spreadsheets ({sheets:,} sheets)")
             print("4. Move files to a different storage location")
             print("5. Upgrade to Google Workspace (more storage)")
             print("\nWould you like me to:")
@@ -129,5 +228,8 @@ def check_storage():
     print("\n" + "=" * 80)
 
 if __name__ == "__main__":
-    check_storage()
+    import sys
+    
+    with profile_run('check_drive_storage'):
+        check_storage(use_mirror='--no-mirror' not in sys.argv)
 
@@ -3,16 +3,25 @@
 Delete old CSV files from Google Drive to free up space
 """
 
+import contextlib
 import json
 from datetime import datetime, timedelta
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+
+from drive_inventory import CSV_WHERE, DriveInventory, describe_sync
+from drive_utils import CSV_QUERY, batch_delete_files, iter_drive_files
+from google_clients import get_factory
+from rate_limit import get_governor
+from run_profile import phase, profile_run
 
 KEY_FILE = 'sa-key-full.json'
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
-def cleanup_csvs(days_old=30, dry_run=True):
-    """Delete CSV files older than X days"""
+def cleanup_csvs(days_old=30, dry_run=True, use_mirror=True):
+    """Delete CSV files older than X days
+    
+    With use_mirror, the age filter runs against the local Drive inventory
+    (synced from the changes feed) instead of listing every CSV.
+    """
     
     print("=" * 80)
     print("🧹 GOOGLE DRIVE CLEANUP - CSV FILES")
@@ -26,82 +35,92 @@ def cleanup_csvs(days_old=30, dry_run=True):
     
     try:
         # Authenticate
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_FILE, scopes=SCOPES
-        )
-        drive_service = build('drive', 'v3', credentials=credentials)
-        
-        # Get all CSV files
-        print(f"[1/3] 📁 Finding CSV files older than {days_old} days...")
-        
-        results = drive_service.files().list(
-            pageSize=1000,
-            q="mimeType='text/csv' or name contains '.csv'",
-            fields="files(id,name,size,createdTime,modifiedTime)",
-            orderBy="createdTime"
-        ).execute()
-        
-        files = results.get('files', [])
-        print(f"     Found {len(files)} CSV files")
-        
-        # Filter by age
-        from datetime import timezone
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_old)
-        old_files = []
-
-        for f in files:
-            created = datetime.fromisoformat(f['createdTime'].replace('Z', '+00:00'))
-            if created < cutoff_date:
-                old_files.append(f)
-        
-        if not old_files:
-            print(f"\n✅ No CSV files older than {days_old} days found!")
-            return
-        
-        # Calculate space to free
-        total_size = sum(int(f.get('size', 0)) for f in old_files)
-        total_gb = total_size / (1024**3)
-        
-        print(f"\n[2/3] 📊 Files to delete:")
-        print(f"     Count: {len(old_files)} files")
-        print(f"     Space to free: {total_gb:.2f} GB")
-        
-        # Show files
-        print(f"\n     Files (showing first 20):")
-        for f in old_files[:20]:
-            size_mb = int(f.get('size', 0)) / (1024**2)
-            name = f['name'][:60]
-            created = f['createdTime'][:10]
-            print(f"        • {size_mb:7.2f} MB - {created} - {name}")
+        drive_service = get_factory(KEY_FILE, SCOPES).drive()
         
-        if len(old_files) > 20:
-            print(f"        ... and {len(old_files) - 20} more files")
-        
-        # Delete files
-        print(f"\n[3/3] 🗑️  Deleting files...")
-        
-        if dry_run:
-            print(f"     ⚠️  DRY RUN - Would delete {len(old_files)} files ({total_gb:.2f} GB)")
-            print(f"\n     To actually delete, run:")
-            print(f"     python3 cleanup_old_csvs.py --delete")
-        else:
-            deleted = 0
-            failed = 0
+        # The mirror (when used) is closed however the run ends
+        with (DriveInventory() if use_mirror else contextlib.nullcontext()) as inventory:
+            # Get all CSV files
+            print(f"[1/3] 📁 Finding CSV files older than {days_old} days...")
+            phase('find_csvs')
+            
+            from datetime import timezone
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_old)
+            
+            if use_mirror:
+                print(f"     🗂️  {describe_sync(inventory.sync(drive_service))}")
+                found = inventory.count(CSV_WHERE)
+                old_files = list(inventory.csv_files(created_before=cutoff_date))
+            else:
+                old_files = []
+                found = 0
+                
+                # Filter by age page by page while the next page is fetched
+                for f in iter_drive_files(
+                    drive_service,
+                    q=CSV_QUERY,
+                    fields="id,name,size,createdTime",
+                    order_by="createdTime"
+                ):
+                    found += 1
+                    created = datetime.fromisoformat(f['createdTime'].replace('Z', '+00:00'))
+                    if created < cutoff_date:
+                        old_files.append(f)
+            
+            print(f"     Found {found} CSV files")
+            
+            if not old_files:
+                print(f"\n✅ No CSV files older than {days_old} days found!")
+                return
+            
+            # Calculate space to free
+            total_size = sum(int(f.get('size', 0)) for f in old_files)
+            total_gb = total_size / (1024**3)
+            
+            print(f"\n[2/3] 📊 Files to delete:")
+            phase('review')
+            print(f"     Count: {len(old_files)} files")
+            print(f"     Space to free: {total_gb:.2f} GB")
+            
+            # Show files
+            print(f"\n     Files (showing first 20):")
+            for f in old_files[:20]:
+                size_mb = int(f.get('size', 0)) / (1024**2)
+                name = f['name'][:60]
+                created = f['createdTime'][:10]
+                print(f"        • {size_mb:7.2f} MB - {created} - {name}")
+            
+            if len(old_files) > 20:
+                print(f"        ... and {len(old_files) - 20} more files")
             
-            for f in old_files:
-                try:
-                    drive_service.files().delete(fileId=f['id']).execute()
-                    deleted += 1
-                    if deleted % 10 == 0:
-                        print(f"        Deleted {deleted}/{len(old_files)} files...")
-                except Exception as e:
-                    print(f"        ❌ Failed to delete {f['name']}: {e}")
-                    failed += 1
+            # Delete files
+            print(f"\n[3/3] 🗑️  Deleting files...")
+            phase('delete')
             
-            print(f"\n     ✅ Deleted {deleted} files")
-            if failed > 0:
-                print(f"     ❌ Failed to delete {failed} files")
-            print(f"     💾 Freed approximately {total_gb:.2f} GB")
+            if dry_run:
+                print(f"     ⚠️  DRY RUN - Would delete {len(old_files)} files ({total_gb:.2f} GB)")
+                print(f"\n     To actually delete, run:")
+                print(f"     python3 cleanup_old_csvs.py --delete")
+            else:
+                names = {f['id']: f['name'] for f in old_files}
+                
+                def report(done, total):
+                    print(f"        Deleted {done}/{total} files...")
+                
+                result = batch_delete_files(drive_service, old_files, progress=report)
+                if inventory is not None:
+                    inventory.remove(result['deleted'] + result['missing'])
+                for file_id, error in result['failed'].items():
+                    print(f"        ❌ Failed to delete {names[file_id]}: {error}")
+                
+                print(f"\n     ✅ Deleted {len(result['deleted'])} files")
+                if result['missing']:
+                    print(f"     ℹ️  {len(result['missing'])} files were already gone")
+                if result['failed']:
+                    print(f"     ❌ Failed to delete {len(result['failed'])} files")
+                api = get_governor().stats()
+                print(f"     🚦 API calls: {api['calls']:,} ({api['retries']:,} retried, "
+                      f"{api['throttles']:,} throttled)")
+                print(f"     💾 Freed approximately {total_gb:.2f} GB")
         
     except Exception as e:
         print(f"     ❌ Error: {e}")
@@ -121,5 +140,6 @@ if __name__ == "__main__":
         if arg.startswith('--days='):
             days = int(arg.split('=')[1])
     
-    cleanup_csvs(days_old=days, dry_run=not delete_mode)
+    with profile_run('cleanup_old_csvs'):
+        cleanup_csvs(days_old=days, dry_run=not delete_mode, use_mirror='--no-mirror' not in sys.argv)
 
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Publish DataFrames as Google Docs reports
+Each report is compiled into one list of Docs API requests (headings, native
+tables, cell text and styling) and sent in as few batchUpdate calls as
+possible, so a 20-table report costs a handful of API calls rather than one
+per cell; many reports are created concurrently
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from google_clients import DEFAULT_KEY_FILE, DOCS_SCOPES, ClientFactory, get_factory
+from rate_limit import ApiGovernor, get_governor
+
+# Requests per batchUpdate call. Requests apply in order, so splitting a
+# long list across calls is safe; this only keeps payloads a sane size.
+MAX_REQUESTS_PER_CALL = 500
+DEFAULT_MAX_ROWS = 50
+HEADER_BACKGROUND = {'red': 0.93, 'green': 0.93, 'blue': 0.93}
+DOC_URL = "https://docs.google.com/document/d/{}/edit"
+
+
+@dataclass
+class ReportSection:
+    """One heading and the DataFrame rendered as a table under it"""
+    title: str
+    frame: pd.DataFrame
+    note: Optional[str] = None
+
+
+@dataclass
+class Report:
+    title: str
+    sections: List[ReportSection] = field(default_factory=list)
+    intro: Optional[str] = None
+
+    def add(self, title: str, frame: pd.DataFrame, note: Optional[str] = None) -> 'Report':
+        self.sections.append(ReportSection(title, frame, note))
+        return self
+
+
+def _length(text: str) -> int:
+    """Length in Docs index units (UTF-16 code units, so emoji count twice)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _format_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return ''
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+    # Newlines would split the cell into extra paragraphs
+    return str(value).replace('\n', ' ')
+
+
+def _cells(frame: pd.DataFrame, max_rows: int) -> List[List[str]]:
+    """Header row plus up to max_rows formatted rows"""
+    rows = [[str(column) for column in frame.columns]]
+    for record in frame.head(max_rows).itertuples(index=False, name=None):
+        rows.append([_format_value(value.item() if hasattr(value, 'item') else value)
+                     for value in record])
+    return rows
+
+
+def _paragraph_requests(paragraphs: List[tuple], index: int, terminated: bool) -> List[Dict[str, Any]]:
+    """
+    Insert (text, namedStyleType) paragraphs at `index` and style them.
+
+    With terminated=False the last paragraph fills an existing empty
+    paragraph at `index` (the one insertTable leaves before a table), so it
+    gets no newline of its own.
+    """
+    text = '\n'.join(p for p, _ in paragraphs) + ('\n' if terminated else '')
+    requests = [{'insertText': {'location': {'index': index}, 'text': text}}]
+    start = index
+    for paragraph, style in paragraphs:
+        end = start + _length(paragraph) + 1
+        requests.append({
+            'updateParagraphStyle': {
+                'range': {'startIndex': start, 'endIndex': end},
+                'paragraphStyle': {'namedStyleType': style},
+                'fields': 'namedStyleType',
+            }
+        })
+        start = end
+    return requests
+
+
+def _table_requests(cells: List[List[str]], index: int) -> List[Dict[str, Any]]:
+    """
+    Insert a table at `index` and fill it.
+
+    insertTable puts a newline at `index` and the table right after it;
+    the table start, each row start and each cell start take one index,
+    and every empty cell holds a one-index paragraph. So, before any text
+    is added, cell (r, c) takes text at index + 4 + r * (2 * columns + 1) + 2 * c.
+    Cells are filled last to first so each insert leaves the indices of
+    the cells still to fill unchanged.
+    """
+    rows, columns = len(cells), len(cells[0])
+    requests = [{'insertTable': {'rows': rows, 'columns': columns, 'location': {'index': index}}}]
+
+    def cell_index(r: int, c: int) -> int:
+        return index + 4 + r * (2 * columns + 1) + 2 * c
+
+    for r in reversed(range(rows)):
+        for c in reversed(range(columns)):
+            if cells[r][c]:
+                requests.append({'insertText': {'location': {'index': cell_index(r, c)},
+                                                'text': cells[r][c]}})
+
+    # Header row: bold text and a shaded background. Only row 0 has text
+    # before it at this point, so its offsets are the empty-table ones
+    # shifted by the header cells already filled.
+    shift = 0
+    for c, text in enumerate(cells[0]):
+        if text:
+            start = cell_index(0, c) + shift
+            requests.append({
+                'updateTextStyle': {
+                    'range': {'startIndex': start, 'endIndex': start + _length(text)},
+                    'textStyle': {'bold': True},
+                    'fields': 'bold',
+                }
+            })
+        shift += _length(text)
+    requests.append({
+        'updateTableCellStyle': {
+            'tableRange': {
+                'tableCellLocation': {'tableStartLocation': {'index': index + 1},
+                                      'rowIndex': 0, 'columnIndex': 0},
+                'rowSpan': 1,
+                'columnSpan': columns,
+            },
+            'tableCellStyle': {'backgroundColor': {'color': {'rgbColor': HEADER_BACKGROUND}}},
+            'fields': 'backgroundColor',
+        }
+    })
+    return requests
+
+
+def compile_requests(report: Report, max_rows: int = DEFAULT_MAX_ROWS) -> List[Dict[str, Any]]:
+    """
+    The batchUpdate requests that render a report into an empty document.
+
+    Everything is inserted at index 1, last section first, so every index
+    is computed against a known, freshly inserted layout rather than the
+    running length of the document.
+    """
+    requests: List[Dict[str, Any]] = []
+    for section in reversed(report.sections):
+        paragraphs = [(section.title, 'HEADING_2')]
+        notes = [section.note] if section.note else []
+        if len(section.frame) > max_rows:
+            notes.append(f"Showing the first {max_rows:,} of {len(section.frame):,} rows")
+        if section.frame.empty:
+            notes.append("No results")
+        paragraphs += [(note, 'NORMAL_TEXT') for note in notes]
+
+        if not section.frame.empty:
+            requests += _table_requests(_cells(section.frame, max_rows), index=1)
+            requests += _paragraph_requests(paragraphs, index=1, terminated=False)
+        else:
+            requests += _paragraph_requests(paragraphs, index=1, terminated=True)
+
+    header = [(report.title, 'TITLE')]
+    if report.intro:
+        header.append((report.intro, 'NORMAL_TEXT'))
+    requests += _paragraph_requests(header, index=1, terminated=True)
+    return requests
+
+
+def publish_report(report: Report, factory: Optional[ClientFactory] = None,
+                   folder_id: Optional[str] = None, max_rows: int = DEFAULT_MAX_ROWS,
+                   governor: Optional[ApiGovernor] = None) -> Dict[str, Any]:
+    """
+    Create a Google Doc for the report.
+
+    Costs one create call plus ceil(requests / MAX_REQUESTS_PER_CALL)
+    batchUpdate calls, whatever the number of tables.
+
+    Args:
+        folder_id: Create the document in this Drive folder (through the
+            Drive API, still a single call)
+
+    Returns:
+        Dict with document_id, url, title, requests, api_calls and seconds
+    """
+    factory = factory or get_factory(DEFAULT_KEY_FILE, DOCS_SCOPES)
+    governor = governor or get_governor()
+    start = time.perf_counter()
+
+    if folder_id:
+        created = governor.execute(factory.drive().files().create(
+            body={'name': report.title, 'mimeType': 'application/vnd.google-apps.document',
+                  'parents': [folder_id]},
+            fields='id',
+        ), idempotent=False)
+        document_id = created['id']
+    else:
+        created = governor.execute(factory.docs().documents().create(body={'title': report.title}),
+                                   idempotent=False)
+        document_id = created['documentId']
+
+    requests = compile_requests(report, max_rows=max_rows)
+    calls = 1
+    for offset in range(0, len(requests), MAX_REQUESTS_PER_CALL):
+        governor.execute(factory.docs().documents().batchUpdate(
+            documentId=document_id,
+            body={'requests': requests[offset:offset + MAX_REQUESTS_PER_CALL]},
+        ), idempotent=False)
+        calls += 1
+
+    return {
+        'document_id': document_id,
+        'url': DOC_URL.format(document_id),
+        'title': report.title,
+        'requests': len(requests),
+        'api_calls': calls,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def publish_reports(reports: List[Report], factory: Optional[ClientFactory] = None,
+                    max_workers: int = 4, folder_id: Optional[str] = None,
+                    max_rows: int = DEFAULT_MAX_ROWS,
+                    governor: Optional[ApiGovernor] = None) -> List[Dict[str, Any]]:
+    """
+    Publish many reports concurrently.
+
+    Each worker thread builds its own Docs client through the factory; the
+    governor's AIMD limit caps how many reports are written at once.
+
+    Returns:
+        One result per report, in order; failures carry title and 'error'
+    """
+    factory = factory or get_factory(DEFAULT_KEY_FILE, DOCS_SCOPES)
+    governor = governor or get_governor()
+
+    def run(report: Report) -> Dict[str, Any]:
+        try:
+            with governor.slot():
+                return publish_report(report, factory, folder_id=folder_id,
+                                      max_rows=max_rows, governor=governor)
+        except Exception as e:
+            return {'title': report.title, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='docs') as pool:
+        return list(pool.map(run, reports))
+
+
+def main():
+    """Publish the explorer's dashboard tables as one Google Doc"""
+    from bq_explorer import JobsDataExplorer
+    from query_cache import QueryCache
+
+    print("=" * 80)
+    print("📄 PUBLISH EXPLORER REPORT TO GOOGLE DOCS")
+    print("=" * 80)
+
+    print("\n[1/2] 📊 Running dashboard queries...")
+    explorer = JobsDataExplorer(cache=QueryCache())
+    bundle = explorer.dashboard_bundle(limit=10)
+    report = Report(
+        title=f"Jobs Data Report - {time.strftime('%Y-%m-%d')}",
+        intro="Dashboard aggregates from analytic_website_analytics.jobs_ai_cleaned_vw",
+    )
+    report.add("🏢 Top 10 Companies by Job Count", bundle['top_companies'])
+    report.add("💰 Salary Statistics by Job Family", bundle['salary_stats_by_role'])
+    report.add("📍 Top 10 Locations by Job Count", bundle['location_distribution'])
+    report.add("🏠 Work Model Distribution", bundle['work_model_distribution'])
+    report.add("📈 Monthly Job Posting Trends", bundle['monthly_trends'])
+    print(f"     ✅ {len(report.sections)} tables")
+
+    print("\n[2/2] ✏️  Writing document...")
+    result = publish_report(report)
+    print(f"     ✅ {result['requests']} requests in {result['api_calls']} API calls "
+          f"({result['seconds']:.1f}s)")
+    print(f"     🔗 URL: {result['url']}")
+
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Content-hash deduplication of Drive files
+Repeated exports of the same query produce byte-identical CSVs; Drive's
+md5Checksum and size (list metadata, no download needed) identify them so
+each distinct content is transferred once and the copies are recorded in a
+manifest that points at the one stored object
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rate_limit import ApiGovernor, get_governor
+
+DEFAULT_MANIFEST_BLOB = 'csv-exports/_duplicates.json'
+
+
+def content_key(file: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+    """(md5Checksum, size), or None when Drive has no checksum for the file"""
+    md5 = file.get('md5Checksum')
+    size = file.get('size')
+    if not md5 or size is None:
+        return None
+    return md5, int(size)
+
+
+def find_duplicates(files: Iterable[Dict[str, Any]],
+                    known: Iterable[Dict[str, Any]] = ()) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split files into one canonical file per content and its duplicates.
+
+    The oldest file (by createdTime, then id) of each content is canonical,
+    so repeated runs pick the same one. Files without a checksum are always
+    unique.
+
+    Args:
+        files: Candidates in Drive listing shape
+        known: Files whose content is already stored; a candidate with the
+            same content is a duplicate of the known file
+
+    Returns:
+        (unique, duplicates): unique keeps the input order; each duplicate is
+        a copy of its file dict with duplicate_of set to the canonical id
+    """
+    canonical: Dict[Tuple[str, int], str] = {}
+    for f in known:
+        key = content_key(f)
+        if key is not None:
+            canonical.setdefault(key, f['id'])
+
+    files = list(files)
+    for f in sorted(files, key=lambda f: (f.get('createdTime') or '', f['id'])):
+        key = content_key(f)
+        if key is not None:
+            canonical.setdefault(key, f['id'])
+
+    unique, duplicates = [], []
+    for f in files:
+        key = content_key(f)
+        if key is None or canonical[key] == f['id']:
+            unique.append(f)
+        else:
+            duplicates.append({**f, 'duplicate_of': canonical[key]})
+    return unique, duplicates
+
+
+def write_manifest(bucket, entries: List[Dict[str, Any]],
+                   blob_name: str = DEFAULT_MANIFEST_BLOB,
+                   governor: Optional[ApiGovernor] = None) -> str:
+    """
+    Store the duplicate → object mapping next to the migrated files.
+
+    Args:
+        entries: Duplicates with at least id, name, size, md5Checksum,
+            duplicate_of and blob (the object holding their content)
+
+    Returns:
+        gs:// URL of the manifest
+    """
+    manifest = [
+        {
+            'id': e['id'],
+            'name': e['name'],
+            'size': int(e.get('size') or 0),
+            'md5': e.get('md5Checksum'),
+            'created_time': e.get('createdTime'),
+            'duplicate_of': e['duplicate_of'],
+            'blob': e['blob'],
+        }
+        for e in sorted(entries, key=lambda e: (e['blob'], e['name']))
+    ]
+    blob = bucket.blob(blob_name)
+    (governor or get_governor()).call(blob.upload_from_string, json.dumps(manifest, indent=2),
+                                      content_type='application/json')
+    return f"gs://{bucket.name}/{blob_name}"
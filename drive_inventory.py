@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the service account's Drive metadata
+Bootstrapped with one full listing, then kept current from the Drive changes
+feed, so the maintenance scripts can filter and aggregate locally instead of
+re-listing every file on every run
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from drive_utils import iter_drive_files
+from rate_limit import get_governor
+
+DEFAULT_INVENTORY_PATH = os.path.join('.cache', 'drive_inventory.sqlite')
+
+# File metadata mirrored locally (Drive API field names)
+FIELDS = "id,name,mimeType,size,md5Checksum,createdTime,modifiedTime,trashed"
+
+# Same match as drive_utils.CSV_QUERY
+CSV_WHERE = "(mime_type = 'text/csv' OR name LIKE '%.csv%')"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id            TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    mime_type     TEXT,
+    size          INTEGER,
+    md5           TEXT,
+    created_time  TEXT,
+    modified_time TEXT,
+    trashed       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_mime_type ON files (mime_type);
+CREATE INDEX IF NOT EXISTS files_created_time ON files (created_time);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Column → Drive API field, for handing rows back in listing shape
+_API_NAMES = {
+    'id': 'id',
+    'name': 'name',
+    'mime_type': 'mimeType',
+    'size': 'size',
+    'md5': 'md5Checksum',
+    'created_time': 'createdTime',
+    'modified_time': 'modifiedTime',
+}
+
+
+def _row(f: Dict[str, Any]) -> tuple:
+    size = f.get('size')
+    return (f['id'], f.get('name', ''), f.get('mimeType'),
+            int(size) if size is not None else None, f.get('md5Checksum'),
+            f.get('createdTime'), f.get('modifiedTime'), int(bool(f.get('trashed'))))
+
+
+class DriveInventory:
+    """SQLite copy of Drive file metadata, synced through changes().list"""
+
+    def __init__(self, path: str = DEFAULT_INVENTORY_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> 'DriveInventory':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # Sync state
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def last_synced(self) -> Optional[str]:
+        """ISO time of the last successful sync, None before the bootstrap"""
+        return self._get_meta('synced_at')
+
+    # Sync
+
+    def sync(self, drive_service) -> Dict[str, Any]:
+        """
+        Bring the mirror up to date.
+
+        The first call (or one after the saved page token has expired) lists
+        every file; later calls only read the changes since the last sync.
+
+        Returns:
+            Dict with mode ('bootstrap' or 'changes'), upserted, removed,
+            files and seconds
+        """
+        start = time.perf_counter()
+        token = self._get_meta('page_token')
+        result = None
+        if token is not None:
+            try:
+                result = self._apply_changes(drive_service, token)
+            except HttpError as e:
+                # An expired or unknown token means rebuilding from a full listing
+                if e.resp.status not in (400, 404, 410):
+                    raise
+        if result is None:
+            result = self._bootstrap(drive_service)
+
+        result['files'] = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def _bootstrap(self, drive_service) -> Dict[str, Any]:
+        # Take the token first so changes made during the listing are replayed next sync
+        token = get_governor().execute(drive_service.changes().getStartPageToken())['startPageToken']
+
+        upserted = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM files")
+            batch: List[tuple] = []
+            for f in iter_drive_files(drive_service, fields=FIELDS):
+                batch.append(_row(f))
+                if len(batch) >= 1000:
+                    upserted += self._upsert(batch)
+                    batch = []
+            upserted += self._upsert(batch)
+            self._set_meta('page_token', token)
+            self._set_meta('synced_at', datetime.now(timezone.utc).isoformat())
+        return {'mode': 'bootstrap', 'upserted': upserted, 'removed': 0}
+
+    def _apply_changes(self, drive_service, token: str) -> Dict[str, Any]:
+        upserted = removed = 0
+        changes = drive_service.changes()
+        governor = get_governor()
+        with self.conn:
+            while True:
+                response = governor.execute(changes.list(
+                    pageToken=token,
+                    pageSize=1000,
+                    spaces='drive',
+                    includeRemoved=True,
+                    fields=f"nextPageToken,newStartPageToken,changes(fileId,removed,file({FIELDS}))",
+                ))
+
+                gone = [c['fileId'] for c in response.get('changes', [])
+                        if c.get('removed') or 'file' not in c]
+                present = [_row(c['file']) for c in response.get('changes', [])
+                           if not c.get('removed') and 'file' in c]
+                removed += self._delete(gone)
+                upserted += self._upsert(present)
+
+                if 'newStartPageToken' in response:
+                    self._set_meta('page_token', response['newStartPageToken'])
+                    break
+                token = response['nextPageToken']
+            self._set_meta('synced_at', datetime.now(timezone.utc).isoformat())
+        return {'mode': 'changes', 'upserted': upserted, 'removed': removed}
+
+    def _upsert(self, rows: List[tuple]) -> int:
+        self.conn.executemany(
+            """
+            INSERT INTO files (id, name, mime_type, size, md5, created_time, modified_time, trashed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                name = excluded.name, mime_type = excluded.mime_type, size = excluded.size,
+                md5 = excluded.md5, created_time = excluded.created_time,
+                modified_time = excluded.modified_time, trashed = excluded.trashed
+            """,
+            rows,
+        )
+        return len(rows)
+
+    def _delete(self, file_ids: List[str]) -> int:
+        self.conn.executemany("DELETE FROM files WHERE id = ?", [(i,) for i in file_ids])
+        return len(file_ids)
+
+    def remove(self, file_ids: Iterable[str]) -> None:
+        """Drop files this process just deleted, ahead of the next sync"""
+        with self.conn:
+            self._delete(list(file_ids))
+
+    # Queries
+
+    def files(self, where: str = "", params: tuple = (),
+              order_by: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield mirrored files in Drive listing shape (mimeType, size, trashed, ...).
+
+        `where` and `order_by` are SQL over the files table columns: id,
+        name, mime_type, size, md5, created_time, modified_time, trashed.
+        """
+        sql = "SELECT * FROM files"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        for row in self.conn.execute(sql, params):
+            f = {_API_NAMES[k]: row[k] for k in _API_NAMES if row[k] is not None}
+            f['trashed'] = bool(row['trashed'])
+            yield f
+
+    def csv_files(self, created_before: Optional[datetime] = None,
+                  order_by: str = "created_time") -> Iterator[Dict[str, Any]]:
+        """CSV exports, optionally only those created before a UTC datetime"""
+        where, params = CSV_WHERE, ()
+        if created_before is not None:
+            where += " AND created_time < ?"
+            params = (_drive_time(created_before),)
+        return self.files(where, params, order_by)
+
+    def count(self, where: str = "", params: tuple = ()) -> int:
+        sql = "SELECT COUNT(*) FROM files" + (f" WHERE {where}" if where else "")
+        return self.conn.execute(sql, params).fetchone()[0]
+
+
+def _drive_time(value: datetime) -> str:
+    """Format like Drive's RFC 3339 timestamps so string comparison orders correctly"""
+    value = value.astimezone(timezone.utc)
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}Z"
+
+
+def describe_sync(result: Dict[str, Any]) -> str:
+    """One-line summary of a sync() result for the script banners"""
+    return (f"Inventory {result['mode']}: {result['upserted']:,} updated, "
+            f"{result['removed']:,} removed, {result['files']:,} files ({result['seconds']:.1f}s)")
@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+Streaming Drive → Cloud Storage transfers
+Downloads Drive files chunk by chunk straight into GCS resumable uploads, so
+memory per transfer is bounded by the chunk size, and runs several files at
+once on a worker pool. Objects can be gzip-compressed or converted to Parquet
+on the way through, and large files are uploaded as parallel parts that are
+composed into one object
+"""
+
+import base64
+import contextlib
+import gzip
+import hashlib
+import io
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload
+
+from rate_limit import ApiGovernor, get_governor, is_retryable
+
+# GCS resumable chunks must be multiples of 256 KB
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Stored form of each object: name suffix, content type, content encoding
+TRANSFORMS = {
+    'none': ('', 'text/csv', None),
+    'gzip': ('.gz', 'text/csv', 'gzip'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet', None),
+}
+
+# GCS compose accepts at most 32 source objects
+MAX_COMPOSE_PARTS = 32
+DEFAULT_PART_SIZE = 64 * 1024 * 1024
+
+# Reflected CRC-32C (Castagnoli) polynomial
+CRC32C_POLY = 0x82F63B78
+
+
+def _gf2_times(matrix: List[int], vector: int) -> int:
+    total = 0
+    for row in matrix:
+        if not vector:
+            break
+        if vector & 1:
+            total ^= row
+        vector >>= 1
+    return total
+
+
+def combine_crc32c(crc1: int, crc2: int, len2: int) -> int:
+    """
+    CRC-32C of A + B from crc(A), crc(B) and len(B), the way zlib's
+    crc32_combine does it: crc1 is advanced over len2 zero bytes with
+    repeatedly squared GF(2) operators, then xored with crc2.
+    """
+    # Operator for one zero bit, then squared into one for a zero byte
+    operator = [CRC32C_POLY] + [1 << n for n in range(31)]
+    for _ in range(3):
+        operator = [_gf2_times(operator, row) for row in operator]
+    while len2:
+        if len2 & 1:
+            crc1 = _gf2_times(operator, crc1)
+        len2 >>= 1
+        if len2:
+            operator = [_gf2_times(operator, row) for row in operator]
+    return crc1 ^ crc2
+
+
+def _crc32c_int(encoded: str) -> int:
+    """GCS reports crc32c as base64 of the big-endian value"""
+    return int.from_bytes(base64.b64decode(encoded), 'big')
+
+
+def _crc32c_b64(value: int) -> str:
+    return base64.b64encode(value.to_bytes(4, 'big')).decode()
+
+
+class _CountingWriter:
+    """File-like wrapper counting and hashing bytes on their way to `target`"""
+
+    closed = False
+
+    def __init__(self, target):
+        self.target = target
+        self.bytes_written = 0
+        self.md5 = hashlib.md5()
+
+    def write(self, data: bytes) -> int:
+        self.target.write(data)
+        self.md5.update(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self) -> None:
+        # The BlobWriter underneath flushes on its own chunk boundaries
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+# Transforms: write() source bytes, then close() once at the end, or abort()
+# after a failure to stop without finishing the output
+
+class _GzipTransform:
+    """gzip-compress into the target (each instance writes one gzip member)"""
+
+    def __init__(self, target, level: int = 6):
+        self._gzip = gzip.GzipFile(fileobj=target, mode='wb', compresslevel=level, mtime=0)
+
+    def write(self, data: bytes) -> int:
+        return self._gzip.write(data)
+
+    def close(self) -> None:
+        # Writes the trailer; leaves the target open
+        self._gzip.close()
+
+    def abort(self) -> None:
+        # Detach first so no trailer is written (now or when garbage collected)
+        self._gzip.fileobj = None
+        self._gzip.close()
+
+
+# Put on a _QueueReader's queue to make its reader fail instead of ending cleanly
+_ABORT = object()
+
+
+class _QueueReader(io.RawIOBase):
+    """Readable stream over byte chunks put on a queue (None marks the end)"""
+
+    def __init__(self, chunks: 'queue.Queue[Optional[bytes]]'):
+        self._chunks = chunks
+        self._current = b''
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if self._done:
+                return 0
+            chunk = self._chunks.get()
+            if chunk is _ABORT:
+                raise IOError("Source stream aborted")
+            if chunk is None:
+                self._done = True
+                return 0
+            self._current = chunk
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+
+def _infer_column_types(first_chunk: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Column types from the first downloaded chunk.
+
+    Columns that are empty throughout the chunk come back as null; they are
+    widened to string so later values still parse. Returns None (let
+    pyarrow infer) if the chunk can't be parsed on its own.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+
+    sample = first_chunk[:first_chunk.rfind(b'\n') + 1] or first_chunk
+    try:
+        table = pcsv.read_csv(
+            io.BytesIO(sample),
+            parse_options=pcsv.ParseOptions(newlines_in_values=True),
+        )
+    except (pa.ArrowInvalid, ValueError):
+        return None
+    return {
+        field.name: pa.string() if pa.types.is_null(field.type) else field.type
+        for field in table.schema
+    }
+
+
+class _ParquetTransform:
+    """
+    Convert streamed CSV bytes to Parquet.
+
+    Column types are inferred from the first chunk; pyarrow's streaming CSV
+    reader then parses on a background thread as chunks arrive and each
+    block is written out as a row group, so memory stays bounded.
+    """
+
+    def __init__(self, target, block_size: int = DEFAULT_CHUNK_SIZE, max_pending: int = 4):
+        self.target = target
+        self.block_size = block_size
+        self._chunks: 'queue.Queue[Optional[bytes]]' = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def write(self, data: bytes) -> int:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._convert, args=(_infer_column_types(bytes(data)),),
+                name='parquet-transform', daemon=True,
+            )
+            self._thread.start()
+        self._put(bytes(data))
+        return len(data)
+
+    def _put(self, chunk: Optional[bytes]) -> None:
+        # Time out periodically so a failed converter can't leave us blocked
+        while True:
+            self._raise_if_failed()
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise IOError(f"Parquet conversion failed: {self._error}") from self._error
+
+    def _convert(self, column_types: Optional[Dict[str, Any]]) -> None:
+        import pyarrow.csv as pcsv
+        import pyarrow.parquet as pq
+
+        try:
+            reader = pcsv.open_csv(
+                _QueueReader(self._chunks),
+                read_options=pcsv.ReadOptions(block_size=self.block_size),
+                parse_options=pcsv.ParseOptions(newlines_in_values=True),
+                convert_options=pcsv.ConvertOptions(column_types=column_types),
+            )
+            with pq.ParquetWriter(self.target, reader.schema, compression='zstd') as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        except BaseException as e:
+            self._error = e
+
+    def close(self) -> None:
+        if self._thread is None:
+            return  # empty source
+        self._put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def abort(self) -> None:
+        """Make the converter thread fail fast and wait for it to exit"""
+        if self._thread is None:
+            return
+        # The queue may be full of chunks nobody will read (the converter may
+        # already have failed), so make room for the marker
+        while True:
+            try:
+                self._chunks.put_nowait(_ABORT)
+                break
+            except queue.Full:
+                try:
+                    self._chunks.get_nowait()
+                except queue.Empty:
+                    pass
+        self._thread.join()
+
+
+def _make_transform(transform: str, target, block_size: int = DEFAULT_CHUNK_SIZE):
+    if transform == 'gzip':
+        return _GzipTransform(target)
+    if transform == 'parquet':
+        return _ParquetTransform(target, block_size)
+    if transform == 'none':
+        return target
+    raise ValueError(f"Unknown transform {transform!r}; expected one of {sorted(TRANSFORMS)}")
+
+
+def _open_blob(blob, transform: str, chunk_size: int):
+    _, content_type, content_encoding = TRANSFORMS[transform]
+    if content_encoding:
+        # Served decompressed to clients that don't accept gzip
+        blob.content_encoding = content_encoding
+    return blob.open('wb', chunk_size=chunk_size, content_type=content_type, ignore_flush=True)
+
+
+@contextlib.contextmanager
+def _upload(blob, transform: str, chunk_size: int):
+    """
+    A BlobWriter whose upload is finalized only if the block succeeds.
+
+    On any error the resumable upload is cancelled instead, so a failed
+    transfer never commits a truncated object under the final name.
+    """
+    writer = _open_blob(blob, transform, chunk_size)
+    try:
+        yield writer
+    except BaseException:
+        writer.terminate()
+        raise
+    writer.close()
+
+
+def _download_retryable(error: Exception) -> bool:
+    # Only Drive-side failures: next_chunk advances its offset before handing
+    # data to the GCS writer, so retrying after a write error would skip bytes
+    return isinstance(error, HttpError) and is_retryable(error)
+
+
+def stream_file(drive_service, bucket, file: Dict[str, Any], blob_name: str,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                transform: str = 'none',
+                governor: Optional[ApiGovernor] = None) -> Dict[str, Any]:
+    """
+    Copy one Drive file into a GCS blob without buffering the whole file.
+
+    Each downloaded chunk goes through the transform and into a
+    resumable-upload BlobWriter that flushes every chunk_size bytes, so only
+    a few chunks are held in memory. Each chunk request is paced and
+    retried by the governor. Transformed objects carry the source md5 and
+    size as metadata so they can still be verified against Drive.
+
+    Returns:
+        Dict with id, name, blob, bytes (source), stored_bytes, md5 (hex
+        digest of the source bytes), transform, parts, seconds and mb_per_s
+    """
+    governor = governor or get_governor()
+    chunk_size = max(CHUNK_ALIGNMENT, chunk_size - chunk_size % CHUNK_ALIGNMENT)
+    start = time.perf_counter()
+
+    blob = bucket.blob(blob_name)
+    request = drive_service.files().get_media(fileId=file['id'])
+    with _upload(blob, transform, chunk_size) as writer:
+        stored = _CountingWriter(writer)
+        sink = _make_transform(transform, stored, block_size=chunk_size)
+        source = _CountingWriter(sink)
+        try:
+            downloader = MediaIoBaseDownload(source, request, chunksize=chunk_size)
+            done = False
+            while not done:
+                _, done = governor.call(downloader.next_chunk, retry_on=_download_retryable)
+        except BaseException:
+            # Don't finish the output of a partial download, but do end the
+            # parquet converter thread, which would otherwise wait forever
+            sink.abort()
+            raise
+        sink.close()
+
+        expected = int(file.get('size', source.bytes_written))
+        if source.bytes_written != expected:
+            raise IOError(f"Transferred {source.bytes_written} bytes, Drive reports {expected}")
+
+    if transform != 'none':
+        blob.metadata = {'source-md5': source.md5.hexdigest(),
+                         'source-size': str(source.bytes_written)}
+        governor.call(blob.patch)
+
+    seconds = time.perf_counter() - start
+    return {
+        'id': file['id'],
+        'name': file['name'],
+        'blob': blob_name,
+        'bytes': source.bytes_written,
+        'stored_bytes': stored.bytes_written,
+        'md5': source.md5.hexdigest(),
+        'transform': transform,
+        'parts': 1,
+        'seconds': seconds,
+        'mb_per_s': source.bytes_written / (1024 ** 2) / seconds if seconds else 0.0,
+    }
+
+
+def stream_file_composite(make_drive_service: Callable[[], Any], bucket,
+                          file: Dict[str, Any], blob_name: str,
+                          part_size: int = DEFAULT_PART_SIZE,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          transform: str = 'none',
+                          max_workers: int = 4,
+                          governor: Optional[ApiGovernor] = None) -> Dict[str, Any]:
+    """
+    Copy a large Drive file as parallel byte ranges, then compose them.
+
+    Each part downloads its range of the Drive file with Range requests,
+    uploads it (gzip parts become members of one multi-member gzip), and is
+    checked against the md5 GCS computed for it before the parts are
+    composed into blob_name and deleted. Composite objects have no md5, so
+    the composed object's crc32c must equal the parts' crc32c combined in
+    order; that value and the number of source bytes actually read are kept
+    in metadata for verify_upload. Drive's md5Checksum can't be compared.
+
+    Parquet needs the whole stream in order and can't be split this way.
+
+    Returns:
+        Same shape as stream_file; md5 is None because no single pass saw
+        every source byte in order
+    """
+    if transform == 'parquet':
+        raise ValueError("Parquet conversion can't be split into parallel parts")
+    governor = governor or get_governor()
+    chunk_size = max(CHUNK_ALIGNMENT, chunk_size - chunk_size % CHUNK_ALIGNMENT)
+    start = time.perf_counter()
+
+    size = int(file['size'])
+    parts = max(1, min(MAX_COMPOSE_PARTS, math.ceil(size / part_size)))
+    part_size = math.ceil(size / parts)
+    ranges = [(k, k * part_size, min(size, (k + 1) * part_size)) for k in range(parts)]
+
+    def upload_part(k: int, first: int, end: int):
+        drive_service = make_drive_service()
+        part = bucket.blob(f"{blob_name}.part-{k:02d}")
+        with _upload(part, transform, chunk_size) as writer:
+            stored = _CountingWriter(writer)
+            sink = _make_transform(transform, stored)
+            read = 0
+            try:
+                for offset in range(first, end, chunk_size):
+                    last = min(end, offset + chunk_size) - 1
+                    request = drive_service.files().get_media(fileId=file['id'])
+                    request.headers['range'] = f"bytes={offset}-{last}"
+                    data = governor.execute(request)
+                    if len(data) != last - offset + 1:
+                        raise IOError(f"Range {offset}-{last} returned {len(data)} bytes")
+                    sink.write(data)
+                    read += len(data)
+            except BaseException:
+                sink.abort()
+                raise
+            sink.close()
+
+        governor.call(part.reload)
+        if part.md5_hash != base64.b64encode(stored.md5.digest()).decode():
+            raise IOError(f"Part {k} of {file['name']} doesn't match what was uploaded")
+        return part, stored.bytes_written, read
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, parts)),
+                                thread_name_prefix='transfer-part') as pool:
+            uploaded = list(pool.map(lambda r: upload_part(*r), ranges))
+    except Exception:
+        # Don't leave orphaned parts behind; the file is retried whole next run
+        for k in range(parts):
+            try:
+                bucket.blob(f"{blob_name}.part-{k:02d}").delete()
+            except Exception:
+                pass
+        raise
+
+    blob = bucket.blob(blob_name)
+    _, blob.content_type, encoding = TRANSFORMS[transform]
+    if encoding:
+        blob.content_encoding = encoding
+    source_bytes = sum(read for _, _, read in uploaded)
+    crc32c = 0
+    for part, _, _ in uploaded:
+        crc32c = combine_crc32c(crc32c, _crc32c_int(part.crc32c), part.size)
+    blob.metadata = {'source-size': str(source_bytes), 'source-parts': str(parts),
+                     'stored-crc32c': _crc32c_b64(crc32c)}
+    governor.call(blob.compose, [part for part, _, _ in uploaded])
+    for part, _, _ in uploaded:
+        governor.call(part.delete)
+    if blob.crc32c != blob.metadata['stored-crc32c']:
+        governor.call(blob.delete)
+        raise IOError(f"Composed {blob_name} has crc32c {blob.crc32c}, "
+                      f"parts combine to {_crc32c_b64(crc32c)}")
+
+    seconds = time.perf_counter() - start
+    return {
+        'id': file['id'],
+        'name': file['name'],
+        'blob': blob_name,
+        'bytes': source_bytes,
+        'stored_bytes': sum(n for _, n, _ in uploaded),
+        'md5': None,
+        'transform': transform,
+        'parts': parts,
+        'seconds': seconds,
+        'mb_per_s': source_bytes / (1024 ** 2) / seconds if seconds else 0.0,
+    }
+
+
+def verify_upload(bucket, file: Dict[str, Any], blob_name: str,
+                  governor: Optional[ApiGovernor] = None) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Check a finished upload against Drive's metadata without downloading it.
+
+    Compares Drive's md5Checksum (hex) with the GCS object's md5 (base64),
+    or with the source md5 recorded on transformed objects. Composite
+    objects are checked by the source bytes read and their recorded crc32c;
+    files Drive has no checksum for are checked by size. When
+    the file carries the `generation` seen at an earlier verification, the
+    object must still be that generation (i.e. not overwritten since).
+
+    Returns:
+        (problem, generation): problem is None when the object matches,
+        otherwise the reason it doesn't; generation is the object's current
+        generation (None when it doesn't exist)
+    """
+    blob = (governor or get_governor()).call(bucket.get_blob, blob_name)
+    if blob is None:
+        return f"gs://{bucket.name}/{blob_name} does not exist", None
+    return _upload_problem(blob, file), blob.generation
+
+
+def _upload_problem(blob, file: Dict[str, Any]) -> Optional[str]:
+    verified_generation = file.get('generation')
+    if verified_generation is not None and blob.generation != int(verified_generation):
+        return f"object was replaced: generation {blob.generation}, verified {verified_generation}"
+
+    drive_md5 = file.get('md5Checksum')
+    expected = int(file.get('size', 0))
+    metadata = blob.metadata or {}
+
+    if 'source-size' in metadata:
+        if int(metadata['source-size']) != expected:
+            return f"size mismatch: Drive {expected}, source streamed {metadata['source-size']}"
+        stored_crc32c = metadata.get('stored-crc32c')
+        if stored_crc32c and stored_crc32c != blob.crc32c:
+            return f"crc32c mismatch: parts combined to {stored_crc32c}, GCS {blob.crc32c}"
+        source_md5 = metadata.get('source-md5')
+        if drive_md5 and source_md5 and source_md5 != drive_md5:
+            return f"md5 mismatch: Drive {drive_md5}, source streamed {source_md5}"
+        return None
+
+    if drive_md5 and blob.md5_hash:
+        gcs_md5 = base64.b64decode(blob.md5_hash).hex()
+        if gcs_md5 != drive_md5:
+            return f"md5 mismatch: Drive {drive_md5}, GCS {gcs_md5}"
+        return None
+
+    if blob.size != expected:
+        return f"size mismatch: Drive {expected}, GCS {blob.size}"
+    return None
+
+
+def transfer_files(files: List[Dict[str, Any]],
+                   make_drive_service: Callable[[], Any],
+                   bucket,
+                   blob_name: Callable[[Dict[str, Any]], str],
+                   concurrency: int = 4,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   transform: str = 'none',
+                   composite_threshold: Optional[int] = None,
+                   part_size: int = DEFAULT_PART_SIZE,
+                   on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   governor: Optional[ApiGovernor] = None) -> Dict[str, Any]:
+    """
+    Stream many files concurrently.
+
+    Args:
+        make_drive_service: Builds a Drive service; called once per worker
+            thread because googleapiclient's HTTP transport isn't thread-safe
+        blob_name: Maps a Drive file to its destination object name
+        transform: 'none', 'gzip' or 'parquet' (see TRANSFORMS)
+        composite_threshold: Files at least this many bytes are uploaded as
+            parallel parts and composed (not for parquet); None disables
+        on_result: Called with each per-file result dict as it finishes;
+            failed files carry an 'error' key
+        governor: Paces and retries API calls; its AIMD limit caps how many
+            of the `concurrency` workers transfer at once, so throttling
+            shrinks the effective pool and clean runs grow it back. Its
+            ceiling is raised to `concurrency` if lower
+
+    Returns:
+        Aggregate stats: migrated, failed, bytes, stored_bytes, seconds,
+        mb_per_s, results
+    """
+    governor = governor or get_governor()
+    # Otherwise the governor's default ceiling would silently cap the pool
+    governor.concurrency.raise_ceiling(concurrency)
+    local = threading.local()
+
+    def drive():
+        if not hasattr(local, 'service'):
+            local.service = make_drive_service()
+        return local.service
+
+    def composite(file) -> bool:
+        return (composite_threshold is not None and transform != 'parquet'
+                and int(file.get('size', 0)) >= composite_threshold)
+
+    def run(file):
+        try:
+            with governor.slot():
+                if composite(file):
+                    result = stream_file_composite(make_drive_service, bucket, file, blob_name(file),
+                                                   part_size=part_size, chunk_size=chunk_size,
+                                                   transform=transform, governor=governor)
+                else:
+                    result = stream_file(drive(), bucket, file, blob_name(file),
+                                         chunk_size=chunk_size, transform=transform,
+                                         governor=governor)
+            return result
+        except Exception as e:
+            return {'id': file['id'], 'name': file.get('name'), 'bytes': 0, 'error': str(e)}
+
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='transfer') as pool:
+        futures = [pool.submit(run, f) for f in files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    seconds = time.perf_counter() - start
+    succeeded = [r for r in results if 'error' not in r]
+    total_bytes = sum(r['bytes'] for r in succeeded)
+    return {
+        'migrated': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'bytes': total_bytes,
+        'stored_bytes': sum(r['stored_bytes'] for r in succeeded),
+        'seconds': seconds,
+        'mb_per_s': total_bytes / (1024 ** 2) / seconds if seconds else 0.0,
+        'results': results,
+    }
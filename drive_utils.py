@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Shared Google Drive helpers for the storage maintenance scripts
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from iter_utils import prefetch
+from rate_limit import ApiGovernor, get_governor, is_retryable
+
+# Matches what the BigQuery → Sheets/CSV exports leave behind
+CSV_QUERY = "mimeType='text/csv' or name contains '.csv'"
+
+
+def iter_drive_pages(drive_service, q: Optional[str] = None,
+                     fields: str = "id,name",
+                     order_by: Optional[str] = None,
+                     page_size: int = 1000,
+                     governor: Optional[ApiGovernor] = None) -> Iterator[list]:
+    """Yield each page of files().list, following nextPageToken to the end"""
+    governor = governor or get_governor()
+    page_token = None
+    while True:
+        params = {
+            'pageSize': page_size,
+            'fields': f"nextPageToken,files({fields})",
+        }
+        if q:
+            params['q'] = q
+        if order_by:
+            params['orderBy'] = order_by
+        if page_token:
+            params['pageToken'] = page_token
+
+        response = governor.execute(drive_service.files().list(**params))
+        yield response.get('files', [])
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def iter_drive_files(drive_service, q: Optional[str] = None,
+                     fields: str = "id,name",
+                     order_by: Optional[str] = None,
+                     page_size: int = 1000,
+                     prefetch_pages: int = 1,
+                     governor: Optional[ApiGovernor] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every file matching q across all pages.
+
+    Only the requested file `fields` are fetched. The next page is requested
+    in a background thread while the caller works through the current one.
+    Don't issue other calls on the same drive_service until the iterator is
+    exhausted; its httplib2 transport is not thread-safe.
+    """
+    pages = iter_drive_pages(drive_service, q=q, fields=fields,
+                             order_by=order_by, page_size=page_size, governor=governor)
+    for page in prefetch(pages, depth=prefetch_pages):
+        yield from page
+
+
+def batch_delete_files(drive_service, files: List[Dict[str, Any]],
+                       batch_size: int = 100,
+                       max_retries: int = 3,
+                       progress: Optional[Callable[[int, int], None]] = None,
+                       governor: Optional[ApiGovernor] = None) -> Dict[str, Any]:
+    """
+    Delete files with Drive HTTP batch requests (up to 100 deletes per round trip).
+
+    Each batch is paced by the governor as one quota unit per delete.
+    Items that fail with a rate-limit or server error are re-sent together
+    in new batches (up to batch_size each) after the governor's jittered
+    backoff; other failures are reported immediately. Files that are already gone (404) are counted as missing,
+    not failed. A batch that fails as a whole (e.g. a dropped connection)
+    fails each of its items the same way, so the results of earlier batches
+    are still returned.
+
+    Args:
+        files: Dicts with at least 'id' (and 'name' for reporting)
+        progress: Called as progress(done, total) after each batch
+
+    Returns:
+        Dict with deleted ids, missing ids and failed {id: error message}
+    """
+    governor = governor or get_governor()
+    batch_size = min(batch_size, 100)
+    total = len(files)
+    deleted: List[str] = []
+    missing: List[str] = []
+    failed: Dict[str, str] = {}
+
+    pending = [f['id'] for f in files]
+    for attempt in range(max_retries + 1):
+        retry = []
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            errors: Dict[str, Exception] = {}
+
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    errors[request_id] = exception
+
+            def send():
+                errors.clear()
+                batch = drive_service.new_batch_http_request(callback=callback)
+                for file_id in chunk:
+                    batch.add(drive_service.files().delete(fileId=file_id), request_id=file_id)
+                batch.execute()
+
+            envelope_error = None
+            try:
+                governor.call(send, cost=len(chunk))
+            except Exception as e:
+                # The batch envelope itself kept failing (an HTTP or transport
+                # error): every item in it failed with that error
+                envelope_error = e
+
+            for file_id in chunk:
+                error = envelope_error or errors.get(file_id)
+                if envelope_error is None and error is not None:
+                    # call() already fed the batch's own outcome to the AIMD limit
+                    governor.record(error)
+                if error is None:
+                    deleted.append(file_id)
+                elif isinstance(error, HttpError) and error.resp.status == 404:
+                    missing.append(file_id)
+                elif is_retryable(error) and attempt < max_retries:
+                    retry.append(file_id)
+                else:
+                    failed[file_id] = str(error)
+
+            if progress is not None:
+                progress(len(deleted) + len(missing) + len(failed), total)
+
+        if not retry:
+            break
+        governor.backoff(attempt)
+        pending = retry
+
+    return {'deleted': deleted, 'missing': missing, 'failed': failed}
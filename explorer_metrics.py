@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Per-call instrumentation for JobsDataExplorer
+Records wall time, BigQuery job statistics, cache hits and row counts for
+each public method call and fans them out to pluggable sinks
+"""
+
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# The call being measured in the current thread/task (outermost method only)
+_current_call: ContextVar[Optional['CallMetrics']] = ContextVar('explorer_call', default=None)
+
+
+@dataclass
+class CallMetrics:
+    """Measurements for one explorer method call"""
+    method: str
+    started_at: float = field(default_factory=time.time)
+    wall_ms: float = 0.0
+    queue_ms: float = 0.0
+    execute_ms: float = 0.0
+    bytes_processed: int = 0
+    bytes_billed: int = 0
+    slot_ms: int = 0
+    jobs: int = 0
+    local_cache_hit: bool = False
+    bq_cache_hit: bool = False
+    rows: int = 0
+    job_ids: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def cache_hit(self) -> bool:
+        return self.local_cache_hit or self.bq_cache_hit
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = asdict(self)
+        record['cache_hit'] = self.cache_hit
+        return record
+
+
+class MetricsRecorder:
+    """Collects CallMetrics for explorer calls and forwards them to sinks"""
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        """Each sink needs a record(CallMetrics) method"""
+        self.sinks = list(sinks or [])
+
+    @contextmanager
+    def call(self, method: str):
+        """Measure a method call; nested calls fold into the outermost one"""
+        if _current_call.get() is not None:
+            yield None
+            return
+
+        metrics = CallMetrics(method=method)
+        token = _current_call.set(metrics)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        except Exception as e:
+            metrics.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            metrics.wall_ms = (time.perf_counter() - start) * 1000
+            _current_call.reset(token)
+            for sink in self.sinks:
+                sink.record(metrics)
+
+    @staticmethod
+    def record_job(query_job) -> None:
+        """Fold a finished QueryJob's statistics into the active call"""
+        metrics = _current_call.get()
+        if metrics is None:
+            return
+        metrics.jobs += 1
+        metrics.job_ids.append(query_job.job_id)
+        if query_job.created and query_job.started:
+            metrics.queue_ms += (query_job.started - query_job.created).total_seconds() * 1000
+        if query_job.started and query_job.ended:
+            metrics.execute_ms += (query_job.ended - query_job.started).total_seconds() * 1000
+        metrics.bytes_processed += query_job.total_bytes_processed or 0
+        metrics.bytes_billed += query_job.total_bytes_billed or 0
+        metrics.slot_ms += query_job.slot_millis or 0
+        metrics.bq_cache_hit = metrics.bq_cache_hit or bool(query_job.cache_hit)
+
+    @staticmethod
+    def record_cache_hit() -> None:
+        metrics = _current_call.get()
+        if metrics is not None:
+            metrics.local_cache_hit = True
+
+
+def instrumented(method):
+    """Decorator timing an explorer method when the explorer has a recorder"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, *args, **kwargs)
+        with self.metrics.call(method.__name__) as metrics:
+            result = method(self, *args, **kwargs)
+            if metrics is not None:
+                metrics.rows = _count_rows(result)
+            return result
+    return wrapper
+
+
+def _count_rows(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(_count_rows(v) for v in result.values())
+    if isinstance(result, list):
+        return len(result)
+    return 1 if result is not None else 0
+
+
+# Sinks
+
+class JsonLogSink:
+    """Writes one JSON object per call to a stream or logger"""
+
+    def __init__(self, stream=None, logger: Optional[logging.Logger] = None):
+        self.stream = stream
+        self.logger = logger
+        if stream is None and logger is None:
+            self.stream = sys.stderr
+
+    def record(self, metrics: CallMetrics) -> None:
+        line = json.dumps(metrics.to_dict(), default=str)
+        if self.logger is not None:
+            self.logger.info(line)
+        if self.stream is not None:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class HistogramRegistry:
+    """In-process per-method latency samples and running totals"""
+
+    COUNTERS = ('bytes_processed', 'bytes_billed', 'slot_ms', 'jobs', 'rows')
+
+    def __init__(self, max_samples: int = 10000):
+        """Keeps the most recent max_samples wall times per method"""
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def record(self, metrics: CallMetrics) -> None:
+        with self._lock:
+            self._samples[metrics.method].append(metrics.wall_ms)
+            totals = self._totals[metrics.method]
+            totals['count'] += 1
+            totals['wall_ms'] += metrics.wall_ms
+            totals['cache_hits'] += metrics.cache_hit
+            totals['errors'] += metrics.error is not None
+            for name in self.COUNTERS:
+                totals[name] += getattr(metrics, name)
+
+    def percentile(self, method: str, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of a method's wall time in ms"""
+        with self._lock:
+            samples = list(self._samples.get(method, ()))
+        return float(np.percentile(samples, q)) if samples else None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-method totals plus p50/p95/p99 wall time"""
+        with self._lock:
+            methods = {m: (list(s), dict(self._totals[m])) for m, s in self._samples.items()}
+        result = {}
+        for method, (samples, totals) in methods.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            result[method] = {**totals, 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+        return result
+
+    def summary(self) -> pd.DataFrame:
+        """snapshot() as a DataFrame sorted by p95, slowest first"""
+        rows = [{'method': m, **stats} for m, stats in self.snapshot().items()]
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).sort_values('p95_ms', ascending=False).reset_index(drop=True)
+
+
+class PrometheusExporter:
+    """Renders a HistogramRegistry in the Prometheus text exposition format"""
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, registry: HistogramRegistry, prefix: str = 'mobius_explorer'):
+        self.registry = registry
+        self.prefix = prefix
+
+    def record(self, metrics: CallMetrics) -> None:
+        # Also usable as a sink so one object can be passed to MetricsRecorder
+        self.registry.record(metrics)
+
+    def render(self) -> str:
+        p = self.prefix
+        snapshot = self.registry.snapshot()
+        lines = [
+            f"# HELP {p}_call_duration_seconds Wall time of explorer method calls",
+            f"# TYPE {p}_call_duration_seconds summary",
+        ]
+        for method, stats in snapshot.items():
+            for q in self.QUANTILES:
+                value = self.registry.percentile(method, q * 100) / 1000
+                lines.append(f'{p}_call_duration_seconds{{method="{method}",quantile="{q}"}} {value}')
+            lines.append(f'{p}_call_duration_seconds_sum{{method="{method}"}} {stats["wall_ms"] / 1000}')
+            lines.append(f'{p}_call_duration_seconds_count{{method="{method}"}} {int(stats["count"])}')
+
+        counters = [
+            ('bytes_processed_total', 'bytes_processed', 'Bytes processed by BigQuery jobs'),
+            ('bytes_billed_total', 'bytes_billed', 'Bytes billed for BigQuery jobs'),
+            ('slot_milliseconds_total', 'slot_ms', 'Slot milliseconds consumed'),
+            ('rows_returned_total', 'rows', 'Rows returned to callers'),
+            ('cache_hits_total', 'cache_hits', 'Calls served from a cache'),
+            ('errors_total', 'errors', 'Calls that raised'),
+        ]
+        for name, key, help_text in counters:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} counter")
+            for method, stats in snapshot.items():
+                lines.append(f'{p}_{name}{{method="{method}"}} {int(stats[key])}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9464, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """Serve /metrics from a background thread; returns the server"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+        return server
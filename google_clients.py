@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Shared Google API clients for the Drive/Docs/Cloud Storage scripts
+Loads service-account credentials once, builds Drive/Docs clients from the
+parsed static discovery documents, reuses one keep-alive HTTP connection pool
+per thread across those clients, and refreshes the access token in the
+background before it expires. Delegated (impersonated) credentials for many
+Workspace users come from a bounded token cache that keeps active users'
+tokens warm
+"""
+
+import functools
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import google_auth_httplib2
+import httplib2
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+DEFAULT_KEY_FILE = 'sa-key-full.json'
+DRIVE_SCOPES = ('https://www.googleapis.com/auth/drive',)
+DOCS_SCOPES = (
+    'https://www.googleapis.com/auth/documents',
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/drive.file',
+)
+
+# Refresh this long before the token expires so no request waits on (or
+# fails with) an expired token
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Root URL of a local stand-in for the Drive/Docs APIs (e.g.
+# http://127.0.0.1:8080/). Cloud Storage reads its own STORAGE_EMULATOR_HOST.
+EMULATOR_ENV = 'GOOGLE_API_EMULATOR_HOST'
+
+
+class _EmulatorCredentials(AnonymousCredentials):
+    """No token at all; emulators don't check one"""
+    service_account_email = 'emulator@localhost'
+
+
+@functools.lru_cache(maxsize=None)
+def discovery_document(service: str, version: str) -> Dict[str, Any]:
+    """Parsed discovery document bundled with googleapiclient (no network fetch)"""
+    document = discovery_cache.get_static_doc(service, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {service} {version}")
+    return json.loads(document)
+
+
+def _utcnow() -> datetime:
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ClientFactory:
+    """One credential set and its API clients, shared by everything in the process"""
+
+    def __init__(self, key_file: str = DEFAULT_KEY_FILE,
+                 scopes: Sequence[str] = DRIVE_SCOPES,
+                 subject: Optional[str] = None,
+                 credentials=None,
+                 refresh_margin: timedelta = REFRESH_MARGIN,
+                 timeout: int = 60,
+                 tokens: Optional['DelegatedTokenCache'] = None,
+                 root_url: Optional[str] = None):
+        """
+        Args:
+            key_file: Service account key, read on first use
+            subject: User to impersonate through domain-wide delegation
+            credentials: Use these credentials instead of loading key_file
+            timeout: Socket timeout for Drive/Docs HTTP connections
+            tokens: Take the subject's credentials from this cache, which
+                mints and refreshes them, instead of managing our own
+            root_url: Send Drive/Docs requests here, unauthenticated, instead
+                of googleapis.com (defaults to $GOOGLE_API_EMULATOR_HOST)
+        """
+        self.key_file = key_file
+        self.scopes = list(scopes)
+        self.subject = subject
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self._credentials = credentials
+        self._tokens = tokens
+        self.root_url = root_url or os.environ.get(EMULATOR_ENV)
+        if self.root_url:
+            self._credentials = _EmulatorCredentials()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._session = requests.Session()
+        self._timer: Optional[threading.Timer] = None
+        self._storage_clients: Dict[Tuple[str, Any], Any] = {}
+
+    # Credentials
+
+    @property
+    def credentials(self):
+        """Credentials with a token that is valid for at least refresh_margin"""
+        if self.root_url:
+            return self._credentials
+        if self._tokens is not None:
+            return self._tokens.credentials(self.subject, self.scopes)
+        with self._lock:
+            if self._credentials is None:
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.key_file, scopes=self.scopes
+                )
+                if self.subject:
+                    credentials = credentials.with_subject(self.subject)
+                self._credentials = credentials
+            if self._needs_refresh():
+                self._refresh()
+            return self._credentials
+
+    def _needs_refresh(self) -> bool:
+        credentials = self._credentials
+        if not credentials.token or credentials.expiry is None:
+            return True
+        return credentials.expiry - _utcnow() < self.refresh_margin
+
+    def _refresh(self) -> None:
+        # Caller holds self._lock
+        self._credentials.refresh(Request(session=self._session))
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        expiry = self._credentials.expiry
+        if expiry is None:
+            return
+        delay = (expiry - _utcnow() - self.refresh_margin).total_seconds()
+        self._timer = threading.Timer(max(delay, 0.0), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        with self._lock:
+            try:
+                self._refresh()
+            except Exception:
+                # Requests still refresh on demand if the background attempt fails
+                pass
+
+    def close(self) -> None:
+        """Stop the background refresh"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    # Discovery clients
+
+    def _http(self):
+        # httplib2 isn't thread-safe, so each thread gets its own connection pool,
+        # shared by every discovery client built on that thread
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.http = http
+        return http
+
+    def service(self, name: str, version: str):
+        """A discovery client for this thread, built once per (name, version)"""
+        services = self._local.__dict__.setdefault('services', {})
+        key = (name, version)
+        if key not in services:
+            document = discovery_document(name, version)
+            if self.root_url:
+                # Batch and upload URLs are built from rootUrl too, so swap it
+                # rather than passing api_endpoint
+                document = {**document, 'rootUrl': self.root_url.rstrip('/') + '/'}
+            services[key] = build_from_document(document, http=self._http())
+        return services[key]
+
+    def drive(self):
+        return self.service('drive', 'v3')
+
+    def docs(self):
+        return self.service('docs', 'v1')
+
+    # Cloud Storage
+
+    def storage(self, project: str, credentials=None):
+        """
+        A cached storage.Client; its requests session keeps connections alive.
+
+        Uses Application Default Credentials unless credentials are given.
+        """
+        from google.cloud import storage
+
+        key = (project, id(credentials))
+        with self._lock:
+            if key not in self._storage_clients:
+                self._storage_clients[key] = storage.Client(project=project, credentials=credentials)
+            return self._storage_clients[key]
+
+
+class _TokenEntry:
+    """One (subject, scopes) credential in a DelegatedTokenCache"""
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.lock = threading.Lock()
+        self.used = 0.0
+        self.minted = 0.0
+        self.factory: Optional[ClientFactory] = None
+
+
+class DelegatedTokenCache:
+    """
+    Access tokens for many impersonated users, minted once and kept warm.
+
+    Entries are keyed by (subject, scopes) and evicted least recently used
+    beyond max_entries. Concurrent callers for the same key share one token
+    request, and tokens of users active since their last mint are refreshed
+    in the background before they expire; idle users' tokens are left to
+    lapse and minted again on their next use.
+    """
+
+    def __init__(self, key_file: str = DEFAULT_KEY_FILE,
+                 max_entries: int = 1024,
+                 refresh_margin: timedelta = REFRESH_MARGIN,
+                 refresh_workers: int = 4,
+                 credentials=None):
+        """
+        Args:
+            key_file: Service account key with domain-wide delegation
+            credentials: Base service account credentials to delegate from
+                instead of loading key_file
+            refresh_workers: Threads minting tokens in the background
+        """
+        self.key_file = key_file
+        self.max_entries = max_entries
+        self.refresh_margin = refresh_margin
+        self._base = credentials
+        self._entries: 'OrderedDict[Tuple[str, Tuple[str, ...]], _TokenEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._schedule: List[Tuple[float, int, Tuple[str, Tuple[str, ...]], _TokenEntry]] = []
+        self._sequence = itertools.count()
+        self._session = requests.Session()
+        self._pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='token-refresh')
+        self._refresher: Optional[threading.Thread] = None
+        self._closed = False
+        self.lookups = 0
+        self.mints = 0
+        self.background_refreshes = 0
+        self.evictions = 0
+
+    def _entry(self, subject: str, scopes: Sequence[str]) -> Tuple[Tuple[str, Tuple[str, ...]], _TokenEntry]:
+        key = (subject, tuple(sorted(scopes)))
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                if self._base is None:
+                    self._base = service_account.Credentials.from_service_account_file(self.key_file)
+                # with_subject/with_scopes copy the parsed key, no file read or signing
+                entry = _TokenEntry(self._base.with_subject(subject).with_scopes(list(key[1])))
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            self._entries.move_to_end(key)
+            entry.used = time.monotonic()
+        return key, entry
+
+    def credentials(self, subject: str, scopes: Sequence[str]):
+        """Credentials for subject with a token valid for at least refresh_margin"""
+        key, entry = self._entry(subject, scopes)
+        # Single flight: whoever gets the entry lock mints, the rest reuse its token
+        with entry.lock:
+            if self._needs_refresh(entry.credentials):
+                self._mint(key, entry)
+        return entry.credentials
+
+    def token(self, subject: str, scopes: Sequence[str]) -> str:
+        """A bearer token for subject"""
+        return self.credentials(subject, scopes).token
+
+    def factory(self, subject: str, scopes: Sequence[str] = DRIVE_SCOPES) -> ClientFactory:
+        """A ClientFactory acting as subject, cached and evicted with its token"""
+        _, entry = self._entry(subject, scopes)
+        with entry.lock:
+            if entry.factory is None:
+                entry.factory = ClientFactory(self.key_file, scopes, subject, tokens=self)
+            return entry.factory
+
+    def _needs_refresh(self, credentials) -> bool:
+        if not credentials.token or credentials.expiry is None:
+            return True
+        return credentials.expiry - _utcnow() < self.refresh_margin
+
+    def _mint(self, key, entry: _TokenEntry) -> None:
+        # Caller holds entry.lock
+        entry.credentials.refresh(Request(session=self._session))
+        entry.minted = time.monotonic()
+        with self._lock:
+            self.mints += 1
+            if entry.credentials.expiry is None or self._closed:
+                return
+            delay = (entry.credentials.expiry - _utcnow() - self.refresh_margin).total_seconds()
+            heapq.heappush(self._schedule, (entry.minted + max(delay, 0.0), next(self._sequence), key, entry))
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run_refresher,
+                                                   name='token-scheduler', daemon=True)
+                self._refresher.start()
+            self._wakeup.notify()
+
+    def _run_refresher(self) -> None:
+        with self._lock:
+            while not self._closed:
+                if not self._schedule:
+                    self._wakeup.wait()
+                    continue
+                due, _, key, entry = self._schedule[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+                heapq.heappop(self._schedule)
+                # Evicted entries and users idle since the last mint aren't kept warm
+                if self._entries.get(key) is entry and entry.used >= entry.minted:
+                    self._pool.submit(self._background_refresh, key, entry)
+
+    def _background_refresh(self, key, entry: _TokenEntry) -> None:
+        with entry.lock:
+            try:
+                self._mint(key, entry)
+            except Exception:
+                # The next caller mints on demand if the background attempt fails
+                return
+        with self._lock:
+            self.background_refreshes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'lookups': self.lookups,
+                'mints': self.mints,
+                'background_refreshes': self.background_refreshes,
+                'evictions': self.evictions,
+            }
+
+    def close(self) -> None:
+        """Stop background refreshes"""
+        with self._lock:
+            self._closed = True
+            self._schedule.clear()
+            self._wakeup.notify_all()
+        self._pool.shutdown(wait=False)
+
+
+_factories: Dict[Tuple[str, Tuple[str, ...]], ClientFactory] = {}
+_token_caches: Dict[str, DelegatedTokenCache] = {}
+_factories_lock = threading.Lock()
+
+
+def get_delegated_tokens(key_file: str = DEFAULT_KEY_FILE) -> DelegatedTokenCache:
+    """The process-wide delegated token cache for a key file"""
+    with _factories_lock:
+        if key_file not in _token_caches:
+            _token_caches[key_file] = DelegatedTokenCache(key_file)
+        return _token_caches[key_file]
+
+
+def get_factory(key_file: str = DEFAULT_KEY_FILE,
+                scopes: Sequence[str] = DRIVE_SCOPES,
+                subject: Optional[str] = None) -> ClientFactory:
+    """
+    The process-wide ClientFactory for a key file, scope set and subject.
+
+    Factories for a subject come from the key file's DelegatedTokenCache, so
+    bulk jobs touching many users stay bounded and reuse warm tokens.
+    """
+    if subject is not None:
+        return get_delegated_tokens(key_file).factory(subject, scopes)
+    key = (key_file, tuple(sorted(scopes)))
+    with _factories_lock:
+        if key not in _factories:
+            _factories[key] = ClientFactory(key_file, scopes)
+        return _factories[key]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Watermark-based incremental sync of job postings into a local Parquet store
+Only rows newer than the stored (data_posted, unique_job_id) high-water mark
+are pulled; they are upserted on unique_job_id into month partitions
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.path.join('.cache', 'sync')
+KEY_COLUMN = 'unique_job_id'
+WATERMARK_COLUMN = 'data_posted'
+UNKNOWN_MONTH = 'unknown'
+
+
+class IncrementalSync:
+    """Keeps a local copy of a jobs table current with watermark pulls"""
+
+    def __init__(self, explorer, store_dir: str = DEFAULT_STORE_DIR):
+        """
+        Args:
+            explorer: JobsDataExplorer used to run the pulls
+            store_dir: Root directory for per-table stores
+        """
+        self.explorer = explorer
+        self.store_dir = store_dir
+
+    # Paths and state
+
+    def table_dir(self, dataset_id: str, table_id: str) -> str:
+        return os.path.join(self.store_dir, f"{self.explorer.project_id}.{dataset_id}.{table_id}")
+
+    def _state_path(self, dataset_id: str, table_id: str) -> str:
+        return os.path.join(self.table_dir(dataset_id, table_id), 'state.json')
+
+    def state(self, dataset_id: str, table_id: str) -> Dict[str, Any]:
+        """Stored watermark and last-sync details for a table"""
+        path = self._state_path(dataset_id, table_id)
+        if not os.path.exists(path):
+            return {'watermark_posted': None, 'watermark_id': None, 'last_sync': None, 'rows': 0}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_state(self, dataset_id: str, table_id: str, state: Dict[str, Any]) -> None:
+        path = self._state_path(dataset_id, table_id)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def reset(self, dataset_id: str, table_id: str) -> None:
+        """Drop the local store and watermark so the next sync is a full pull"""
+        shutil.rmtree(self.table_dir(dataset_id, table_id), ignore_errors=True)
+
+    # Sync
+
+    def sync(self, dataset_id: str = "analytic_website_analytics",
+             table_id: str = "jobs_ai_cleaned_vw",
+             columns: Optional[List[str]] = None,
+             lookback: timedelta = timedelta(0),
+             chunk_size: int = 50000) -> Dict[str, Any]:
+        """
+        Pull rows past the watermark and upsert them into the local store.
+
+        Args:
+            columns: Columns to keep (must include unique_job_id and
+                data_posted); all columns when None
+            lookback: Also re-pull rows this far behind the watermark, to pick
+                up postings that were ingested late
+            chunk_size: Rows per streamed page
+
+        Returns:
+            Counts of fetched/inserted/updated rows, the new watermark and the
+            bytes BigQuery processed for the pull
+        """
+        table_dir = self.table_dir(dataset_id, table_id)
+        os.makedirs(table_dir, exist_ok=True)
+        state = self.state(dataset_id, table_id)
+
+        select = '*' if columns is None else ', '.join(
+            dict.fromkeys([KEY_COLUMN, WATERMARK_COLUMN, *columns])
+        )
+        sql = f"""
+        SELECT {select}
+        FROM {self.explorer.table_ref(dataset_id, table_id)}
+        """
+        params = None
+        if state['watermark_posted'] is not None:
+            since = pd.Timestamp(state['watermark_posted']).to_pydatetime()
+            if lookback:
+                sql += f"WHERE {WATERMARK_COLUMN} >= @since"
+                params = {'since': since - lookback}
+            else:
+                # (data_posted, unique_job_id) is strictly increasing past the mark
+                sql += f"""WHERE {WATERMARK_COLUMN} > @since
+           OR ({WATERMARK_COLUMN} = @since AND {KEY_COLUMN} > @since_id)"""
+                params = {'since': since, 'since_id': state['watermark_id']}
+
+        bytes_before = self.explorer.session_bytes_processed
+        staging = os.path.join(table_dir, '_staging')
+        shutil.rmtree(staging, ignore_errors=True)
+
+        fetched = 0
+        watermark = (state['watermark_posted'], state['watermark_id'])
+        for part, chunk in enumerate(self.explorer.query_iter(sql, chunk_size=chunk_size, params=params)):
+            if chunk.empty:
+                continue
+            fetched += len(chunk)
+            watermark = _max_watermark(chunk, watermark)
+            # Stage each page by month so every partition is merged once at the end
+            for month, rows in chunk.groupby(_month_keys(chunk), sort=False):
+                month_dir = os.path.join(staging, f"month={month}")
+                os.makedirs(month_dir, exist_ok=True)
+                rows.to_parquet(os.path.join(month_dir, f"part-{part:05d}.parquet"), index=False)
+
+        inserted, updated = self._merge_staging(table_dir, staging)
+        shutil.rmtree(staging, ignore_errors=True)
+
+        state.update({
+            'watermark_posted': watermark[0],
+            'watermark_id': watermark[1],
+            'last_sync': datetime.now(timezone.utc).isoformat(),
+            'rows': state['rows'] + inserted,
+        })
+        self._write_state(dataset_id, table_id, state)
+
+        return {
+            'fetched': fetched,
+            'inserted': inserted,
+            'updated': updated,
+            'watermark': watermark,
+            'bytes_processed': self.explorer.session_bytes_processed - bytes_before,
+        }
+
+    def _merge_staging(self, table_dir: str, staging: str):
+        """Upsert staged month partitions into the store on unique_job_id"""
+        if not os.path.isdir(staging):
+            return 0, 0
+
+        ids_path = os.path.join(table_dir, 'ids.parquet')
+        ids = (pd.read_parquet(ids_path) if os.path.exists(ids_path)
+               else pd.DataFrame({KEY_COLUMN: pd.Series(dtype=object), 'month': pd.Series(dtype=object)}))
+        known_month = dict(zip(ids[KEY_COLUMN], ids['month']))
+
+        incoming = {}
+        for name in sorted(os.listdir(staging)):
+            month = name.split('=', 1)[1]
+            month_dir = os.path.join(staging, name)
+            # Part files are read one by one: a sparse column that is all null
+            # in one page is typed null there, which a dataset read can't unify
+            parts = [pd.read_parquet(os.path.join(month_dir, part)) for part in sorted(os.listdir(month_dir))]
+            incoming[month] = pd.concat(parts, ignore_index=True).drop_duplicates(KEY_COLUMN, keep='last')
+
+        # A job whose data_posted moved to another month leaves its old partition
+        moved: Dict[str, set] = {}
+        for month, rows in incoming.items():
+            for job_id in rows[KEY_COLUMN]:
+                previous = known_month.get(job_id)
+                if previous is not None and previous != month:
+                    moved.setdefault(previous, set()).add(job_id)
+
+        inserted = updated = 0
+        for month in set(incoming) | set(moved):
+            path = os.path.join(table_dir, f"month={month}.parquet")
+            existing = pd.read_parquet(path) if os.path.exists(path) else None
+            new_rows = incoming.get(month)
+
+            if existing is not None and month in moved:
+                existing = existing[~existing[KEY_COLUMN].isin(moved[month])]
+            if new_rows is not None:
+                is_update = new_rows[KEY_COLUMN].map(known_month).notna()
+                updated += int(is_update.sum())
+                inserted += int((~is_update).sum())
+                if existing is not None:
+                    existing = existing[~existing[KEY_COLUMN].isin(new_rows[KEY_COLUMN])]
+                merged = new_rows if existing is None else pd.concat([existing, new_rows], ignore_index=True)
+            else:
+                merged = existing
+
+            merged.to_parquet(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+            for job_id in (new_rows[KEY_COLUMN] if new_rows is not None else []):
+                known_month[job_id] = month
+
+        ids = pd.DataFrame({KEY_COLUMN: list(known_month), 'month': list(known_month.values())})
+        ids.to_parquet(ids_path + '.tmp', index=False)
+        os.replace(ids_path + '.tmp', ids_path)
+        return inserted, updated
+
+    # Reading
+
+    def load(self, dataset_id: str = "analytic_website_analytics",
+             table_id: str = "jobs_ai_cleaned_vw",
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read the local store (all month partitions) as one DataFrame"""
+        table_dir = self.table_dir(dataset_id, table_id)
+        paths = sorted(
+            os.path.join(table_dir, name) for name in os.listdir(table_dir)
+            if name.startswith('month=') and name.endswith('.parquet')
+        ) if os.path.isdir(table_dir) else []
+        if not paths:
+            return pd.DataFrame(columns=columns)
+        return pd.concat([pd.read_parquet(p, columns=columns) for p in paths], ignore_index=True)
+
+
+def _month_keys(chunk: pd.DataFrame) -> pd.Series:
+    posted = pd.to_datetime(chunk[WATERMARK_COLUMN], utc=True)
+    return posted.dt.strftime('%Y-%m').fillna(UNKNOWN_MONTH)
+
+
+def _max_watermark(chunk: pd.DataFrame, current):
+    """Advance the (data_posted ISO, unique_job_id) mark past a chunk's rows"""
+    posted = pd.to_datetime(chunk[WATERMARK_COLUMN], utc=True)
+    rows = chunk.assign(_posted=posted).dropna(subset=['_posted'])
+    if rows.empty:
+        return current
+    newest = rows.sort_values(['_posted', KEY_COLUMN]).iloc[-1]
+    candidate = (newest['_posted'].isoformat(), newest[KEY_COLUMN])
+    if current[0] is None:
+        return candidate
+    current_key = (pd.Timestamp(current[0]), current[1])
+    return candidate if (newest['_posted'], newest[KEY_COLUMN]) > current_key else current
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Iterator helpers shared by the explorer and Drive scripts
+"""
+
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable[T], depth: int = 1) -> Iterator[T]:
+    """
+    Iterate in a background thread, keeping up to `depth` items ready.
+
+    Fetching the next page overlaps with the caller processing the current
+    one, while the bounded queue keeps memory at `depth` pages. Exceptions
+    raised by the producer are re-raised in the caller. Closing the
+    generator early stops the producer.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not offer((item, None)):
+                    return
+            offer((_DONE, None))
+        except BaseException as e:
+            offer((_DONE, e))
+
+    worker = threading.Thread(target=produce, name='prefetch', daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
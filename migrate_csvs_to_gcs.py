@@ -3,11 +3,16 @@
 Migrate CSV files from Google Drive to Cloud Storage
 """
 
-import io
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.cloud import storage
+import contextlib
+
+from drive_dedupe import find_duplicates, write_manifest
+from drive_transfer import TRANSFORMS, transfer_files, verify_upload
+from drive_inventory import DriveInventory, describe_sync
+from drive_utils import CSV_QUERY, batch_delete_files, iter_drive_files
+from google_clients import get_factory
+from rate_limit import get_governor
+from run_profile import phase, profile_run
+from transfer_journal import DEFAULT_JOURNAL_PATH, TransferJournal
 
 # Configuration
 DRIVE_KEY_FILE = 'sa-key-full.json'
@@ -15,8 +20,32 @@ DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive']
 GCS_BUCKET_NAME = 'jobs-data-linkedin-csv-exports'  # Change this to your bucket name
 GCS_PROJECT = 'jobs-data-linkedin'
 
-def migrate_csvs_to_gcs(dry_run=True):
-    """Migrate CSV files from Drive to Cloud Storage"""
+def migrate_csvs_to_gcs(dry_run=True, concurrency=4, chunk_mb=8,
+                        journal_path=DEFAULT_JOURNAL_PATH, relist=False, use_mirror=True,
+                        transform='none', composite_mb=0, dedupe=True):
+    """Migrate CSV files from Drive to Cloud Storage
+    
+    Files are streamed chunk by chunk into GCS resumable uploads,
+    `concurrency` files at a time, each to csv-exports/<Drive id>/<name>.
+    Live runs keep a journal at `journal_path`: an interrupted run resumes
+    from it without re-listing Drive (unless `relist`), and a file is only
+    deleted from Drive once its GCS object's md5 matches Drive's
+    md5Checksum, checked again just before the delete. With use_mirror,
+    CSVs are found in the local Drive inventory rather than by listing Drive.
+    
+    `transform` stores objects as-is ('none'), gzip-compressed ('gzip') or
+    converted to Parquet ('parquet'). Files of at least `composite_mb` MB
+    are uploaded as parallel parts and composed (0, the default, disables
+    it: a composite object has no md5 to check against Drive's).
+    
+    With dedupe, files with the same Drive md5Checksum and size are
+    transferred once; the copies are deleted from Drive once that object is
+    verified and listed in csv-exports/_duplicates.json.
+    """
+    
+    if transform not in TRANSFORMS:
+        raise ValueError(f"Unknown transform {transform!r}; expected one of {sorted(TRANSFORMS)}")
+    stored_gb = None
     
     print("=" * 80)
     print("📦 MIGRATE CSV FILES: Google Drive → Cloud Storage")
@@ -30,23 +59,24 @@ def migrate_csvs_to_gcs(dry_run=True):
     try:
         # Authenticate with Drive
         print("\n[1/5] 🔐 Authenticating with Google Drive...")
-        drive_creds = service_account.Credentials.from_service_account_file(
-            DRIVE_KEY_FILE, scopes=DRIVE_SCOPES
-        )
-        drive_service = build('drive', 'v3', credentials=drive_creds)
+        phase('drive_auth')
+        clients = get_factory(DRIVE_KEY_FILE, DRIVE_SCOPES)
+        drive_service = clients.drive()
         print("     ✅ Drive authenticated")
         
         # Authenticate with Cloud Storage
         print("\n[2/5] 🔐 Authenticating with Cloud Storage...")
-        storage_client = storage.Client(project=GCS_PROJECT)
+        phase('gcs_auth')
+        storage_client = clients.storage(GCS_PROJECT)
         
         # Check if bucket exists, create if not
         try:
-            bucket = storage_client.get_bucket(GCS_BUCKET_NAME)
+            bucket = get_governor().call(storage_client.get_bucket, GCS_BUCKET_NAME)
             print(f"     ✅ Using existing bucket: {GCS_BUCKET_NAME}")
         except:
             if not dry_run:
-                bucket = storage_client.create_bucket(GCS_BUCKET_NAME, location='us-central1')
+                bucket = get_governor().call(storage_client.create_bucket, GCS_BUCKET_NAME,
+                                             location='us-central1')
                 print(f"     ✅ Created new bucket: {GCS_BUCKET_NAME}")
             else:
                 print(f"     ⚠️  Bucket doesn't exist. Would create: {GCS_BUCKET_NAME}")
@@ -56,91 +86,236 @@ def migrate_csvs_to_gcs(dry_run=True):
         print(f"     ❌ Authentication failed: {e}")
         return
     
-    try:
-        # List CSV files in Drive
-        print("\n[3/5] 📁 Finding CSV files in Drive...")
-        results = drive_service.files().list(
-            pageSize=1000,
-            q="mimeType='text/csv' or name contains '.csv'",
-            fields="files(id,name,size,createdTime)"
-        ).execute()
-        
-        files = results.get('files', [])
-        total_size = sum(int(f.get('size', 0)) for f in files)
-        total_gb = total_size / (1024**3)
-        
-        print(f"     Found {len(files)} CSV files ({total_gb:.2f} GB)")
-        
-        if not files:
-            print("     ✅ No CSV files to migrate!")
+    # The journal and the mirror (when used) are closed however the run ends
+    with (contextlib.nullcontext() if dry_run else TransferJournal(journal_path)) as journal, \
+            (DriveInventory() if use_mirror else contextlib.nullcontext()) as inventory:
+        try:
+            # List CSV files in Drive
+            print("\n[3/5] 📁 Finding CSV files in Drive...")
+            phase('find_csvs')
+            resumed = journal is not None and journal.unfinished() and not relist
+            if resumed:
+                counts = journal.counts()
+                print(f"     ♻️  Resuming from {journal_path}: "
+                      + ", ".join(f"{n} {state}" for state, n in counts.items()))
+                files = [f for f in journal.files() if f['state'] != 'deleted']
+            elif use_mirror:
+                print(f"     🗂️  {describe_sync(inventory.sync(drive_service))}")
+                files = list(inventory.csv_files())
+            else:
+                files = list(iter_drive_files(
+                    drive_service,
+                    q=CSV_QUERY,
+                    fields="id,name,size,md5Checksum,createdTime"
+                ))
+            if journal is not None and not resumed:
+                new = journal.record_listed(files)
+                print(f"     📝 Journaled {new} new files")
+            total_size = sum(int(f.get('size', 0)) for f in files)
+            total_gb = total_size / (1024**3)
+            
+            print(f"     Found {len(files)} CSV files ({total_gb:.2f} GB)")
+            
+            if not files:
+                print("     ✅ No CSV files to migrate!")
+                return
+            
+        except Exception as e:
+            print(f"     ❌ Failed to list files: {e}")
             return
         
-    except Exception as e:
-        print(f"     ❌ Failed to list files: {e}")
-        return
-    
-    # Migrate files
-    print(f"\n[4/5] 🚀 Migrating files to Cloud Storage...")
-    
-    if dry_run:
-        print(f"     ⚠️  DRY RUN - Would migrate {len(files)} files ({total_gb:.2f} GB)")
-        print(f"     Estimated monthly cost: ${total_gb * 0.02:.2f}")
-        
-        print(f"\n     Files to migrate (first 10):")
-        for f in files[:10]:
-            size_mb = int(f.get('size', 0)) / (1024**2)
-            print(f"        • {size_mb:7.2f} MB - {f['name']}")
+        # Migrate files
+        print(f"\n[4/5] 🚀 Migrating files to Cloud Storage...")
+        phase('migrate')
         
-        if len(files) > 10:
-            print(f"        ... and {len(files) - 10} more files")
-        
-        print(f"\n     To actually migrate, run:")
-        print(f"     python3 migrate_csvs_to_gcs.py --migrate")
-        
-    else:
-        migrated = 0
-        failed = 0
-        
-        for i, file in enumerate(files, 1):
-            try:
-                file_id = file['id']
-                file_name = file['name']
-                
-                # Download from Drive
-                request = drive_service.files().get_media(fileId=file_id)
-                file_data = io.BytesIO()
-                downloader = MediaIoBaseDownload(file_data, request)
-                
-                done = False
-                while not done:
-                    status, done = downloader.next_chunk()
-                
-                # Upload to Cloud Storage
-                file_data.seek(0)
-                blob = bucket.blob(f"csv-exports/{file_name}")
-                blob.upload_from_file(file_data, content_type='text/csv')
-                
-                # Delete from Drive
-                drive_service.files().delete(fileId=file_id).execute()
-                
-                migrated += 1
-                if migrated % 5 == 0:
-                    print(f"        Migrated {migrated}/{len(files)} files...")
-                
-            except Exception as e:
-                print(f"        ❌ Failed to migrate {file.get('name')}: {e}")
-                failed += 1
-        
-        print(f"\n     ✅ Migrated {migrated} files")
-        if failed > 0:
-            print(f"     ❌ Failed to migrate {failed} files")
-        print(f"     💾 Freed approximately {total_gb:.2f} GB from Drive")
-        print(f"     💰 New monthly cost: ${total_gb * 0.02:.2f}")
+        if dry_run:
+            print(f"     ⚠️  DRY RUN - Would migrate {len(files)} files ({total_gb:.2f} GB)")
+            print(f"     Estimated monthly cost: ${total_gb * 0.02:.2f}")
+            if transform != 'none':
+                print(f"     Objects would be stored as {transform} (actual size known after upload)")
+            
+            print(f"\n     Files to migrate (first 10):")
+            for f in files[:10]:
+                size_mb = int(f.get('size', 0)) / (1024**2)
+                print(f"        • {size_mb:7.2f} MB - {f['name']}")
+            
+            if len(files) > 10:
+                print(f"        ... and {len(files) - 10} more files")
+            
+            if dedupe:
+                unique, duplicates = find_duplicates(files)
+                if duplicates:
+                    dup_gb = sum(int(f.get('size', 0)) for f in duplicates) / (1024**3)
+                    print(f"\n     🧬 {len(duplicates)} files are copies of another CSV ({dup_gb:.2f} GB); "
+                          f"only {len(unique)} would be transferred")
+            
+            print(f"\n     To actually migrate, run:")
+            print(f"     python3 migrate_csvs_to_gcs.py --migrate")
+            
+        else:
+            print(f"     Streaming {concurrency} files at a time ({chunk_mb} MB chunks, "
+                  f"transform: {transform})")
+            
+            suffix = TRANSFORMS[transform][0]
+            
+            def blob_name(f):
+                # Drive allows many files with one name; the id keeps their objects apart
+                return f"csv-exports/{f['id']}/{f['name']}{suffix}"
+            
+            def verify_uploaded():
+                # Metadata-only check; mismatches go back to listed and are re-sent next run
+                for entry in journal.files('uploaded'):
+                    problem, generation = verify_upload(bucket, entry, entry['blob'])
+                    if problem is None:
+                        # Later checks also require the object to still be this generation
+                        journal.mark(entry['id'], 'verified', generation=generation, error=None)
+                    else:
+                        print(f"        ❌ {entry['name']} failed verification: {problem}")
+                        journal.mark(entry['id'], 'listed', error=problem)
+            
+            def confirmed_canonicals():
+                # Duplicates are only deleted if the object they point at still
+                # holds their content: same generation and md5 as when verified
+                confirmed = []
+                for entry in journal.canonicals():
+                    problem, _ = verify_upload(bucket, entry, entry['blob'])
+                    if problem is None:
+                        confirmed.append(entry['id'])
+                        continue
+                    released = journal.release_duplicates(entry['id'])
+                    print(f"        ❌ {entry['name']} no longer matches its object ({problem}); "
+                          f"its {released} duplicates will be transferred themselves")
+                    # A canonical still in Drive is re-sent; a deleted one stops counting as stored
+                    journal.mark(entry['id'], 'listed' if entry['state'] == 'verified' else 'deleted',
+                                 error=problem)
+                return confirmed
+            
+            # Uploads finished by an interrupted run still need verifying
+            verify_uploaded()
+            
+            pending = journal.files('listed')
+            duplicates = []
+            if dedupe:
+                # Content already stored by an earlier run counts as seen, unless
+                # its object was found replaced after the Drive file was deleted
+                stored = [f for f in journal.files() if f['state'] != 'listed' and not f['duplicate_of']
+                          and not (f['state'] == 'deleted' and f['error'])]
+                pending, duplicates = find_duplicates(pending, known=stored)
+                for f in pending:
+                    if f['duplicate_of']:
+                        journal.mark(f['id'], 'listed', duplicate_of=None)
+                for f in duplicates:
+                    journal.mark(f['id'], 'listed', duplicate_of=f['duplicate_of'])
+                if duplicates:
+                    dup_gb = sum(int(f.get('size', 0)) for f in duplicates) / (1024**3)
+                    print(f"     🧬 Skipping {len(duplicates)} duplicate files ({dup_gb:.2f} GB); "
+                          f"their content is transferred once")
+            finished = 0
+            
+            def report(result):
+                nonlocal finished
+                finished += 1
+                if 'error' in result:
+                    journal.mark(result['id'], 'listed', error=result['error'])
+                    print(f"        ❌ Failed to migrate {result.get('name')}: {result['error']}")
+                    return
+                journal.mark(result['id'], 'uploaded', blob=result['blob'],
+                             stream_md5=result['md5'], bytes=result['bytes'],
+                             stored_bytes=result['stored_bytes'], error=None)
+                if finished % 5 == 0 or finished == len(pending):
+                    print(f"        Migrated {finished}/{len(pending)} files... "
+                          f"(last: {result['mb_per_s']:.1f} MB/s)")
+            
+            if len(pending) + len(duplicates) < len(files):
+                print(f"     Skipping {len(files) - len(pending) - len(duplicates)} files already in Cloud Storage")
+            stats = transfer_files(
+                pending,
+                clients.drive,
+                bucket,
+                blob_name=blob_name,
+                concurrency=concurrency,
+                chunk_size=chunk_mb * 1024 * 1024,
+                transform=transform,
+                composite_threshold=composite_mb * 1024 * 1024 if composite_mb else None,
+                on_result=report,
+            )
+            verify_uploaded()
+            journal.resolve_duplicates(confirmed_canonicals())
+            
+            stored_duplicates = journal.duplicates()
+            if stored_duplicates:
+                try:
+                    manifest = write_manifest(bucket, stored_duplicates)
+                    print(f"     🧬 Recorded {len(stored_duplicates)} duplicates in {manifest}")
+                except Exception as e:
+                    print(f"     ⚠️  Couldn't write duplicates manifest: {e}")
+            
+            # Only verified uploads are removed from Drive, and only if their
+            # objects still match when checked again right before the delete
+            verified = []
+            for entry in journal.files('verified'):
+                problem, _ = verify_upload(bucket, entry, entry['blob'])
+                if problem is None:
+                    verified.append(entry)
+                else:
+                    print(f"        ❌ {entry['name']} no longer matches its object: {problem}")
+                    journal.mark(entry['id'], 'listed', error=problem)
+            if verified:
+                print(f"\n     Deleting {len(verified)} verified files from Drive (batched)...")
+                deletion = batch_delete_files(
+                    drive_service,
+                    verified,
+                    progress=lambda done, total: print(f"        Deleted {done}/{total} files...")
+                )
+                for file_id in deletion['deleted'] + deletion['missing']:
+                    journal.mark(file_id, 'deleted', error=None)
+                if inventory is not None:
+                    inventory.remove(deletion['deleted'] + deletion['missing'])
+                for file_id, error in deletion['failed'].items():
+                    journal.mark(file_id, 'verified', error=error)
+                    print(f"        ❌ Failed to delete {file_id} from Drive: {error}")
+            
+            counts = journal.counts()
+            deleted_ids = {e['id'] for e in journal.files('deleted')}
+            freed_gb = sum(int(f.get('size') or 0) for f in files if f['id'] in deleted_ids) / (1024**3)
+            totals = journal.stored_totals()
+            source_gb = totals['source_bytes'] / (1024**3)
+            stored_gb = totals['stored_bytes'] / (1024**3)
+            
+            print(f"\n     ✅ Migrated {stats['migrated']} files this run")
+            if stats['failed'] > 0:
+                print(f"     ❌ Failed to migrate {stats['failed']} files")
+            print(f"     📝 Journal: " + ", ".join(f"{n} {state}" for state, n in counts.items()))
+            if counts['listed'] or counts['uploaded'] or counts['verified']:
+                print(f"     ⚠️  Rerun with --migrate to finish the remaining files")
+            print(f"     ⚡ Throughput: {stats['bytes'] / (1024**3):.2f} GB in {stats['seconds']:.1f}s "
+                  f"({stats['mb_per_s']:.1f} MB/s aggregate)")
+            api = get_governor().stats()
+            print(f"     🚦 API calls: {api['calls']:,} ({api['retries']:,} retried, "
+                  f"{api['throttles']:,} throttled; concurrency ended at {api['concurrency_limit']})")
+            print(f"     💾 Freed approximately {freed_gb:.2f} GB from Drive")
+            if duplicates:
+                dup_bytes = sum(int(f.get('size', 0)) for f in duplicates)
+                rate = stats['bytes'] / stats['seconds'] if stats['bytes'] and stats['seconds'] else 0
+                saved_time = f", about {dup_bytes / rate:.0f}s of transfer" if rate else ""
+                print(f"     🧬 Dedupe saved {dup_bytes / (1024**3):.2f} GB{saved_time} "
+                      f"({len(duplicates)} duplicate files)")
+            if totals['source_bytes']:
+                saved = 100 * (1 - totals['stored_bytes'] / totals['source_bytes'])
+                print(f"     🗜️  Stored {stored_gb:.2f} GB in Cloud Storage for {source_gb:.2f} GB "
+                      f"of CSVs ({saved:.0f}% smaller)")
+            print(f"     💰 New monthly cost: ${stored_gb * 0.02:.2f} "
+                  f"(estimate for raw CSVs: ${total_gb * 0.02:.2f})")
     
     # Summary
     print("\n[5/5] 📊 Summary...")
+    phase('summary')
     print(f"     Drive storage freed: {total_gb:.2f} GB")
-    print(f"     Cloud Storage cost: ${total_gb * 0.02:.2f}/month")
+    if stored_gb is None:
+        print(f"     Cloud Storage cost: ${total_gb * 0.02:.2f}/month (estimated)")
+    else:
+        print(f"     Cloud Storage cost: ${stored_gb * 0.02:.2f}/month actual "
+              f"vs ${total_gb * 0.02:.2f}/month estimated for raw CSVs")
     print(f"     Files in Cloud Storage: gs://{GCS_BUCKET_NAME}/csv-exports/")
     
     print("\n" + "=" * 80)
@@ -149,5 +324,26 @@ if __name__ == "__main__":
     import sys
     
     migrate_mode = '--migrate' in sys.argv or '--live' in sys.argv
-    migrate_csvs_to_gcs(dry_run=not migrate_mode)
+    
+    relist = '--relist' in sys.argv
+    
+    concurrency = 4
+    chunk_mb = 8
+    transform = 'none'
+    composite_mb = 0
+    for arg in sys.argv:
+        if arg.startswith('--concurrency='):
+            concurrency = int(arg.split('=')[1])
+        elif arg.startswith('--chunk-mb='):
+            chunk_mb = int(arg.split('=')[1])
+        elif arg.startswith('--transform='):
+            transform = arg.split('=')[1]
+        elif arg.startswith('--composite-mb='):
+            composite_mb = int(arg.split('=')[1])
+    
+    with profile_run('migrate_csvs_to_gcs'):
+        migrate_csvs_to_gcs(dry_run=not migrate_mode, concurrency=concurrency, chunk_mb=chunk_mb,
+                            relist=relist, use_mirror='--no-mirror' not in sys.argv,
+                            transform=transform, composite_mb=composite_mb,
+                            dedupe='--no-dedupe' not in sys.argv)
 
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the data scripts
+`mobius.py explore|migrate|cleanup|storage [flags]` imports only the chosen
+command's script, and only when it runs, so --help and typos cost no more
+than starting Python, and each command loads just the Google clients it
+uses (BigQuery and pandas for explore, the Drive discovery client for the
+Drive commands)
+"""
+
+import runpy
+import sys
+
+PROG = 'mobius'
+
+PROFILE_FLAGS = [
+    ('--profile[=PATH]', "cProfile the run (all threads) and print the top functions"),
+    ('--trace-malloc[=N]', "Report the N largest allocation sites"),
+    ('--summary=PATH', "Write the run summary here instead of .cache/run_summaries.jsonl"),
+]
+
+# command -> (script module, description, flags)
+COMMANDS = {
+    'explore': ('bq_explorer', "List datasets and print the dashboard tables from BigQuery", []),
+    'migrate': ('migrate_csvs_to_gcs', "Move CSV exports from Google Drive to Cloud Storage", [
+        ('--migrate', "Actually move files (default is a dry run)"),
+        ('--concurrency=N', "Files streamed at a time (default 4)"),
+        ('--chunk-mb=N', "Upload chunk size in MB (default 8)"),
+        ('--transform=none|gzip|parquet', "Store CSVs as-is, gzip-compressed or as Parquet"),
+        ('--composite-mb=N', "Upload files of N MB or more as parallel parts, without an md5 check (default 0, off)"),
+        ('--relist', "List Drive again instead of resuming from the journal"),
+        ('--no-dedupe', "Transfer duplicate exports separately"),
+        ('--no-mirror', "List Drive directly instead of the local inventory"),
+    ]),
+    'cleanup': ('cleanup_old_csvs', "Delete old CSV files from Google Drive", [
+        ('--delete', "Actually delete files (default is a dry run)"),
+        ('--days=N', "Only files older than N days (default 30)"),
+        ('--no-mirror', "List Drive directly instead of the local inventory"),
+    ]),
+    'storage': ('check_drive_storage', "Report Google Drive storage usage", [
+        ('--no-mirror', "List Drive directly instead of the local inventory"),
+    ]),
+}
+
+
+def _flag_lines(flags) -> str:
+    return '\n'.join(f"  {flag:<32}{description}" for flag, description in flags)
+
+
+def usage() -> str:
+    commands = '\n'.join(f"  {name:<10}{description}" for name, (_, description, _) in COMMANDS.items())
+    return (f"usage: {PROG} <command> [flags]\n\ncommands:\n{commands}\n\n"
+            f"Run '{PROG} <command> --help' for a command's flags.")
+
+
+def command_usage(name: str) -> str:
+    _, description, flags = COMMANDS[name]
+    sections = [f"usage: {PROG} {name} [flags]\n\n{description}"]
+    if flags:
+        sections.append(f"flags:\n{_flag_lines(flags)}")
+    sections.append(f"profiling:\n{_flag_lines(PROFILE_FLAGS)}")
+    return '\n\n'.join(sections)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(usage())
+        return 0
+
+    name, args = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"{PROG}: unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    if '-h' in args or '--help' in args:
+        print(command_usage(name))
+        return 0
+
+    # The scripts read their flags from sys.argv in their __main__ blocks
+    sys.argv = [f"{PROG} {name}", *args]
+    runpy.run_module(COMMANDS[name][0], run_name='__main__', alter_sys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Tiered result cache for BigQuery queries
+In-memory LRU tier in front of an on-disk Parquet tier, keyed by normalized
+SQL plus the `modified` timestamp of every table the query reads
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Fully-qualified table references such as `project.dataset.table`
+TABLE_REF_PATTERN = re.compile(r"`([\w-]+\.[\w-]+\.[\w-]+)`")
+
+# FROM/JOIN targets in a view definition: dataset.table or project.dataset.table,
+# with or without backquotes (single names are CTEs)
+VIEW_SOURCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+`?([\w-]+(?:\.[\w-]+){1,2})`?", re.IGNORECASE)
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'query_cache')
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon so formatting doesn't split keys"""
+    return re.sub(r"\s+", " ", sql).strip().rstrip(';').strip()
+
+
+def referenced_tables(sql: str) -> Tuple[str, ...]:
+    """Return the sorted, de-duplicated fully-qualified tables a query reads"""
+    return tuple(sorted(set(TABLE_REF_PATTERN.findall(sql))))
+
+
+def view_source_tables(view_sql: str, project_id: str) -> Tuple[str, ...]:
+    """Fully-qualified tables a view definition reads (dataset.table is qualified with project_id)"""
+    tables = set()
+    for ref in VIEW_SOURCE_PATTERN.findall(view_sql):
+        tables.add(ref if ref.count('.') == 2 else f"{project_id}.{ref}")
+    return tuple(sorted(tables))
+
+
+class QueryCache:
+    """Two-tier (memory + Parquet) cache for query results with freshness checks"""
+
+    def __init__(self,
+                 max_entries: int = 128,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 ttl_seconds: float = 3600,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = 2 * 1024 ** 3,
+                 metadata_ttl_seconds: float = 60):
+        """
+        Args:
+            max_entries: Maximum number of results held in memory
+            max_bytes: Maximum total DataFrame size held in memory
+            ttl_seconds: Age after which an entry is evicted from either tier
+            cache_dir: Directory for the Parquet tier (None disables it)
+            max_disk_bytes: Maximum total size of the Parquet tier
+            metadata_ttl_seconds: How long a table's `modified` timestamp is
+                trusted before it is looked up again
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.metadata_ttl_seconds = metadata_ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[pd.DataFrame, float, int, Tuple[str, ...]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._table_versions: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.RLock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    # Keys and freshness
+
+    def make_key(self, sql: str, table_versions: Dict[str, str], **extra) -> str:
+        """Build the cache key from normalized SQL, table versions and extra options"""
+        payload = json.dumps({
+            'sql': normalize_sql(sql),
+            'tables': sorted(table_versions.items()),
+            'extra': sorted(extra.items()),
+        }, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def table_versions(self, tables: Iterable[str],
+                       fetch_modified: Callable[[str], str]) -> Dict[str, str]:
+        """
+        Resolve the current `modified` timestamp of each table.
+
+        Timestamps are re-fetched at most every `metadata_ttl_seconds`. When a
+        table's timestamp differs from the last one seen, every cached entry
+        that reads that table is invalidated.
+        """
+        versions = {}
+        now = time.time()
+        for table in tables:
+            with self._lock:
+                known = self._table_versions.get(table)
+            if known and now - known[1] < self.metadata_ttl_seconds:
+                versions[table] = known[0]
+                continue
+
+            modified = str(fetch_modified(table))
+            with self._lock:
+                if known and known[0] != modified:
+                    self.invalidate_table(table)
+                self._table_versions[table] = (modified, now)
+            versions[table] = modified
+        return versions
+
+    # Lookups
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a cached result (copy) or None, promoting disk hits into memory"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                df, stored_at, _, _ = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return df.copy()
+                self._evict_memory(key)
+
+        df, meta = self._read_disk(key, now)
+        with self._lock:
+            if df is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._put_memory(key, df, meta['stored_at'], tuple(meta['tables']))
+        return df.copy()
+
+    def put(self, key: str, df: pd.DataFrame, tables: Iterable[str] = ()) -> None:
+        """Store a result in both tiers"""
+        tables = tuple(tables)
+        stored_at = time.time()
+        with self._lock:
+            self._put_memory(key, df.copy(), stored_at, tables)
+        self._write_disk(key, df, stored_at, tables)
+
+    # Invalidation
+
+    def invalidate_table(self, table: str) -> int:
+        """Drop every entry (both tiers) that reads the given table"""
+        removed = 0
+        with self._lock:
+            for key in [k for k, v in self._memory.items() if table in v[3]]:
+                self._drop_memory(key)
+                removed += 1
+
+            for key, meta in self._iter_disk_meta():
+                if table in meta.get('tables', []):
+                    self._remove_disk(key)
+                    removed += 1
+
+            self._stats['invalidations'] += removed
+        return removed
+
+    def clear(self) -> None:
+        """Empty both tiers (counters are kept)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key, _ in self._iter_disk_meta():
+                self._remove_disk(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        return stats
+
+    # Memory tier
+
+    def _put_memory(self, key: str, df: pd.DataFrame, stored_at: float,
+                    tables: Tuple[str, ...]) -> None:
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = (df, stored_at, size, tables)
+        self._memory_bytes += size
+
+        while self._memory and (len(self._memory) > self.max_entries
+                                or self._memory_bytes > self.max_bytes):
+            oldest = next(iter(self._memory))
+            self._evict_memory(oldest)
+
+    def _drop_memory(self, key: str) -> None:
+        _, _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    def _evict_memory(self, key: str) -> None:
+        self._drop_memory(key)
+        self._stats['evictions'] += 1
+
+    # Disk tier
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key)
+        return base + '.parquet', base + '.json'
+
+    def _read_disk(self, key: str, now: float):
+        if not self.cache_dir:
+            return None, None
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if now - meta['stored_at'] > self.ttl_seconds:
+                with self._lock:
+                    self._remove_disk(key)
+                    self._stats['evictions'] += 1
+                return None, None
+            df = pd.read_parquet(data_path)
+            os.utime(meta_path)
+            return df, meta
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def _write_disk(self, key: str, df: pd.DataFrame, stored_at: float,
+                    tables: Tuple[str, ...]) -> None:
+        if not self.cache_dir:
+            return
+        data_path, meta_path = self._paths(key)
+        try:
+            # Write to temp files first so a crash never leaves a half-written entry
+            df.to_parquet(data_path + '.tmp', index=False)
+            os.replace(data_path + '.tmp', data_path)
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({'stored_at': stored_at, 'tables': list(tables)}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        except (OSError, ValueError, ImportError, TypeError):
+            # Unserializable column types only lose the disk tier
+            for path in (data_path + '.tmp', meta_path + '.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self._enforce_disk_limit()
+
+    def _iter_disk_meta(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            try:
+                with open(os.path.join(self.cache_dir, name)) as f:
+                    yield key, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def _remove_disk(self, key: str) -> None:
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _enforce_disk_limit(self) -> None:
+        """Evict least recently used Parquet files until under max_disk_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for key, _ in self._iter_disk_meta():
+                data_path, meta_path = self._paths(key)
+                try:
+                    size = os.path.getsize(data_path)
+                    last_used = os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+                entries.append((last_used, key, size))
+                total += size
+
+            for _, key, size in sorted(entries):
+                if total <= self.max_disk_bytes:
+                    break
+                self._remove_disk(key)
+                self._stats['evictions'] += 1
+                total -= size
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Rate limiting and retries for Drive, Docs and Cloud Storage calls
+A token bucket paces requests, throttled or failed calls back off
+exponentially with full jitter, and bulk jobs size their concurrency with
+AIMD: one more worker after a run of clean calls, half as many after a
+throttle
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:  # only needed to classify Cloud Storage errors
+    api_exceptions = None
+
+THROTTLE_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+def _status(error: Exception) -> Optional[int]:
+    if isinstance(error, HttpError):
+        return error.resp.status
+    if api_exceptions is not None and isinstance(error, api_exceptions.GoogleAPICallError):
+        return error.code
+    return None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Rejected by a quota before the request was acted on (429 or a 403 rate limit)"""
+    status = _status(error)
+    if status == 429:
+        return True
+    return status == 403 and any(reason in str(error) for reason in THROTTLE_REASONS)
+
+
+def is_throttle(error: Exception) -> bool:
+    """The service is asking us to slow down (429, 503 or a 403 rate limit)"""
+    return _status(error) == 503 or is_rate_limited(error)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Throttles, server errors and dropped connections are worth another try"""
+    if is_throttle(error):
+        return True
+    status = _status(error)
+    if status is not None:
+        return status in (408, 500, 502, 504)
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns seconds waited"""
+        # Costs above the burst size would never fit, so they drain the bucket instead
+        tokens = min(tokens, self.burst)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows by one per window of successes and halves on throttling"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[int] = None):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial if initial is not None else max_limit)
+        self.in_flight = 0
+        self.throttles = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `limit` concurrent slots"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self._successes >= int(self.limit):
+                self._successes = 0
+                self.limit = min(self.max_limit, self.limit + 1)
+                self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.throttles += 1
+            self._successes = 0
+            self.limit = max(self.min_limit, self.limit / 2)
+
+    def raise_ceiling(self, max_limit: int) -> None:
+        """Lift max_limit (never lowers it); the current limit grows by the same amount"""
+        with self._cond:
+            if max_limit > self.max_limit:
+                self.limit += max_limit - self.max_limit
+                self.max_limit = max_limit
+                self._cond.notify_all()
+
+
+class ApiGovernor:
+    """Shared pacing, retry and concurrency policy for Google API calls"""
+
+    def __init__(self, rate: float = 50.0, burst: Optional[float] = None,
+                 max_concurrency: int = 8, min_concurrency: int = 1,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 64.0):
+        """
+        Args:
+            rate: Requests per second across all threads
+            max_concurrency: Ceiling for AIMD-managed bulk work (slot())
+            max_retries: Retries per call after the first attempt
+            base_delay / max_delay: Backoff is uniform(0, min(max_delay,
+                base_delay * 2**attempt))
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AIMDLimiter(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retries = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep the full-jitter backoff for a retry attempt; returns the delay"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        time.sleep(delay)
+        return delay
+
+    def record(self, error: Optional[Exception] = None) -> None:
+        """Feed a call's outcome into the AIMD limit"""
+        if error is None:
+            self.concurrency.on_success()
+        elif is_throttle(error):
+            self.concurrency.on_throttle()
+
+    def call(self, fn: Callable[..., Any], *args,
+             cost: float = 1.0,
+             retry_on: Callable[[Exception], bool] = is_retryable,
+             **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs) under the rate limit, retrying failures
+        that retry_on accepts with jittered exponential backoff.
+
+        cost is the number of quota units the call uses (e.g. items in an
+        HTTP batch).
+        """
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire(cost)
+            with self._lock:
+                self.calls += 1
+                self.waited += waited
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.record(e)
+                if attempt >= self.max_retries or not retry_on(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self.backoff(attempt)
+                attempt += 1
+                continue
+            self.record()
+            return result
+
+    def execute(self, request, cost: float = 1.0, idempotent: bool = True) -> Any:
+        """
+        Run a googleapiclient request (anything with .execute()) through call().
+
+        Pass idempotent=False for requests that must not run twice (creates,
+        inserts): a timeout or server error may come after the service acted,
+        so only quota rejections are retried.
+        """
+        return self.call(request.execute, cost=cost,
+                         retry_on=is_retryable if idempotent else is_rate_limited)
+
+    def slot(self):
+        """AIMD concurrency gate for one unit of bulk work (e.g. a file transfer)"""
+        return self.concurrency.slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'throttles': self.concurrency.throttles,
+            'rate_wait_seconds': self.waited,
+            'concurrency_limit': int(self.concurrency.limit),
+        }
+
+
+_governor: Optional[ApiGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> ApiGovernor:
+    """The process-wide governor; quotas are per user/project, not per script"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ApiGovernor()
+        return _governor
+
+
+def set_governor(governor: ApiGovernor) -> None:
+    """Replace the process-wide governor (e.g. to lift pacing against a local emulator)"""
+    global _governor
+    with _governor_lock:
+        _governor = governor
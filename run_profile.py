@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing and profiling for the command-line scripts
+Scripts mark their [n/N] phases with phase(); a RunProfile active around
+the run records each phase's wall time, CPU time and API calls, optionally
+cProfiles every thread (--profile) and tracks allocations
+(--trace-malloc), and appends a JSON summary of the run to
+.cache/run_summaries.jsonl so runs can be compared over time
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from rate_limit import get_governor
+
+DEFAULT_SUMMARY_PATH = os.path.join('.cache', 'run_summaries.jsonl')
+DEFAULT_PROFILE_DIR = os.path.join('.cache', 'profiles')
+DEFAULT_TOP_ALLOCATIONS = 10
+PROFILE_LINES = 25
+
+# The profile around the running script, if any
+_active: Optional['RunProfile'] = None
+
+
+def phase(name: str) -> None:
+    """Start timing the named phase of the running script (no-op when nothing is profiling)"""
+    if _active is not None:
+        _active.phase(name)
+
+
+@dataclass
+class PhaseTiming:
+    """Measurements for one phase of a run"""
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    api_calls: int = 0
+    api_retries: int = 0
+    bq_jobs: int = 0
+    bq_bytes_processed: int = 0
+
+
+class RunProfile:
+    """
+    Times a script run phase by phase.
+
+    API calls are the process-wide governor's call count (Drive, Docs and
+    Cloud Storage); BigQuery jobs arrive through record(), which makes a
+    RunProfile usable as a MetricsRecorder sink. CPU time is process-wide,
+    so it includes worker threads.
+    """
+
+    def __init__(self, script: str, cpu_profile: bool = False, profile_path: Optional[str] = None,
+                 trace_malloc: int = 0, summary_path: Optional[str] = DEFAULT_SUMMARY_PATH,
+                 argv: Optional[List[str]] = None):
+        """
+        Args:
+            cpu_profile: cProfile the main thread and every thread started
+                during the run; stats are merged and written to profile_path
+                (default .cache/profiles/<script>-<timestamp>.prof)
+            trace_malloc: Trace allocations and report this many top sites
+                (0 disables; tracing slows the run noticeably)
+            summary_path: Append the run summary here as one JSON line
+                (None to skip); a .json path is overwritten with just this run
+        """
+        self.script = script
+        self.cpu_profile = cpu_profile
+        self.profile_path = profile_path
+        self.trace_malloc = trace_malloc
+        self.summary_path = summary_path
+        self.argv = list(sys.argv[1:] if argv is None else argv)
+        self.phases: List[PhaseTiming] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self._current: Optional[PhaseTiming] = None
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._profilers: List[cProfile.Profile] = []
+
+    # Lifecycle
+
+    def __enter__(self) -> 'RunProfile':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(error=f"{exc_type.__name__}: {exc}" if exc_type else None)
+
+    def start(self) -> None:
+        global _active
+        self.started_at = datetime.now()
+        self._start = (time.perf_counter(), time.process_time())
+        if self.trace_malloc:
+            tracemalloc.start()
+        if self.cpu_profile:
+            threading.setprofile(self._profile_thread)
+            self._profile_thread()
+        _active = self
+        self.phase('startup')
+
+    def _profile_thread(self, *args) -> None:
+        """Give the calling thread its own profiler (cProfile only sees one thread)"""
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        profiler.enable()
+
+    def phase(self, name: str) -> None:
+        """End the current phase and start timing `name`"""
+        with self._lock:
+            self._close_phase()
+            self._current = PhaseTiming(name)
+            api = get_governor().stats()
+            self._marks = {'wall': time.perf_counter(), 'cpu': time.process_time(),
+                           'calls': api['calls'], 'retries': api['retries']}
+
+    def _close_phase(self) -> None:
+        if self._current is None:
+            return
+        api = get_governor().stats()
+        current = self._current
+        current.wall_s = time.perf_counter() - self._marks['wall']
+        current.cpu_s = time.process_time() - self._marks['cpu']
+        current.api_calls = api['calls'] - self._marks['calls']
+        current.api_retries = api['retries'] - self._marks['retries']
+        # A phase marked twice (e.g. one per page) accumulates
+        for existing in self.phases:
+            if existing.name == current.name:
+                for key in ('wall_s', 'cpu_s', 'api_calls', 'api_retries', 'bq_jobs', 'bq_bytes_processed'):
+                    setattr(existing, key, getattr(existing, key) + getattr(current, key))
+                break
+        else:
+            self.phases.append(current)
+        self._current = None
+
+    def record(self, metrics) -> None:
+        """MetricsRecorder sink: count an explorer call's BigQuery jobs in the current phase"""
+        with self._lock:
+            if self._current is not None:
+                self._current.bq_jobs += metrics.jobs
+                self._current.bq_bytes_processed += metrics.bytes_processed
+
+    def finish(self, error: Optional[str] = None) -> Dict[str, Any]:
+        """Stop measuring, write the summary and print the report"""
+        global _active
+        with self._lock:
+            self._close_phase()
+        if _active is self:
+            _active = None
+        wall_s = time.perf_counter() - self._start[0]
+        cpu_s = time.process_time() - self._start[1]
+
+        summary: Dict[str, Any] = {
+            'script': self.script,
+            'argv': self.argv,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'status': 'error' if error else 'ok',
+            'error': error,
+            'wall_s': round(wall_s, 3),
+            'cpu_s': round(cpu_s, 3),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'api_calls': sum(p.api_calls for p in self.phases),
+            'api_retries': sum(p.api_retries for p in self.phases),
+            'bq_jobs': sum(p.bq_jobs for p in self.phases),
+            'phases': [{k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(p).items()}
+                       for p in self.phases],
+        }
+        # Snapshot allocations before the profiler's own stats are built
+        if self.trace_malloc:
+            summary.update(self._allocations())
+        if self.cpu_profile:
+            summary['profile'] = self._write_profile()
+        self.summary = summary
+        if self.summary_path:
+            self._write_summary(summary)
+        self.report()
+        return summary
+
+    # Outputs
+
+    def _write_profile(self) -> str:
+        threading.setprofile(None)
+        for profiler in self._profilers:
+            profiler.disable()
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+        path = self.profile_path or os.path.join(
+            DEFAULT_PROFILE_DIR, f"{self.script}-{self.started_at:%Y%m%d-%H%M%S}.prof"
+        )
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        stats.dump_stats(path)
+        self._stats = stats
+        return path
+
+    def _allocations(self) -> Dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'traced_current_mb': round(current / (1024 * 1024), 2),
+            'traced_peak_mb': round(peak / (1024 * 1024), 2),
+            'top_allocations': [
+                {'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.trace_malloc]
+            ],
+        }
+
+    def _write_summary(self, summary: Dict[str, Any]) -> None:
+        if os.path.dirname(self.summary_path):
+            os.makedirs(os.path.dirname(self.summary_path), exist_ok=True)
+        if self.summary_path.endswith('.json'):
+            with open(self.summary_path, 'w') as f:
+                json.dump(summary, f, indent=2)
+        else:
+            with open(self.summary_path, 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+
+    def report(self) -> None:
+        summary = self.summary
+        print(f"\n⏱️  Run profile: {summary['wall_s']:.2f}s wall, {summary['cpu_s']:.2f}s CPU, "
+              f"{summary['api_calls']:,} API calls, {summary['bq_jobs']:,} BigQuery jobs, "
+              f"peak {summary['peak_rss_mb']:.0f} MB")
+        print(f"     {'Phase':<24}{'Wall':>10}{'CPU':>10}{'API calls':>11}{'BQ jobs':>9}")
+        for p in self.phases:
+            print(f"     {p.name:<24}{p.wall_s:>9.2f}s{p.cpu_s:>9.2f}s{p.api_calls:>11,}{p.bq_jobs:>9,}")
+        if self.summary_path:
+            print(f"     📄 Summary: {self.summary_path}")
+
+        if 'profile' in summary:
+            print(f"\n🔬 cProfile ({len(self._profilers)} threads): {summary['profile']}")
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+            print(out.getvalue().rstrip())
+
+        if 'top_allocations' in summary:
+            print(f"\n🧠 Allocations: {summary['traced_current_mb']:.1f} MB live, "
+                  f"{summary['traced_peak_mb']:.1f} MB peak (traced)")
+            for site in summary['top_allocations']:
+                print(f"     {site['size_kb']:>10,.1f} KB  {site['count']:>8,} blocks  {site['location']}")
+
+
+def profile_run(script: str, argv: Optional[List[str]] = None) -> RunProfile:
+    """
+    A RunProfile configured from the script's command-line flags.
+
+    --profile[=PATH]     cProfile the run (all threads) and print the top functions
+    --trace-malloc[=N]   Report the N (default 10) largest allocation sites
+    --summary=PATH       Write the run summary here instead of appending it
+                         to .cache/run_summaries.jsonl (--summary= disables it)
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    options: Dict[str, Any] = {'argv': argv}
+    for arg in argv:
+        if arg == '--profile':
+            options['cpu_profile'] = True
+        elif arg.startswith('--profile='):
+            options['cpu_profile'] = True
+            options['profile_path'] = arg.split('=', 1)[1]
+        elif arg == '--trace-malloc':
+            options['trace_malloc'] = DEFAULT_TOP_ALLOCATIONS
+        elif arg.startswith('--trace-malloc='):
+            options['trace_malloc'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--summary='):
+            options['summary_path'] = arg.split('=', 1)[1] or None
+    return RunProfile(script, **options)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Local inverted index for keyword search over job titles and descriptions
+Segmented on disk: each segment holds a document table (Arrow), a sorted
+term lexicon (Arrow) and zlib-compressed, delta-encoded posting lists
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+DEFAULT_INDEX_DIR = os.path.join('.cache', 'search_index')
+
+# Columns returned by JobsDataExplorer.search_jobs
+RESULT_COLUMNS = [
+    'unique_job_id',
+    'data_company',
+    'data_job_title',
+    'data_seniority_level',
+    'job_family',
+    'data_location_city',
+    'data_location_state',
+    'data_pay_range_min',
+    'data_pay_range_max',
+    'is_remote',
+    'data_posted',
+]
+TEXT_COLUMNS = ['data_job_title', 'data_job_description']
+
+# Keeps skill names like "c++", "c#" and "gpt4" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-case word tokens of a string"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _encode_postings(doc_ids: array) -> bytes:
+    """Delta-encode a sorted doc id list and compress it"""
+    ids = np.frombuffer(doc_ids, dtype=np.uint32)
+    deltas = np.diff(ids, prepend=np.uint32(0)).astype(np.uint32)
+    return zlib.compress(deltas.tobytes(), 6)
+
+
+def _decode_postings(blob: bytes) -> np.ndarray:
+    deltas = np.frombuffer(zlib.decompress(blob), dtype=np.uint32)
+    return np.cumsum(deltas, dtype=np.uint32)
+
+
+class _Segment:
+    """One immutable index segment loaded from disk"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with pa.memory_map(os.path.join(path, 'docs.arrow'), 'r') as source:
+            self.docs = ipc.open_file(source).read_all().to_pandas(date_as_object=False)
+        with pa.memory_map(os.path.join(path, 'lexicon.arrow'), 'r') as source:
+            lexicon = ipc.open_file(source).read_all()
+        self.terms: List[str] = lexicon.column('term').to_pylist()
+        self.offsets = lexicon.column('offset').to_numpy()
+        self.lengths = lexicon.column('length').to_numpy()
+        self.postings = pa.memory_map(os.path.join(path, 'postings.bin'), 'r')
+        # Docs not superseded by a copy in a later segment (set by SearchIndex)
+        self.live = np.ones(len(self.docs), dtype=bool)
+
+    def _read(self, i: int) -> np.ndarray:
+        # Positional read: concurrent searches share the map, so no seek()
+        return _decode_postings(self.postings.read_at(int(self.lengths[i]), int(self.offsets[i])))
+
+    def lookup(self, term: str, prefix: bool = False) -> np.ndarray:
+        """Doc ids containing the term (or any term starting with it)"""
+        start = bisect.bisect_left(self.terms, term)
+        if not prefix:
+            if start < len(self.terms) and self.terms[start] == term:
+                return self._read(start)
+            return np.empty(0, dtype=np.uint32)
+
+        matches = []
+        i = start
+        while i < len(self.terms) and self.terms[i].startswith(term):
+            matches.append(self._read(i))
+            i += 1
+        if not matches:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(np.concatenate(matches))
+
+    def search(self, terms: List[str]) -> pd.DataFrame:
+        """Live documents containing every term, the last one matched as a prefix"""
+        doc_ids = None
+        for i, term in enumerate(terms):
+            ids = self.lookup(term, prefix=(i == len(terms) - 1))
+            doc_ids = ids if doc_ids is None else np.intersect1d(doc_ids, ids, assume_unique=True)
+            if len(doc_ids) == 0:
+                break
+        return self.docs.iloc[doc_ids[self.live[doc_ids]]]
+
+    def close(self) -> None:
+        self.postings.close()
+
+
+class SearchIndex:
+    """Segmented inverted index answering search_jobs locally"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._segments: Optional[List[_Segment]] = None
+
+    @classmethod
+    def for_table(cls, project_id: str, dataset_id: str, table_id: str,
+                  index_dir: str = DEFAULT_INDEX_DIR) -> 'SearchIndex':
+        """Index at the conventional path for a table"""
+        return cls(os.path.join(index_dir, f"{project_id}.{dataset_id}.{table_id}"))
+
+    # Manifest
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self._manifest_path)
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, 'manifest.json')
+
+    def _read_manifest(self) -> Dict:
+        if not self.exists:
+            return {'segments': [], 'max_posted': None, 'num_docs': 0}
+        with open(self._manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        tmp = f"{self._manifest_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self._manifest_path)
+
+    @property
+    def max_posted(self) -> Optional[str]:
+        """Newest data_posted indexed so far (ISO timestamp), used for incremental updates"""
+        return self._read_manifest()['max_posted']
+
+    # Building
+
+    def build(self, explorer, dataset_id: str, table_id: str,
+              segment_rows: int = 50000) -> int:
+        """Index a whole table from BigQuery, replacing any existing segments"""
+        self.close()
+        for name in self._read_manifest()['segments']:
+            _remove_segment(os.path.join(self.path, name))
+        os.makedirs(self.path, exist_ok=True)
+        self._write_manifest({'segments': [], 'max_posted': None, 'num_docs': 0})
+        return self.update(explorer, dataset_id, table_id, segment_rows=segment_rows)
+
+    def update(self, explorer, dataset_id: str, table_id: str,
+               segment_rows: int = 50000) -> int:
+        """Index only rows posted at or after the newest indexed timestamp; returns rows added"""
+        since = self.max_posted
+        where = "WHERE data_posted >= @since" if since else ""
+        sql = f"""
+        SELECT {', '.join(RESULT_COLUMNS)}, data_job_description
+        FROM {explorer.table_ref(dataset_id, table_id)}
+        {where}
+        """
+        params = {'since': pd.Timestamp(since).to_pydatetime()} if since else None
+
+        added = 0
+        pending = []
+        pending_rows = 0
+        for chunk in explorer.query_iter(sql, chunk_size=50000, params=params):
+            pending.append(chunk)
+            pending_rows += len(chunk)
+            if pending_rows >= segment_rows:
+                added += self.add_documents(pd.concat(pending, ignore_index=True))
+                pending, pending_rows = [], 0
+        if pending:
+            added += self.add_documents(pd.concat(pending, ignore_index=True))
+        return added
+
+    def add_documents(self, df: pd.DataFrame) -> int:
+        """
+        Write a new segment for the given rows (RESULT_COLUMNS plus
+        data_job_description). Rows re-indexed under an existing
+        unique_job_id supersede the older copy.
+        """
+        if df.empty:
+            return 0
+        df = df.reset_index(drop=True)
+
+        postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        for doc_id, texts in enumerate(zip(*(df[c] for c in TEXT_COLUMNS))):
+            terms = set()
+            for text in texts:
+                terms.update(tokenize(text))
+            for term in terms:
+                postings[term].append(doc_id)
+
+        manifest = self._read_manifest()
+        name = self._write_segment(df, postings, manifest)
+
+        posted = pd.to_datetime(df['data_posted'], utc=True).max()
+        if not pd.isna(posted):
+            if manifest['max_posted'] is None or posted > pd.Timestamp(manifest['max_posted']):
+                manifest['max_posted'] = posted.isoformat()
+        manifest['segments'].append(name)
+        manifest['num_docs'] += len(df)
+        self._write_manifest(manifest)
+
+        # Reload on next use; searches still running keep the old segments mapped
+        self._segments = None
+        return len(df)
+
+    def _write_segment(self, df: pd.DataFrame, postings: Dict[str, array],
+                       manifest: Dict) -> str:
+        """Write docs, lexicon and postings for a new segment; returns its name"""
+        manifest['next_segment'] = manifest.get('next_segment', 0) + 1
+        name = f"seg-{manifest['next_segment']:06d}"
+        seg_path = os.path.join(self.path, name)
+        os.makedirs(seg_path, exist_ok=True)
+
+        terms = sorted(postings)
+        offsets, lengths = [], []
+        offset = 0
+        with open(os.path.join(seg_path, 'postings.bin'), 'wb') as f:
+            for term in terms:
+                blob = _encode_postings(postings[term])
+                f.write(blob)
+                offsets.append(offset)
+                lengths.append(len(blob))
+                offset += len(blob)
+
+        lexicon = pa.table({
+            'term': pa.array(terms, type=pa.string()),
+            'offset': pa.array(offsets, type=pa.int64()),
+            'length': pa.array(lengths, type=pa.int32()),
+        })
+        _write_arrow(os.path.join(seg_path, 'lexicon.arrow'), lexicon)
+        docs = pa.Table.from_pandas(df[RESULT_COLUMNS], preserve_index=False)
+        _write_arrow(os.path.join(seg_path, 'docs.arrow'), docs)
+        return name
+
+    def compact(self) -> None:
+        """
+        Merge all segments into one, dropping superseded documents. Posting
+        lists are remapped directly, so no text has to be re-tokenized.
+        """
+        manifest = self._read_manifest()
+        if len(manifest['segments']) <= 1:
+            return
+        segments = self.segments()
+
+        # Keep only the newest copy of each job across segments
+        owners = pd.concat(
+            [seg.docs[['unique_job_id']].assign(_segment=i) for i, seg in enumerate(segments)],
+            ignore_index=True,
+        )
+        keep_all = ~owners.duplicated('unique_job_id', keep='last').to_numpy()
+
+        id_maps, docs, base, start = [], [], 0, 0
+        for seg in segments:
+            keep = keep_all[start:start + len(seg.docs)]
+            start += len(seg.docs)
+            # New doc id for every kept old id (-1 for dropped ones)
+            new_ids = np.full(len(keep), -1, dtype=np.int64)
+            new_ids[keep] = base + np.arange(keep.sum())
+            id_maps.append(new_ids)
+            docs.append(seg.docs[keep])
+            base += int(keep.sum())
+
+        postings: Dict[str, List[np.ndarray]] = defaultdict(list)
+        for seg, new_ids in zip(segments, id_maps):
+            for i, term in enumerate(seg.terms):
+                mapped = new_ids[seg._read(i)]
+                mapped = mapped[mapped >= 0]
+                if len(mapped):
+                    postings[term].append(mapped.astype(np.uint32))
+
+        merged = pd.concat(docs, ignore_index=True)
+        old_names = manifest['segments']
+        name = self._write_segment(
+            merged,
+            {term: array('I', np.concatenate(parts).tobytes()) for term, parts in postings.items()},
+            manifest,
+        )
+        manifest['segments'] = [name]
+        manifest['num_docs'] = len(merged)
+        self._write_manifest(manifest)
+
+        self.close()
+        for old in old_names:
+            _remove_segment(os.path.join(self.path, old))
+
+    # Searching
+
+    def segments(self) -> List[_Segment]:
+        if self._segments is None:
+            segments = [
+                _Segment(os.path.join(self.path, name))
+                for name in self._read_manifest()['segments']
+            ]
+            if len(segments) > 1:
+                # Only the newest copy of a re-indexed job may match, as in compact()
+                ids = pd.concat([seg.docs['unique_job_id'] for seg in segments], ignore_index=True)
+                live = ~ids.duplicated(keep='last').to_numpy()
+                start = 0
+                for seg in segments:
+                    seg.live = live[start:start + len(seg.docs)]
+                    start += len(seg.docs)
+            self._segments = segments
+        return self._segments
+
+    def search(self, keyword: str, limit: int = 50) -> pd.DataFrame:
+        """
+        Jobs whose title or description contains every word of the keyword
+        (the last word matched as a prefix), newest first.
+        """
+        terms = tokenize(keyword)
+        frames = []
+        for segment in self.segments():
+            # Superseded copies are dropped before matching, so an update that
+            # no longer matches hides the older copy that still would
+            hits = segment.docs[segment.live] if not terms else segment.search(terms)
+            if len(hits):
+                frames.append(hits)
+
+        if not frames:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+
+        hits = pd.concat(frames, ignore_index=True)
+        hits = hits.sort_values('data_posted', ascending=False, kind='stable', na_position='last')
+        return hits.head(limit)[RESULT_COLUMNS].reset_index(drop=True)
+
+    def close(self) -> None:
+        for segment in self._segments or []:
+            segment.close()
+        self._segments = None
+
+
+def _write_arrow(path: str, table: pa.Table) -> None:
+    with ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _remove_segment(path: str) -> None:
+    for name in ('docs.arrow', 'lexicon.arrow', 'postings.bin'):
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    if os.path.isdir(path):
+        os.rmdir(path)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Local columnar snapshot engine for the explorer's specialized queries
+Materializes the columns those queries need into a memory-mapped Arrow file
+and answers them with vectorized pandas group-bys instead of BigQuery scans
+"""
+
+import functools
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+DEFAULT_SNAPSHOT_DIR = os.path.join('.cache', 'snapshots')
+
+# Every column read by the specialized explorer methods
+SNAPSHOT_COLUMNS = [
+    'data_company',
+    'data_job_title',
+    'job_family',
+    'data_pay_range_min',
+    'data_pay_range_max',
+    'data_location_city',
+    'data_location_state',
+    'data_location_country',
+    'data_posted',
+    'is_remote',
+    'is_hybrid',
+    'is_onsite',
+]
+FLAG_COLUMNS = ('is_remote', 'is_hybrid', 'is_onsite')
+
+
+class SnapshotEngine:
+    """Answers the explorer's aggregate queries from a local Arrow snapshot"""
+
+    def __init__(self, path: str):
+        """Bind the engine to a snapshot file (built with `build` if missing)"""
+        self.path = path
+        self._table: Optional[pa.Table] = None
+        self._frames: Dict[Tuple, pd.DataFrame] = {}
+
+    @classmethod
+    def for_table(cls, project_id: str, dataset_id: str, table_id: str,
+                  snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> 'SnapshotEngine':
+        """Engine for the conventional snapshot path of a table"""
+        return cls(os.path.join(snapshot_dir, f"{project_id}.{dataset_id}.{table_id}.arrow"))
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def built_at(self) -> Optional[float]:
+        """Unix time the snapshot file was written, or None"""
+        return os.path.getmtime(self.path) if self.exists else None
+
+    def build(self, explorer, dataset_id: str, table_id: str,
+              chunk_size: int = 100000) -> int:
+        """
+        Materialize the snapshot columns from BigQuery, streaming record
+        batches straight to disk so memory stays bounded. Returns row count.
+        """
+        sql = f"""
+        SELECT {', '.join(SNAPSHOT_COLUMNS)}
+        FROM {explorer.table_ref(dataset_id, table_id)}
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Unique per builder, so concurrent builds never share a partial file
+        tmp_path = f"{self.path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+        writer = None
+        rows = 0
+        try:
+            for batch in explorer.query_iter(sql, chunk_size=chunk_size, as_arrow=True):
+                if writer is None:
+                    schema = batch.schema.with_metadata({
+                        'source': f"{explorer.project_id}.{dataset_id}.{table_id}",
+                        'built_at': str(time.time()),
+                    })
+                    writer = ipc.new_file(tmp_path, schema)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                os.remove(tmp_path)
+            raise
+        if writer is None:
+            raise ValueError(f"{dataset_id}.{table_id} returned no rows to snapshot")
+        writer.close()
+
+        os.replace(tmp_path, self.path)
+        self._table = None
+        self._frames = {}
+        return rows
+
+    def table(self) -> pa.Table:
+        """Memory-map the snapshot as an Arrow table (zero-copy, opened once)"""
+        if self._table is None:
+            self._table = ipc.open_file(pa.memory_map(self.path, 'r')).read_all()
+        return self._table
+
+    def frame(self, columns: List[str], not_null: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        The snapshot's `columns` as a DataFrame, keeping only rows where every
+        `not_null` column is set. Projection and filtering run in Arrow, so
+        only the cells a query reads are converted; each result is cached.
+        """
+        key = (tuple(columns), tuple(not_null))
+        df = self._frames.get(key)
+        if df is None:
+            table = self.table().select(columns)
+            if not_null:
+                table = table.filter(functools.reduce(pc.and_, [
+                    pc.invert(pc.is_null(table[column], nan_is_null=True)) for column in not_null
+                ]))
+            # Categoricals make the string group-bys integer-coded
+            df = table.to_pandas(strings_to_categorical=True, date_as_object=False)
+            for flag in FLAG_COLUMNS:
+                if flag in df:
+                    df[flag] = df[flag].fillna(False).astype(bool)
+            self._frames[key] = df
+        return df
+
+    # Aggregates mirroring JobsDataExplorer's specialized queries
+
+    def top_companies(self, limit: int = 20) -> pd.DataFrame:
+        df = self.frame(['data_company', 'data_job_title', 'data_pay_range_min',
+                         'data_pay_range_max', 'is_remote'], not_null=['data_company'])
+        result = df.groupby('data_company', observed=True, sort=False).agg(
+            job_count=('data_company', 'size'),
+            unique_titles=('data_job_title', 'nunique'),
+            avg_min_salary=('data_pay_range_min', 'mean'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        )
+        return _finish(result.nlargest(limit, 'job_count', keep='first'))
+
+    def salary_stats_by_role(self) -> pd.DataFrame:
+        columns = ['job_family', 'data_pay_range_min', 'data_pay_range_max']
+        df = self.frame(columns, not_null=columns)
+        result = df.groupby('job_family', observed=True, sort=False).agg(
+            job_count=('job_family', 'size'),
+            avg_min_salary=('data_pay_range_min', 'mean'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            min_salary=('data_pay_range_min', 'min'),
+            max_salary=('data_pay_range_max', 'max'),
+        )
+        return _finish(result.sort_values('avg_max_salary', ascending=False))
+
+    def location_distribution(self, limit: int = 20) -> pd.DataFrame:
+        df = self.frame(['data_location_city', 'data_location_state', 'data_location_country',
+                         'data_pay_range_max', 'is_remote'], not_null=['data_location_city'])
+        # SQL GROUP BY keeps NULL state/country as their own group
+        result = df.groupby(
+            ['data_location_city', 'data_location_state', 'data_location_country'],
+            observed=True, sort=False, dropna=False,
+        ).agg(
+            job_count=('data_location_city', 'size'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        )
+        return _finish(result.nlargest(limit, 'job_count', keep='first'))
+
+    def monthly_trends(self) -> pd.DataFrame:
+        df = self.frame(['data_posted', 'data_company', 'data_pay_range_max', 'is_remote'],
+                        not_null=['data_posted'])
+        posted = df['data_posted']
+        tz = posted.dt.tz
+        month = posted.dt.tz_localize(None) if tz is not None else posted
+        month = month.dt.to_period('M').dt.to_timestamp().rename('month')
+        if tz is not None:
+            month = month.dt.tz_localize(tz)
+        result = df.groupby(month, sort=True).agg(
+            job_count=('data_posted', 'size'),
+            unique_companies=('data_company', 'nunique'),
+            avg_max_salary=('data_pay_range_max', 'mean'),
+            remote_jobs=('is_remote', 'sum'),
+        )
+        return _finish(result)
+
+    def work_model_distribution(self) -> pd.DataFrame:
+        df = self.frame(list(FLAG_COLUMNS))
+        work_model = np.select(
+            [df['is_remote'].to_numpy(), df['is_hybrid'].to_numpy(), df['is_onsite'].to_numpy()],
+            ['Remote', 'Hybrid', 'Onsite'],
+            default='Unknown',
+        )
+        counts = pd.Series(work_model).value_counts()
+        result = pd.DataFrame({
+            'work_model': counts.index,
+            'job_count': counts.to_numpy(),
+            'percentage': (counts.to_numpy() * 100.0 / counts.sum()).round(2),
+        })
+        return result
+
+
+def _finish(result: pd.DataFrame) -> pd.DataFrame:
+    """Flatten group keys into columns the way BigQuery returns them"""
+    result = result.reset_index()
+    for column in result.columns:
+        if isinstance(result[column].dtype, pd.CategoricalDtype):
+            result[column] = result[column].astype(object)
+    return result
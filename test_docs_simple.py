@@ -7,10 +7,11 @@ Uses service account key file directly
 import json
 import sys
 import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from google_clients import get_factory
+from rate_limit import get_governor
+
 # Required scopes
 SCOPES = [
     'https://www.googleapis.com/auth/documents',
@@ -36,10 +37,8 @@ def test_create_doc():
             print(f"     ❌ Key file not found: {KEY_FILE}")
             return False
 
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_FILE,
-            scopes=SCOPES
-        )
+        clients = get_factory(KEY_FILE, SCOPES)
+        credentials = clients.credentials
 
         print(f"     ✅ Authenticated successfully!")
         print(f"     📧 Service Account: {credentials.service_account_email}")
@@ -51,8 +50,8 @@ def test_create_doc():
     try:
         # Build services
         print("\n[2/4] 🔨 Building API services...")
-        docs_service = build('docs', 'v1', credentials=credentials)
-        drive_service = build('drive', 'v3', credentials=credentials)
+        docs_service = clients.docs()
+        drive_service = clients.drive()
         print("     ✅ Services created!")
         
     except Exception as e:
@@ -66,7 +65,7 @@ def test_create_doc():
             'title': 'TEST - Service Account Diagnostic - DELETE ME'
         }
         
-        doc = docs_service.documents().create(body=document).execute()
+        doc = get_governor().execute(docs_service.documents().create(body=document), idempotent=False)
         doc_id = doc.get('documentId')
         doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
         
@@ -111,10 +110,10 @@ def test_create_doc():
             }
         ]
         
-        docs_service.documents().batchUpdate(
+        get_governor().execute(docs_service.documents().batchUpdate(
             documentId=doc_id,
             body={'requests': requests}
-        ).execute()
+        ), idempotent=False)
         
         print(f"     ✅ Content written!")
         
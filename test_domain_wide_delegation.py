@@ -3,10 +3,11 @@
 Test Domain-Wide Delegation for service account
 """
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from google_clients import get_factory
+from rate_limit import get_governor
+
 KEY_FILE = 'sa-key-full.json'
 SCOPES = [
     'https://www.googleapis.com/auth/documents',
@@ -27,16 +28,11 @@ def test_domain_wide_delegation():
     try:
         print("\n[1/3] 🔐 Creating delegated credentials...")
         
-        # Load service account credentials
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_FILE,
-            scopes=SCOPES
-        )
-        
-        # Create delegated credentials (impersonate user)
-        delegated_credentials = credentials.with_subject(DELEGATED_USER)
+        # Load service account credentials, impersonating the user
+        clients = get_factory(KEY_FILE, SCOPES, subject=DELEGATED_USER)
+        delegated_credentials = clients.credentials
         
-        print(f"     ✅ Service Account: {credentials.service_account_email}")
+        print(f"     ✅ Service Account: {delegated_credentials.service_account_email}")
         print(f"     👤 Impersonating: {DELEGATED_USER}")
         
     except Exception as e:
@@ -45,8 +41,8 @@ def test_domain_wide_delegation():
     
     try:
         print("\n[2/3] 🔨 Building Google Docs API service...")
-        docs_service = build('docs', 'v1', credentials=delegated_credentials)
-        drive_service = build('drive', 'v3', credentials=delegated_credentials)
+        docs_service = clients.docs()
+        drive_service = clients.drive()
         print("     ✅ Services created!")
         
     except Exception as e:
@@ -60,7 +56,7 @@ def test_domain_wide_delegation():
             'title': 'TEST - Domain-Wide Delegation - DELETE ME'
         }
         
-        doc = docs_service.documents().create(body=document).execute()
+        doc = get_governor().execute(docs_service.documents().create(body=document), idempotent=False)
         doc_id = doc.get('documentId')
         doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
         
@@ -69,10 +65,10 @@ def test_domain_wide_delegation():
         print(f"     🔗 URL: {doc_url}")
         
         # Check ownership
-        file_info = drive_service.files().get(
+        file_info = get_governor().execute(drive_service.files().get(
             fileId=doc_id,
             fields='owners,permissions'
-        ).execute()
+        ))
         
         owners = file_info.get('owners', [])
         if owners:
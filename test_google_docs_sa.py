@@ -6,9 +6,11 @@ Test script to verify service account can create Google Docs
 import json
 import sys
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from google_clients import ClientFactory
+from rate_limit import get_governor
+
 # Service account email
 SERVICE_ACCOUNT_EMAIL = "dataengineer-dev@jobs-data-linkedin.iam.gserviceaccount.com"
 
@@ -58,7 +60,8 @@ def test_service_account():
     # Step 2: Build Google Docs API service
     print("\n[2/5] 🔨 Building Google Docs API service...")
     try:
-        docs_service = build('docs', 'v1', credentials=credentials)
+        clients = ClientFactory(credentials=credentials, scopes=SCOPES)
+        docs_service = clients.docs()
         print("     ✅ Google Docs API service created!")
     except Exception as e:
         print(f"     ❌ Failed to build Docs service: {e}")
@@ -67,7 +70,7 @@ def test_service_account():
     # Step 3: Build Google Drive API service
     print("\n[3/5] 🔨 Building Google Drive API service...")
     try:
-        drive_service = build('drive', 'v3', credentials=credentials)
+        drive_service = clients.drive()
         print("     ✅ Google Drive API service created!")
     except Exception as e:
         print(f"     ❌ Failed to build Drive service: {e}")
@@ -80,7 +83,7 @@ def test_service_account():
             'title': 'TEST - Service Account Diagnostic - DELETE ME'
         }
         
-        doc = docs_service.documents().create(body=document).execute()
+        doc = get_governor().execute(docs_service.documents().create(body=document), idempotent=False)
         doc_id = doc.get('documentId')
         doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
         
@@ -133,10 +136,10 @@ def test_service_account():
             }
         ]
         
-        docs_service.documents().batchUpdate(
+        get_governor().execute(docs_service.documents().batchUpdate(
             documentId=doc_id,
             body={'requests': requests}
-        ).execute()
+        ), idempotent=False)
         
         print(f"     ✅ Content written successfully!")
         
@@ -146,10 +149,10 @@ def test_service_account():
     # Step 6: Check document permissions
     print("\n[6/6] 🔒 Checking document permissions...")
     try:
-        permissions = drive_service.permissions().list(
+        permissions = get_governor().execute(drive_service.permissions().list(
             fileId=doc_id,
             fields='permissions(id,type,role,emailAddress)'
-        ).execute()
+        ))
         
         print(f"     ✅ Current permissions:")
         for perm in permissions.get('permissions', []):
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+SQLite journal of Drive → Cloud Storage migrations
+Records where each file is in the listed → uploaded → verified → deleted
+lifecycle so an interrupted migration resumes instead of starting over
+"""
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_JOURNAL_PATH = os.path.join('.cache', 'migration_journal.sqlite')
+
+# Lifecycle order; a file only moves forward except when verification fails.
+# Transfers stream Drive straight into GCS, so there is no separate
+# "downloaded" resting point between listed and uploaded.
+STATES = ('listed', 'uploaded', 'verified', 'deleted')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id           TEXT PRIMARY KEY,
+    name         TEXT NOT NULL,
+    size         INTEGER,
+    md5          TEXT,
+    created_time TEXT,
+    state        TEXT NOT NULL,
+    blob         TEXT,
+    stream_md5   TEXT,
+    bytes        INTEGER,
+    stored_bytes INTEGER,
+    duplicate_of TEXT,
+    generation   INTEGER,
+    error        TEXT,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_state ON files (state);
+"""
+
+
+class TransferJournal:
+    """Per-file migration state, persisted after every transition"""
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        # Journals written by older versions lack the later columns
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for column, kind in (('stored_bytes', 'INTEGER'), ('duplicate_of', 'TEXT'), ('generation', 'INTEGER')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} {kind}")
+
+    def __enter__(self) -> 'TransferJournal':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record_listed(self, files: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add files from a Drive listing.
+
+        Files already in the journal keep their state; ones still only
+        listed get their metadata refreshed. Returns how many were new.
+        """
+        now = time.time()
+        before = self._count()
+        with self.conn:
+            for f in files:
+                self.conn.execute(
+                    """
+                    INSERT INTO files (id, name, size, md5, created_time, state, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 'listed', ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = excluded.name, size = excluded.size, md5 = excluded.md5,
+                        created_time = excluded.created_time, updated_at = excluded.updated_at
+                    WHERE files.state = 'listed'
+                    """,
+                    (f['id'], f['name'], int(f.get('size', 0)), f.get('md5Checksum'),
+                     f.get('createdTime'), now),
+                )
+        return self._count() - before
+
+    def _count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def mark(self, file_id: str, state: str, **fields) -> None:
+        """Move a file to `state`, updating any of blob/stream_md5/bytes/stored_bytes/duplicate_of/generation/error"""
+        if state not in STATES:
+            raise ValueError(f"Unknown state {state!r}; expected one of {STATES}")
+        unknown = set(fields) - {'blob', 'stream_md5', 'bytes', 'stored_bytes', 'duplicate_of', 'generation',
+                                 'error'}
+        if unknown:
+            raise ValueError(f"Unknown journal fields: {sorted(unknown)}")
+
+        assignments = ', '.join(f"{name} = ?" for name in ['state', 'updated_at', *fields])
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE files SET {assignments} WHERE id = ?",
+                (state, time.time(), *fields.values(), file_id),
+            )
+
+    def files(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Journal entries (all, or those in one state) in Drive listing shape"""
+        if state is None:
+            return self._select("1")
+        return self._select("state = ?", (state,))
+
+    def _select(self, where: str, args: tuple = ()) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(f"SELECT * FROM files WHERE {where} ORDER BY name", args).fetchall()
+        return [
+            {**dict(row), 'md5Checksum': row['md5'], 'createdTime': row['created_time']}
+            for row in rows
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of files in each state"""
+        counts = dict.fromkeys(STATES, 0)
+        for state, n in self.conn.execute("SELECT state, COUNT(*) FROM files GROUP BY state"):
+            counts[state] = n
+        return counts
+
+    def stored_totals(self) -> Dict[str, int]:
+        """Source and stored bytes over every file that has reached Cloud Storage"""
+        source, stored = self.conn.execute(
+            "SELECT COALESCE(SUM(bytes), 0), COALESCE(SUM(COALESCE(stored_bytes, bytes)), 0) "
+            "FROM files WHERE state != 'listed'"
+        ).fetchone()
+        return {'source_bytes': source, 'stored_bytes': stored}
+
+    def canonicals(self) -> List[Dict[str, Any]]:
+        """Verified or deleted files that listed duplicates are waiting on"""
+        return self._select(
+            "state IN ('verified', 'deleted') AND id IN "
+            "(SELECT duplicate_of FROM files WHERE state = 'listed' AND duplicate_of IS NOT NULL)"
+        )
+
+    def resolve_duplicates(self, confirmed: Iterable[str]) -> int:
+        """
+        Mark duplicates of the confirmed canonical files as verified.
+
+        Drive computed both md5Checksums, so a duplicate shares the
+        canonical file's object (blob and generation) and is safe to delete
+        from Drive. Its bytes stay NULL: nothing was transferred for it.
+
+        Args:
+            confirmed: Ids of verified or deleted canonical files whose
+                objects were just checked to still hold their content
+
+        Returns:
+            How many duplicates moved
+        """
+        now = time.time()
+        moved = 0
+        with self.conn:
+            for canonical_id in confirmed:
+                moved += self.conn.execute(
+                    """
+                    UPDATE files SET
+                        state = 'verified', error = NULL, updated_at = ?,
+                        blob = (SELECT c.blob FROM files c WHERE c.id = files.duplicate_of),
+                        generation = (SELECT c.generation FROM files c WHERE c.id = files.duplicate_of)
+                    WHERE state = 'listed' AND duplicate_of = ? AND duplicate_of IN (
+                        SELECT id FROM files WHERE state IN ('verified', 'deleted')
+                    )
+                    """,
+                    (now, canonical_id),
+                ).rowcount
+        return moved
+
+    def release_duplicates(self, canonical_id: str) -> int:
+        """Turn the listed duplicates of a canonical file back into files to transfer"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE files SET duplicate_of = NULL, updated_at = ? "
+                "WHERE state = 'listed' AND duplicate_of = ?",
+                (time.time(), canonical_id),
+            ).rowcount
+
+    def duplicates(self) -> List[Dict[str, Any]]:
+        """Duplicates already stored as references to their canonical object"""
+        return [f for f in self.files() if f['duplicate_of'] and f['state'] in ('verified', 'deleted')]
+
+    def unfinished(self) -> int:
+        """Files not yet deleted from Drive"""
+        return self.conn.execute("SELECT COUNT(*) FROM files WHERE state != 'deleted'").fetchone()[0]